@@ -0,0 +1,377 @@
+"""
+Benchmark and parity checks for the vectorized event feature preparation.
+
+Generates a synthetic event CSV (same columns as the exported data/events
+files), runs a frozen copy of the former row-by-row prepare_*_features and
+the vectorized ones on it, and checks that both produce byte-for-byte
+identical parquet.
+
+The shared kernels then changed one convention on purpose: shots always
+attack right, where the former code attacked left for y >= 50. The
+vectorization check therefore compares shots with y < 50 (the same under
+both conventions). A separate convention check confirms that, on all
+shots, only distance and angle to goal differ from the former code, and
+only as the former geometry with the goal on the right.
+
+It also checks train/serve parity. The runtime scorers are given the same
+shots and passes, with only the fields a caller passes (coordinates, body
+part, pass type...). Their encoded model input must equal the one-hot
+training matrix.
+
+Usage (from the project root):
+    python ai_pipeline/events/benchmark_features.py --events 1000000
+    python ai_pipeline/events/benchmark_features.py --csv data/events/season.csv
+    python ai_pipeline/events/benchmark_features.py --parity-only
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import prepare_pass_dataset as passes
+import prepare_shot_dataset as shots
+from ai_pipeline.runtime.feature_schema import (
+    PASS_CATEGORICAL,
+    PASS_DEFAULTS,
+    SHOT_CATEGORICAL,
+    SHOT_DEFAULTS,
+    FeatureEncoder,
+    build_schema,
+)
+from ai_pipeline.runtime.xg_runtime import _pass_features, _shot_features
+
+EVENT_TYPES = ["pass", "touch", "tackle", "shot", "header_shot", "free_kick_shot", "penalty", "key_pass", "cross"]
+EVENT_WEIGHTS = [0.5, 0.25, 0.1, 0.05, 0.02, 0.01, 0.01, 0.03, 0.03]
+
+
+def make_synthetic_events(path, n_events: int = 1_000_000, n_matches: int = 300, seed: int = 42) -> None:
+    """Write a synthetic event CSV with realistic metadata for shots and passes."""
+    rng = np.random.default_rng(seed)
+    event_type = rng.choice(np.array(EVENT_TYPES, dtype=object), n_events, p=EVENT_WEIGHTS)
+    match_id = np.sort(rng.integers(0, n_matches, n_events))
+    timestamp = np.round(rng.uniform(0, 5400, n_events), 1)
+    order = np.lexsort((timestamp, match_id))
+    event_type, timestamp = event_type[order], timestamp[order]
+
+    x = np.round(rng.uniform(0, 100, n_events), 2)
+    y = np.round(rng.uniform(0, 100, n_events), 2)
+    is_pass = np.isin(event_type, ["pass", "key_pass", "cross"])
+    x_end = np.where(is_pass, np.round(np.clip(x + rng.normal(5, 15, n_events), 0, 100), 2), np.nan)
+    y_end = np.where(is_pass, np.round(np.clip(y + rng.normal(0, 15, n_events), 0, 100), 2), np.nan)
+
+    r = rng.random(n_events)
+    body_parts = rng.choice(np.array(["foot", "foot", "other"], dtype=object), n_events)
+    pass_types = rng.choice(np.array(["normal", "long", "short"], dtype=object), n_events)
+    defenders = rng.integers(0, 4, n_events)
+    metadata = []
+    for i, t in enumerate(event_type.tolist()):
+        if t in shots.SHOT_TYPES:
+            fields = {
+                "body_part": "head" if t == "header_shot" else body_parts[i],
+                "shot_type": {"free_kick_shot": "free_kick", "penalty": "penalty"}.get(t, "open_play"),
+                "is_goal": bool(r[i] < 0.12),
+            }
+            if r[i] < 0.5:
+                fields["under_pressure"] = int(r[i] < 0.3)
+            if r[i] < 0.4:
+                fields["num_defenders_between"] = int(defenders[i])
+            metadata.append(json.dumps(fields))
+        elif t in ("pass", "key_pass", "cross"):
+            fields = {"pass_type": pass_types[i], "successful": bool(r[i] < 0.8)}
+            if r[i] < 0.05:
+                fields["leading_to_goal"] = True
+            elif r[i] < 0.15:
+                fields["leading_to_shot"] = True
+            metadata.append(json.dumps(fields) if r[i] < 0.97 else "")
+        else:
+            metadata.append("{}" if r[i] < 0.5 else "")
+
+    pd.DataFrame({
+        "match_id": match_id,
+        "team": rng.choice(np.array(["home", "away"], dtype=object), n_events),
+        "player_id": rng.integers(1, 23, n_events),
+        "event_type": event_type,
+        "timestamp": timestamp,
+        "minute": (timestamp // 60).astype(int),
+        "x": x,
+        "y": y,
+        "x_end": x_end,
+        "y_end": y_end,
+        "metadata": metadata,
+    }).to_csv(path, index=False)
+
+
+# Frozen copy of the row-by-row feature code from before vectorization
+# (prepare_shot_dataset / prepare_pass_dataset). It is the reference the
+# vectorized code is checked against: do not update it with the feature code.
+_FORMER_PITCH_LENGTH = 105.0
+_FORMER_PITCH_WIDTH = 68.0
+
+
+def _former_normalize_coords(x, y):
+    return x / 100.0, y / 100.0
+
+
+def _former_goal_x_m(attacking_direction):
+    return (1.0 if attacking_direction == "right" else 0.0) * _FORMER_PITCH_LENGTH
+
+
+def _former_distance_to_goal(x_norm, y_norm, attacking_direction="right"):
+    x_m = x_norm * _FORMER_PITCH_LENGTH
+    y_m = y_norm * _FORMER_PITCH_WIDTH
+    goal_x_m = _former_goal_x_m(attacking_direction)
+    goal_y_m = 0.5 * _FORMER_PITCH_WIDTH
+    return np.sqrt((x_m - goal_x_m)**2 + (y_m - goal_y_m)**2)
+
+
+def _former_angle_to_goal(x_norm, y_norm, attacking_direction="right"):
+    x_m = x_norm * _FORMER_PITCH_LENGTH
+    y_m = y_norm * _FORMER_PITCH_WIDTH
+    dx = _former_goal_x_m(attacking_direction) - x_m
+    dy = 0.5 * _FORMER_PITCH_WIDTH - y_m
+    return np.arctan2(dy, dx)
+
+
+def _former_get_zone(x_norm, y_norm):
+    if x_norm < 0.18:
+        return "Self box"
+    elif x_norm < 0.33:
+        return "Def third"
+    elif x_norm < 0.67:
+        return "Middle"
+    elif x_norm < 0.82:
+        return "Att third"
+    else:
+        return "Opp box"
+
+
+def _former_parse_metadata(metadata_str):
+    if pd.isna(metadata_str) or metadata_str == "":
+        return {}
+    try:
+        if isinstance(metadata_str, str):
+            return json.loads(metadata_str)
+        return metadata_str
+    except ValueError:
+        return {}
+
+
+def prepare_shot_features_rowwise(df):
+    """Former row-by-row prepare_shot_features (frozen reference for the vectorization check)."""
+    features_list = []
+    for idx, row in df.iterrows():
+        x_norm, y_norm = _former_normalize_coords(row['x'], row['y'])
+        attacking_dir = "right" if row['y'] < 50 else "left"
+        metadata = _former_parse_metadata(row.get('metadata', '{}'))
+        is_goal = metadata.get('is_goal', 0)
+        if isinstance(is_goal, bool):
+            is_goal = 1 if is_goal else 0
+        features_list.append({
+            'x_shot': x_norm,
+            'y_shot': y_norm,
+            'distance_to_goal': _former_distance_to_goal(x_norm, y_norm, attacking_dir),
+            'angle_to_goal': _former_angle_to_goal(x_norm, y_norm, attacking_dir),
+            'zone': _former_get_zone(x_norm, y_norm),
+            'body_part': metadata.get('body_part', 'foot'),
+            'shot_type': metadata.get('shot_type', 'open_play'),
+            'is_goal': int(is_goal),
+            'under_pressure': int(metadata.get('under_pressure', 0)),
+            'num_defenders': metadata.get('num_defenders_between', 0),
+        })
+    return pd.DataFrame(features_list)
+
+
+def prepare_pass_features_rowwise(df):
+    """Former row-by-row prepare_pass_features (frozen reference; metadata targets only)."""
+    features_list = []
+    for idx, row in df.iterrows():
+        x_start_norm, y_start_norm = _former_normalize_coords(row['x'], row['y'])
+        if 'x_end' in row and 'y_end' in row and pd.notna(row['x_end']) and pd.notna(row['y_end']):
+            x_end_norm, y_end_norm = _former_normalize_coords(row['x_end'], row['y_end'])
+        else:
+            continue
+        metadata = _former_parse_metadata(row.get('metadata', '{}'))
+        leading_to_shot = metadata.get('leading_to_shot', 0)
+        leading_to_goal = metadata.get('leading_to_goal', 0)
+        if isinstance(leading_to_shot, bool):
+            leading_to_shot = 1 if leading_to_shot else 0
+        if isinstance(leading_to_goal, bool):
+            leading_to_goal = 1 if leading_to_goal else 0
+        if leading_to_goal > 0:
+            target_value = 1
+        elif leading_to_shot > 0:
+            target_value = 0.5
+        else:
+            target_value = 0
+        features_list.append({
+            'x_start': x_start_norm,
+            'y_start': y_start_norm,
+            'x_end': x_end_norm,
+            'y_end': y_end_norm,
+            'forward_progress': x_end_norm - x_start_norm,
+            'lateral_progress': abs(y_end_norm - y_start_norm),
+            'zone_start': _former_get_zone(x_start_norm, y_start_norm),
+            'zone_end': _former_get_zone(x_end_norm, y_end_norm),
+            'pass_type': metadata.get('pass_type', 'normal'),
+            'target_value': target_value,
+            'successful': int(metadata.get('successful', 1)),
+            'length': np.sqrt((x_end_norm - x_start_norm)**2 + (y_end_norm - y_start_norm)**2),
+        })
+    return pd.DataFrame(features_list)
+
+
+def _parquet_bytes(df) -> bytes:
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def compare(name: str, rows: pd.DataFrame, rowwise, vectorized) -> dict:
+    """Time both implementations on the same rows and compare their parquet output."""
+    expected, rowwise_seconds = _timed(rowwise, rows)
+    actual, vectorized_seconds = _timed(vectorized, rows)
+    identical = _parquet_bytes(expected) == _parquet_bytes(actual)
+    print(
+        f"{name:<6} {len(rows):>9} rows  row-by-row {rowwise_seconds:8.2f}s  "
+        f"vectorized {vectorized_seconds:7.3f}s  speedup {rowwise_seconds / max(vectorized_seconds, 1e-9):6.1f}x  "
+        f"parquet identical: {'yes' if identical else 'NO'}"
+    )
+    return {
+        "rows": len(rows),
+        "rowwise_seconds": rowwise_seconds,
+        "vectorized_seconds": vectorized_seconds,
+        "identical": identical,
+    }
+
+
+def check_shot_convention(shot_events: pd.DataFrame) -> dict:
+    """
+    Convention change of the shared kernels (shots attack right), against the frozen former code.
+
+    On all shots, every column except distance_to_goal / angle_to_goal must be
+    byte-identical. Those two may only differ for shots the former code had
+    attacking left (y >= 50), and must equal its geometry with the goal on the right.
+    """
+    geometry = ['distance_to_goal', 'angle_to_goal']
+    former = prepare_shot_features_rowwise(shot_events)
+    current = shots.prepare_shot_features(shot_events)
+    others_identical = _parquet_bytes(former.drop(columns=geometry)) == _parquet_bytes(current.drop(columns=geometry))
+
+    attacked_left = shot_events['y'].to_numpy() >= 50
+    changed = np.any(former[geometry].to_numpy() != current[geometry].to_numpy(), axis=1)
+    expected = pd.DataFrame({
+        'distance_to_goal': [_former_distance_to_goal(x, y, "right") for x, y in zip(former['x_shot'], former['y_shot'])],
+        'angle_to_goal': [_former_angle_to_goal(x, y, "right") for x, y in zip(former['x_shot'], former['y_shot'])],
+    })
+    geometry_as_expected = _parquet_bytes(expected) == _parquet_bytes(current[geometry])
+    passed = others_identical and geometry_as_expected and not np.any(changed & ~attacked_left)
+    print(
+        f"{'conv.':<6} {len(shot_events):>9} rows  attack-right convention: {int(changed.sum())} shots with new "
+        f"distance/angle ({int(attacked_left.sum())} formerly attacking left), other columns identical: "
+        f"{'yes' if others_identical else 'NO'}, geometry as expected: {'yes' if geometry_as_expected else 'NO'}"
+    )
+    return {
+        "rows": len(shot_events),
+        "changed_rows": int(changed.sum()),
+        "formerly_left_rows": int(attacked_left.sum()),
+        "identical": passed,
+    }
+
+
+def runtime_parity(name: str, prepared: pd.DataFrame, runtime_features, inputs: list, categorical: dict, defaults: dict, target: str) -> dict:
+    """
+    Encode the runtime features of the same rows and compare them with the one-hot training matrix.
+
+    Args:
+        prepared: Output of prepare_*_features
+        runtime_features: xg_runtime._shot_features / _pass_features
+        inputs: Columns a runtime caller passes (the rest is derived)
+        categorical, defaults, target: As for build_schema
+    """
+    training = pd.get_dummies(prepared, columns=list(categorical), prefix=list(categorical.values())).drop(columns=[target])
+    encoder = FeatureEncoder(build_schema(training.columns, categorical, defaults, target=target))
+    features = runtime_features({column: prepared[column].to_numpy() for column in inputs})
+    encoded = encoder.encode(features, len(prepared))
+    expected = training.to_numpy(dtype=np.float32)
+    mismatched = int(np.sum(np.any(encoded != expected, axis=1))) if len(prepared) else 0
+    print(f"{name:<6} {len(prepared):>9} rows  runtime features identical to training: {'yes' if mismatched == 0 else f'NO ({mismatched} rows differ)'}")
+    return {"rows": len(prepared), "mismatched_rows": mismatched, "identical": mismatched == 0}
+
+
+def check_runtime_parity(events: pd.DataFrame) -> dict:
+    """Train/serve parity of the shot and pass features for an event table."""
+    shot_rows = shots.prepare_shot_features(events[events['event_type'].isin(shots.SHOT_TYPES)])
+    pass_rows = passes.prepare_pass_features(events[events['event_type'].isin(passes.PASS_TYPES)])
+    return {
+        "shots_runtime": runtime_parity(
+            "shots", shot_rows, _shot_features,
+            ['x_shot', 'y_shot', 'body_part', 'shot_type', 'under_pressure', 'num_defenders'],
+            SHOT_CATEGORICAL, SHOT_DEFAULTS, 'is_goal',
+        ),
+        "passes_runtime": runtime_parity(
+            "passes", pass_rows, _pass_features,
+            ['x_start', 'y_start', 'x_end', 'y_end', 'pass_type', 'successful'],
+            PASS_CATEGORICAL, PASS_DEFAULTS, 'target_value',
+        ),
+    }
+
+
+def run_benchmark(csv_path, parity_only: bool = False) -> dict:
+    events, load_seconds = _timed(pd.read_csv, csv_path)
+    print(f"Loaded {len(events)} events in {load_seconds:.1f}s")
+    results = check_runtime_parity(events)
+    if parity_only:
+        return results
+    shot_events = events[events['event_type'].isin(shots.SHOT_TYPES)].copy()
+    # Vectorization: only shots the convention change leaves alone (see check_shot_convention)
+    results["shots"] = compare(
+        "shots", shot_events[shot_events['y'] < 50], prepare_shot_features_rowwise, shots.prepare_shot_features,
+    )
+    results["shots_convention"] = check_shot_convention(shot_events)
+    pass_events = events[events['event_type'].isin(passes.PASS_TYPES)].copy()
+    results["passes"] = compare("passes", pass_events, prepare_pass_features_rowwise, passes.prepare_pass_features)
+
+    labels, label_seconds = _timed(passes.derive_sequence_labels, events)
+    pass_labels = labels[events['event_type'].isin(passes.PASS_TYPES).to_numpy()]
+    print(
+        f"labels {len(events):>9} events in {label_seconds:.2f}s  "
+        f"passes -> shot {np.mean(pass_labels == 0.5):.1%}, -> goal {np.mean(pass_labels == 1.0):.1%}"
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized event feature preparation")
+    parser.add_argument("--csv", help="Existing event CSV (default: generate a synthetic one)")
+    parser.add_argument("--events", type=int, default=1_000_000, help="Synthetic events to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--parity-only", action="store_true", help="Only check train/serve feature parity")
+    args = parser.parse_args()
+
+    if args.csv:
+        results = run_benchmark(args.csv, args.parity_only)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "events.csv")
+            _, seconds = _timed(make_synthetic_events, csv_path, args.events, 300, args.seed)
+            print(f"Generated {args.events} synthetic events in {seconds:.1f}s")
+            results = run_benchmark(csv_path, args.parity_only)
+
+    if not all(result["identical"] for result in results.values()):
+        raise SystemExit("Feature parity check failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Incremental builds of the event datasets, with match-partitioned features.
+
+Cleaned feature rows are stored as one parquet file per match, next to a
+manifest:
+
+    <dataset_dir>/manifest.json
+    <dataset_dir>/matches/match-<match_id>.parquet
+
+The manifest records, for each input CSV, its size, mtime and SHA-256, its
+ingested parquet parts (see ingest.py) and the matches it contains. It also
+records a fingerprint of the feature code. On each run:
+
+- Unchanged files are skipped. A file is unchanged when its size and mtime
+  match the manifest, or when its hash does.
+- New and changed files are ingested.
+- The matches of new, changed and removed files are featurized again. The
+  rows come from the ingested parts of every file that contains the match,
+  so a match split over several files is still featurized as a whole.
+- Everything is rebuilt when the feature code changes, or when
+  rebuild=True is passed.
+
+The train/valid views are assembled from all partitions in match_id order.
+They are split by match, using a seeded hash of the match_id. A match stays
+in the same split as other matches are added, and an incremental build
+gives the same views as a full rebuild.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from ingest import ingest_events, print_ingest_summary, read_parts
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# Share of matches in the validation view, and the seed of the match hash
+VALID_FRACTION = 0.2
+SPLIT_SEED = 42
+
+
+def file_sha256(path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(paths) -> str:
+    """SHA-256 over the feature code (a change rebuilds every partition)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+def partition_path(dataset_dir, match_id) -> Path:
+    """Parquet file holding the feature rows of one match."""
+    return Path(dataset_dir) / "matches" / f"match-{quote(str(match_id), safe='')}.parquet"
+
+
+def load_manifest(dataset_dir):
+    """Manifest of a dataset directory, or None if missing, unreadable or of another version."""
+    try:
+        with open(Path(dataset_dir) / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def _save_manifest(dataset_dir, manifest) -> None:
+    """Write the manifest atomically (a crash leaves the previous one)."""
+    path = Path(dataset_dir) / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _with_match_id(events: pd.DataFrame) -> pd.DataFrame:
+    """Events with a string match_id ('' where missing)."""
+    if 'match_id' not in events.columns:
+        return events.assign(match_id='')
+    return events.assign(match_id=events['match_id'].fillna('').astype(str))
+
+
+def _read_parts(parts) -> pd.DataFrame:
+    events = read_parts(parts)
+    return _with_match_id(events) if len(events.columns) else events
+
+
+def _file_state(path) -> dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def update_dataset(
+    csv_files,
+    dataset_dir,
+    ingest_dir,
+    event_types,
+    featurize,
+    code_fingerprint: str,
+    context_columns=None,
+    rebuild: bool = False,
+) -> dict:
+    """
+    Bring the match partitions of a dataset up to date with the event CSVs.
+
+    Args:
+        csv_files: Current input CSVs (file names must be unique)
+        dataset_dir: Directory of the manifest and the match partitions
+        ingest_dir: Output directory for ingest_events
+        event_types: Event types to ingest
+        featurize: Callable (events DataFrame) -> cleaned feature rows with a match_id column
+        code_fingerprint: Fingerprint of the feature code (see source_fingerprint)
+        context_columns: Passed to ingest_events
+        rebuild: Ignore the manifest and rebuild everything
+
+    Returns:
+        Build summary: manifest, unchanged / processed / removed / failed
+        files, matches (re-featurized), rows (their feature rows), seconds
+    """
+    start = time.time()
+    dataset_dir = Path(dataset_dir)
+    manifest = None if rebuild else load_manifest(dataset_dir)
+    if manifest is None or manifest.get('code') != code_fingerprint:
+        if manifest is not None:
+            print("Feature code changed, rebuilding all partitions")
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        shutil.rmtree(ingest_dir, ignore_errors=True)
+        manifest = {'version': MANIFEST_VERSION, 'code': code_fingerprint, 'files': {}, 'partitions': {}}
+    files = manifest['files']
+
+    # Compare the CSVs with the manifest (stat first, hash only if the stat changed)
+    current = {Path(f).name: Path(f) for f in csv_files}
+    removed = sorted(set(files) - set(current))
+    unchanged, changed, states = [], [], {}
+    for name in sorted(current):
+        state = _file_state(current[name])
+        entry = files.get(name)
+        if entry is not None and all(os.path.exists(part) for part in entry['parts']):
+            if state == {key: entry[key] for key in state}:
+                unchanged.append(name)
+                continue
+            sha256 = file_sha256(current[name])
+            if sha256 == entry['sha256']:
+                entry.update(state)  # Touched, not changed
+                unchanged.append(name)
+                continue
+        else:
+            sha256 = file_sha256(current[name])
+        changed.append(name)
+        states[name] = {'sha256': sha256, **state}
+    print(f"Files: {len(unchanged)} unchanged, {len(changed)} new/changed, {len(removed)} removed")
+
+    # Matches whose rows may have changed: those of removed and changed files, before and after
+    affected = set()
+    for name in removed + changed:
+        entry = files.pop(name, None)
+        if entry is not None:
+            affected.update(entry['matches'])
+    for name in removed:
+        shutil.rmtree(Path(ingest_dir) / Path(name).stem, ignore_errors=True)
+
+    failed = []
+    if changed:
+        ingest_stats = ingest_events(
+            [current[name] for name in changed], ingest_dir, event_types, context_columns=context_columns,
+        )
+        print_ingest_summary(ingest_stats)
+        for file_stats in ingest_stats:
+            name = Path(file_stats['file']).name
+            if file_stats['error']:
+                failed.append(name)
+                continue
+            matches = sorted(set(_read_parts(file_stats['parts']).get('match_id', [])))
+            files[name] = {
+                **states[name],
+                'rows_read': file_stats['rows_read'],
+                'rows_kept': file_stats['rows_kept'],
+                'rows_written': file_stats['rows_written'],
+                'parts': file_stats['parts'],
+                'matches': matches,
+            }
+            affected.update(matches)
+
+    # Re-featurize the affected matches from every file that contains them
+    rows = 0
+    if affected:
+        sources = [name for name in sorted(files) if affected.intersection(files[name]['matches'])]
+        events = _read_parts([part for name in sources for part in files[name]['parts']])
+        if len(events):
+            events = events[events['match_id'].isin(affected)].reset_index(drop=True)
+        print(f"Featurizing {len(affected)} match(es) from {len(sources)} file(s)...")
+        features = featurize(events) if len(events) else pd.DataFrame(columns=['match_id'])
+
+        partitions = manifest['partitions']
+        for match_id in affected:
+            path = partitions.pop(match_id, None)
+            if path is not None:
+                (dataset_dir / path).unlink(missing_ok=True)
+        (dataset_dir / "matches").mkdir(parents=True, exist_ok=True)
+        for match_id, match_rows in features.groupby('match_id', sort=True):
+            path = partition_path(dataset_dir, match_id)
+            match_rows.to_parquet(path, index=False)
+            partitions[match_id] = str(path.relative_to(dataset_dir))
+        rows = len(features)
+
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    _save_manifest(dataset_dir, manifest)
+    return {
+        'manifest': manifest,
+        'unchanged': unchanged,
+        'processed': [name for name in changed if name not in failed],
+        'removed': removed,
+        'failed': failed,
+        'matches': len(affected),
+        'rows': rows,
+        'seconds': time.time() - start,
+    }
+
+
+def load_partitions(dataset_dir, manifest) -> pd.DataFrame:
+    """All feature rows of a dataset, in match_id order."""
+    partitions = manifest['partitions']
+    frames = [pd.read_parquet(Path(dataset_dir) / partitions[match_id]) for match_id in sorted(partitions)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def match_split(match_ids, valid_fraction: float = VALID_FRACTION, seed: int = SPLIT_SEED) -> np.ndarray:
+    """
+    Validation mask from a seeded hash of each match_id.
+
+    A match always lands on the same side, whatever other matches are in
+    the dataset.
+    """
+    unique, inverse = np.unique(np.asarray(match_ids, dtype=str), return_inverse=True)
+    buckets = np.array([
+        int.from_bytes(hashlib.sha256(f"{seed}:{match_id}".encode()).digest()[:8], 'big') / 2**64
+        for match_id in unique
+    ])
+    return buckets[inverse] < valid_fraction if len(unique) else np.zeros(0, dtype=bool)
+
+
+def split_by_match(df: pd.DataFrame, valid_fraction: float = VALID_FRACTION, seed: int = SPLIT_SEED, stratify=None):
+    """
+    Deterministic train/valid split by match.
+
+    Falls back to a seeded row split (stratified by `stratify` if given)
+    when all matches land on the same side, e.g. with only a few matches.
+    """
+    is_valid = match_split(df['match_id'], valid_fraction, seed)
+    if is_valid.all() or not is_valid.any():
+        print(f"  ⚠ Warning: Only {df['match_id'].nunique()} match(es), splitting rows instead of matches")
+        return train_test_split(df, test_size=valid_fraction, random_state=seed, stratify=stratify)
+    return df[~is_valid], df[is_valid]
+
+
+def print_build_summary(build) -> None:
+    """One line per build in the style of the preparation scripts."""
+    for name in build['removed']:
+        print(f"  Removed: {name}")
+    print(
+        f"Partitions: {len(build['manifest']['partitions'])} match(es), "
+        f"{build['matches']} rebuilt ({build['rows']} rows) in {build['seconds']:.1f}s"
+    )
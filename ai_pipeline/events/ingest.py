@@ -0,0 +1,178 @@
+"""
+Shared ingestion of event CSVs for the dataset preparation scripts.
+
+Each CSV in data/events/ is read in chunks, in parallel worker processes
+(one file per worker), with explicit column dtypes. Only rows with the
+requested event types are kept, and each filtered chunk is written as its
+own parquet part:
+
+    <output_dir>/<file stem>/part-00000.parquet
+    <output_dir>/<file stem>/part-00001.parquet
+    ...
+
+Peak memory while reading is bounded by the chunk size per worker, not by
+the total event history; only the filtered rows are loaded afterwards.
+
+Consumers that need the position of events in the match sequence (pass
+targets count events) pass context_columns: then every row of the file is
+kept. The rows of other event types are written to their own parts with
+only the context columns (part-00000.context.parquet next to
+part-00000.parquet), and both carry the row number in the file so
+read_parts restores the file order. The pass dataset ingests this way, so
+its parts hold every event, not just passes.
+"""
+
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Columns of the exported event CSVs and their dtypes (other columns are not read)
+EVENT_DTYPES = {
+    'match_id': 'str',
+    'team': 'str',
+    'player_id': 'str',
+    'event_type': 'str',
+    'timestamp': 'float64',
+    'minute': 'float64',
+    'x': 'float64',
+    'y': 'float64',
+    'x_end': 'float64',
+    'y_end': 'float64',
+    'metadata': 'str',
+}
+
+DEFAULT_CHUNKSIZE = 200_000
+
+# Row number in the source file, written with context_columns to restore the file order
+ROW_COLUMN = '_row'
+
+
+def _ingest_file(csv_path: str, output_dir: str, event_types: tuple, chunksize: int, context_columns: tuple) -> dict:
+    """Worker: filter one CSV chunk by chunk into parquet parts. Returns per-file stats."""
+    start = time.time()
+    stats = {'file': csv_path, 'rows_read': 0, 'rows_kept': 0, 'rows_written': 0, 'parts': [], 'error': None}
+    part_dir = Path(output_dir) / Path(csv_path).stem
+    shutil.rmtree(part_dir, ignore_errors=True)
+    try:
+        reader = pd.read_csv(
+            csv_path,
+            dtype=EVENT_DTYPES,
+            usecols=lambda column: column in EVENT_DTYPES,
+            chunksize=chunksize,
+        )
+        for index, chunk in enumerate(reader):
+            if 'event_type' not in chunk.columns:
+                raise ValueError("Missing required column 'event_type'")
+            selected = chunk['event_type'].isin(event_types).to_numpy()
+            if context_columns:
+                # Other events stay in the sequence, with only the context columns
+                rows = np.arange(stats['rows_read'], stats['rows_read'] + len(chunk))
+                context = [column for column in chunk.columns if column in context_columns]
+                outputs = [
+                    ("", chunk[selected].assign(**{ROW_COLUMN: rows[selected]})),
+                    (".context", chunk.loc[~selected, context].assign(**{ROW_COLUMN: rows[~selected]})),
+                ]
+            else:
+                outputs = [("", chunk[selected])]
+            stats['rows_read'] += len(chunk)
+            stats['rows_kept'] += int(selected.sum())
+
+            for suffix, rows_out in outputs:
+                if len(rows_out) == 0:
+                    continue
+                part_dir.mkdir(parents=True, exist_ok=True)
+                part_path = part_dir / f"part-{index:05d}{suffix}.parquet"
+                rows_out.to_parquet(part_path, index=False)
+                stats['rows_written'] += len(rows_out)
+                stats['parts'].append(str(part_path))
+    except Exception as e:
+        stats['error'] = f"{type(e).__name__}: {e}"
+        shutil.rmtree(part_dir, ignore_errors=True)
+        stats['parts'] = []
+        stats['rows_kept'] = 0
+        stats['rows_written'] = 0
+    stats['seconds'] = time.time() - start
+    return stats
+
+
+def ingest_events(
+    csv_files,
+    output_dir,
+    event_types,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    workers: int = None,
+    context_columns=None,
+) -> list:
+    """
+    Filter event CSVs into partitioned parquet.
+
+    Args:
+        csv_files: CSV paths
+        output_dir: Output directory (the subdirectory of each file is replaced)
+        event_types: Event types to keep
+        chunksize: Rows per read chunk (bounds memory per worker)
+        workers: Worker processes (default: one per file, up to the CPU count)
+        context_columns: If given, rows of other event types are kept with
+            only these columns (in .context parts) instead of being dropped
+
+    Returns:
+        Per-file stats: file, rows_read, rows_kept (of the event types),
+        rows_written (with context rows), parts, seconds, error
+    """
+    csv_files = sorted(str(f) for f in csv_files)
+    os.makedirs(output_dir, exist_ok=True)
+    if not csv_files:
+        return []
+
+    workers = workers or min(len(csv_files), os.cpu_count() or 1)
+    args = [(f, str(output_dir), tuple(event_types), chunksize, tuple(context_columns or ())) for f in csv_files]
+    if workers <= 1:
+        return [_ingest_file(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_ingest_file, *zip(*args)))
+
+
+def read_parts(parts) -> pd.DataFrame:
+    """
+    Concatenate parquet parts written by ingest_events, in the order given (file order,
+    then chunk order); context parts are merged back into the file order of their rows.
+    """
+    frames = [pd.read_parquet(part) for part in parts]
+    if not frames:
+        return pd.DataFrame()
+    events = pd.concat(frames, ignore_index=True)
+    if ROW_COLUMN in events.columns:
+        # Files in the order given, rows in file order within each file
+        file_codes = pd.factorize(pd.Index([str(Path(part).parent) for part in parts]))[0]
+        file_index = np.repeat(file_codes, [len(frame) for frame in frames])
+        order = np.lexsort((events[ROW_COLUMN].to_numpy(), file_index))
+        events = events.iloc[order].drop(columns=ROW_COLUMN).reset_index(drop=True)
+    return events
+
+
+def load_events(stats) -> pd.DataFrame:
+    """Events of the parquet parts written by ingest_events (see read_parts)."""
+    parts = [part for file_stats in stats for part in file_stats['parts']]
+    if not parts:
+        return pd.DataFrame(columns=list(EVENT_DTYPES))
+    return read_parts(parts)
+
+
+def print_ingest_summary(stats) -> None:
+    """Per-file lines in the style of the preparation scripts."""
+    for file_stats in stats:
+        name = Path(file_stats['file']).name
+        if file_stats['error']:
+            print(f"  ⚠ Warning: Could not load {name}: {file_stats['error']}")
+        else:
+            written = file_stats.get('rows_written', file_stats['rows_kept'])
+            context = f", {written} written with sequence context" if written != file_stats['rows_kept'] else ""
+            print(
+                f"Loaded: {name} ({file_stats['rows_kept']}/{file_stats['rows_read']} rows kept{context}, "
+                f"{len(file_stats['parts'])} part(s), {file_stats['seconds']:.1f}s)"
+            )
@@ -4,46 +4,52 @@ Prepare pass dataset from event CSVs for pass value training.
 Expects CSV files in data/events/ with columns:
 - match_id, team, player_id, event_type, timestamp, x, y
 - For passes: x_end, y_end (end coordinates)
-- metadata (JSON string) with fields like: leading_to_shot, leading_to_goal, etc.
+- metadata (JSON string) with fields like: pass_type, successful, etc.
 - minute (optional)
+
+Targets are derived from the event sequence: a pass is worth 1.0 if the
+same team scores within the next LABEL_WINDOW_EVENTS events and
+LABEL_WINDOW_SECONDS seconds, 0.5 if it shoots in that window, else 0.
+leading_to_goal / leading_to_shot metadata flags, where exported, are
+also honoured.
+
+Builds are incremental (see incremental.py): only new or changed CSVs are
+read, features are stored per match, and the train/valid files are
+assembled from the match partitions with a deterministic split by match.
+Pass --rebuild to rebuild everything.
 """
 
 import os
+import argparse
 import json
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+
+import incremental
+import ingest
+import prepare_shot_dataset
+from incremental import load_partitions, print_build_summary, source_fingerprint, split_by_match, update_dataset
+from prepare_shot_dataset import SHOT_TYPES, parse_metadata_column
+
+# Shared feature kernels (importable once prepare_shot_dataset has set up the path)
+import ai_pipeline.runtime.features as shared_features
+from ai_pipeline.runtime.features import get_zones, normalize_coords, progression
 
 EVENTS_DIR = "data/events"
 OUTPUT_DIR = "data/processed"
 OUTPUT_TRAIN = os.path.join(OUTPUT_DIR, "passes_train.parquet")
 OUTPUT_VALID = os.path.join(OUTPUT_DIR, "passes_valid.parquet")
+INGEST_DIR = os.path.join(OUTPUT_DIR, "events", "passes")  # Filtered events, partitioned parquet
+DATASET_DIR = os.path.join(OUTPUT_DIR, "passes")  # Manifest and per-match features
 
 # Pass event types
 PASS_TYPES = ["pass", "key_pass", "assist", "cross", "through_ball"]
 
-
-def normalize_coords(x, y):
-    """Convert from 0-100 coordinates to 0-1 normalized."""
-    return x / 100.0, y / 100.0
-
-
-def get_zone(x_norm, y_norm):
-    """
-    Map coordinates to zones.
-    Returns: 'Self box', 'Def third', 'Middle', 'Att third', 'Opp box'
-    """
-    if x_norm < 0.18:
-        return "Self box"
-    elif x_norm < 0.33:
-        return "Def third"
-    elif x_norm < 0.67:
-        return "Middle"
-    elif x_norm < 0.82:
-        return "Att third"
-    else:
-        return "Opp box"
+# Label window: a shot/goal by the same team within this many events and seconds after the pass
+LABEL_WINDOW_EVENTS = 10
+LABEL_WINDOW_SECONDS = 15.0
+SEQUENCE_COLUMNS = ['match_id', 'team', 'event_type', 'timestamp']
 
 
 def parse_metadata(metadata_str):
@@ -58,76 +64,184 @@ def parse_metadata(metadata_str):
         return {}
 
 
-def prepare_pass_features(df):
-    """Create features for pass dataset."""
-    features_list = []
+def _goal_flags(metadata):
+    """is_goal from shot metadata (bools and numbers, as in prepare_shot_dataset)."""
+    flags = np.zeros(len(metadata), dtype=bool)
+    for i, m in enumerate(metadata):
+        flags[i] = int(m.get('is_goal', 0)) > 0
+    return flags
+
+
+def _next_within(group, position, timestamp, targets, max_events, max_seconds):
+    """
+    For every event: is one of the target events (same group) within the window after it?
+    
+    Events are keyed by (group, position in the match sequence); one
+    searchsorted over the sorted target keys finds each event's next target.
+    """
+    stride = len(position) + 1
+    keys = group * stride + position
+    target_order = np.argsort(keys[targets], kind='stable')
+    target_keys = keys[targets][target_order]
+    target_times = timestamp[targets][target_order]
+    if len(target_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    
+    nxt = np.searchsorted(target_keys, keys, side='right')
+    found = nxt < len(target_keys)
+    nxt = np.minimum(nxt, len(target_keys) - 1)
+    next_keys = target_keys[nxt]
+    within = found & (next_keys // stride == group)
+    if max_events is not None:
+        within &= (next_keys % stride) - position <= max_events
+    if max_seconds is not None:
+        within &= target_times[nxt] - timestamp <= max_seconds
+    return within
+
+
+def derive_sequence_labels(events, max_events=LABEL_WINDOW_EVENTS, max_seconds=LABEL_WINDOW_SECONDS):
+    """
+    Pass targets from the event sequence.
+    
+    Events are ordered by match and timestamp (file order for ties). An
+    event is labelled 1.0 if the same team has a goal within the next
+    max_events events and max_seconds seconds, 0.5 if it has a shot in that
+    window, else 0.0. Either limit can be None.
+    
+    Args:
+        events: All events (passes and shots), with match_id, team, event_type, timestamp
+    
+    Returns:
+        float64 array aligned with the rows of events
+    """
+    n = len(events)
+    match_codes = pd.factorize(events['match_id'])[0].astype(np.int64)
+    team_codes = pd.factorize(events['team'])[0].astype(np.int64)
+    group = match_codes * (team_codes.max() + 2) + team_codes + 1
+    timestamp = events['timestamp'].to_numpy(dtype=np.float64)
+    
+    # Position of each event in its match sequence (globally increasing, so gaps count events)
+    order = np.lexsort((np.arange(n), timestamp, match_codes))
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
     
-    for idx, row in df.iterrows():
-        # Start coordinates
-        x_start_norm, y_start_norm = normalize_coords(row['x'], row['y'])
-        
-        # End coordinates (if available)
-        if 'x_end' in row and 'y_end' in row and pd.notna(row['x_end']) and pd.notna(row['y_end']):
-            x_end_norm, y_end_norm = normalize_coords(row['x_end'], row['y_end'])
-        else:
-            # If no end coordinates, skip or use start (skip for now)
-            continue
-        
-        # Progress metrics
-        forward_progress = x_end_norm - x_start_norm  # Positive = forward
-        lateral_progress = abs(y_end_norm - y_start_norm)
-        
-        # Zones
-        zone_start = get_zone(x_start_norm, y_start_norm)
-        zone_end = get_zone(x_end_norm, y_end_norm)
-        
-        # Parse metadata
-        metadata = parse_metadata(row.get('metadata', '{}'))
-        
-        # Features
-        features = {
-            'x_start': x_start_norm,
-            'y_start': y_start_norm,
-            'x_end': x_end_norm,
-            'y_end': y_end_norm,
-            'forward_progress': forward_progress,
-            'lateral_progress': lateral_progress,
-            'zone_start': zone_start,
-            'zone_end': zone_end,
-        }
-        
-        # Pass type
-        pass_type = metadata.get('pass_type', 'normal')
-        features['pass_type'] = pass_type
-        
-        # Target: leading_to_shot or leading_to_goal (if available)
-        # For now, use placeholder if not available
-        leading_to_shot = metadata.get('leading_to_shot', 0)
-        leading_to_goal = metadata.get('leading_to_goal', 0)
-        
-        if isinstance(leading_to_shot, bool):
-            leading_to_shot = 1 if leading_to_shot else 0
-        if isinstance(leading_to_goal, bool):
-            leading_to_goal = 1 if leading_to_goal else 0
-        
-        # Use leading_to_goal as primary target (xA-like), fallback to leading_to_shot
-        if leading_to_goal > 0:
-            features['target_value'] = 1
-        elif leading_to_shot > 0:
-            features['target_value'] = 0.5  # Intermediate value
-        else:
-            features['target_value'] = 0
-        
-        # Additional features
-        features['successful'] = int(metadata.get('successful', 1))
-        features['length'] = np.sqrt((x_end_norm - x_start_norm)**2 + (y_end_norm - y_start_norm)**2)
-        
-        features_list.append(features)
+    event_type = events['event_type'].to_numpy()
+    is_shot = np.isin(event_type, SHOT_TYPES)
+    is_goal = event_type == 'goal'
+    shot_rows = np.flatnonzero(is_shot)
+    if 'metadata' in events.columns and len(shot_rows):
+        is_goal[shot_rows] |= _goal_flags(parse_metadata_column(events['metadata'].to_numpy()[shot_rows].tolist()))
     
-    return pd.DataFrame(features_list)
+    shot_next = _next_within(group, position, timestamp, is_shot | is_goal, max_events, max_seconds)
+    goal_next = _next_within(group, position, timestamp, is_goal, max_events, max_seconds)
+    return np.where(goal_next, 1.0, np.where(shot_next, 0.5, 0.0))
+
+
+def prepare_pass_features(df, sequence_target=None):
+    """
+    Create features for pass dataset (vectorized, with the runtime's feature kernels).
+    
+    Args:
+        df: Pass events
+        sequence_target: Optional targets from derive_sequence_labels, aligned
+            with df; the target is the higher of it and the metadata flags
+    """
+    # Passes without end coordinates are skipped
+    if 'x_end' not in df.columns or 'y_end' not in df.columns:
+        return pd.DataFrame()
+    has_end = (df['x_end'].notna() & df['y_end'].notna()).to_numpy()
+    rows = df[has_end]
+    
+    # Normalized coordinates
+    x_start_norm, y_start_norm = normalize_coords(rows['x'].to_numpy(dtype=np.float64), rows['y'].to_numpy(dtype=np.float64))
+    x_end_norm, y_end_norm = normalize_coords(rows['x_end'].to_numpy(dtype=np.float64), rows['y_end'].to_numpy(dtype=np.float64))
+    
+    # Parse metadata
+    if 'metadata' in rows.columns:
+        metadata = parse_metadata_column(rows['metadata'].tolist())
+    else:
+        metadata = [{} for _ in range(len(rows))]
+    
+    # Target from metadata flags (if available): leading_to_goal = 1, leading_to_shot = 0.5
+    leading_to_goal = np.array([int(m.get('leading_to_goal', 0)) for m in metadata], dtype=np.int64)
+    leading_to_shot = np.array([int(m.get('leading_to_shot', 0)) for m in metadata], dtype=np.int64)
+    target_value = np.where(leading_to_goal > 0, 1.0, np.where(leading_to_shot > 0, 0.5, 0.0))
+    if sequence_target is not None:
+        target_value = np.maximum(target_value, np.asarray(sequence_target, dtype=np.float64)[has_end])
+    
+    progress = progression(x_start_norm, y_start_norm, x_end_norm, y_end_norm)
+    return pd.DataFrame({
+        'x_start': x_start_norm,
+        'y_start': y_start_norm,
+        'x_end': x_end_norm,
+        'y_end': y_end_norm,
+        # Progress metrics (positive forward progress = forward)
+        'forward_progress': progress['forward_progress'],
+        'lateral_progress': progress['lateral_progress'],
+        'zone_start': get_zones(x_start_norm).tolist(),
+        'zone_end': get_zones(x_end_norm).tolist(),
+        'pass_type': [m.get('pass_type', 'normal') for m in metadata],
+        'target_value': target_value,
+        'successful': [int(m.get('successful', 1)) for m in metadata],
+        'length': progress['length'],
+    })
+
+
+def clean_pass_features(passes_df):
+    """Drop passes with missing coordinates/targets or coordinates off the pitch."""
+    # Remove NaN
+    passes_df = passes_df.dropna(subset=['x_start', 'y_start', 'x_end', 'y_end', 'target_value'])
+    
+    # Remove extreme values
+    return passes_df[
+        (passes_df['x_start'] >= 0) & (passes_df['x_start'] <= 1) &
+        (passes_df['y_start'] >= 0) & (passes_df['y_start'] <= 1) &
+        (passes_df['x_end'] >= 0) & (passes_df['x_end'] <= 1) &
+        (passes_df['y_end'] >= 0) & (passes_df['y_end'] <= 1)
+    ]
+
+
+def featurize_passes(events_df):
+    """Cleaned pass features of ingested events, with their match_id (one partition per match)."""
+    is_pass = events_df['event_type'].isin(PASS_TYPES).to_numpy()
+    pass_events = events_df[is_pass]
+    
+    # Targets from the event sequence (needs all events of the match, not just passes)
+    sequence_target = None
+    missing_sequence_cols = [col for col in SEQUENCE_COLUMNS if col not in events_df.columns]
+    if missing_sequence_cols:
+        print(f"  ⚠ Warning: Missing {missing_sequence_cols}, targets come from metadata flags only.")
+    else:
+        sequence_target = derive_sequence_labels(events_df)[is_pass]
+    
+    # Check required columns
+    required_cols = ['x', 'y']
+    missing_cols = [col for col in required_cols if col not in pass_events.columns]
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+    
+    # Check for end coordinates
+    if 'x_end' not in pass_events.columns or 'y_end' not in pass_events.columns:
+        print("  ⚠ Warning: x_end and y_end columns not found, passes are skipped.")
+        print("  Consider adding these columns to your CSV exports.")
+        return pd.DataFrame(columns=['match_id'])
+    
+    passes_df = prepare_pass_features(pass_events, sequence_target)
+    has_end = (pass_events['x_end'].notna() & pass_events['y_end'].notna()).to_numpy()
+    passes_df.insert(0, 'match_id', pass_events['match_id'].to_numpy()[has_end])
+    cleaned = clean_pass_features(passes_df)
+    print(
+        f"  {len(pass_events)} pass events, {len(passes_df)} with end coordinates, "
+        f"removed {len(passes_df) - len(cleaned)} invalid rows"
+    )
+    return cleaned
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Prepare the pass dataset for pass value training")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the manifest and rebuild all partitions")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Preparing Pass Dataset for Pass Value Training")
     print("=" * 60)
@@ -148,77 +262,34 @@ def main():
     print(f"Found {len(csv_files)} CSV file(s)")
     print()
     
-    # Load all CSVs
-    all_events = []
-    for csv_file in csv_files:
-        print(f"Loading: {csv_file.name}")
-        try:
-            df = pd.read_csv(csv_file)
-            all_events.append(df)
-        except Exception as e:
-            print(f"  ⚠ Warning: Could not load {csv_file.name}: {e}")
-            continue
-    
-    if not all_events:
-        print("❌ No valid CSV files loaded!")
+    # Ingest new/changed CSVs (parallel, chunked) and rebuild their matches. Passes and
+    # shots/goals are kept; other events only keep the columns that place them in the
+    # match sequence (targets count events)
+    print(f"Targets: shot/goal by the same team within {LABEL_WINDOW_EVENTS} events and {LABEL_WINDOW_SECONDS:g}s")
+    try:
+        build = update_dataset(
+            csv_files, DATASET_DIR, INGEST_DIR, PASS_TYPES + SHOT_TYPES + ["goal"], featurize_passes,
+            source_fingerprint([__file__, prepare_shot_dataset.__file__, shared_features.__file__, ingest.__file__, incremental.__file__]),
+            context_columns=SEQUENCE_COLUMNS,
+            rebuild=args.rebuild,
+        )
+    except ValueError as e:
+        print(f"❌ Error: {e}")
         return
-    
-    # Combine all events
-    events_df = pd.concat(all_events, ignore_index=True)
-    print(f"Total events loaded: {len(events_df)}")
+    print_build_summary(build)
     print()
     
-    # Filter passes
-    print("Filtering pass events...")
-    pass_events = events_df[events_df['event_type'].isin(PASS_TYPES)].copy()
-    print(f"Pass events found: {len(pass_events)}")
-    
-    if len(pass_events) == 0:
-        print("❌ No pass events found!")
-        print(f"Expected event_type to be one of: {PASS_TYPES}")
-        return
-    
-    # Check required columns
-    required_cols = ['x', 'y']
-    missing_cols = [col for col in required_cols if col not in pass_events.columns]
-    if missing_cols:
-        print(f"❌ Error: Missing required columns: {missing_cols}")
+    if not build['manifest']['files']:
+        print("❌ No valid CSV files loaded!")
         return
     
-    # Check for end coordinates
-    if 'x_end' not in pass_events.columns or 'y_end' not in pass_events.columns:
-        print("⚠ Warning: x_end and y_end columns not found.")
-        print("  Passes without end coordinates will be skipped.")
-        print("  Consider adding these columns to your CSV exports.")
-    
-    # Prepare features
-    print("Creating features...")
-    passes_df = prepare_pass_features(pass_events)
-    print(f"Features created: {len(passes_df)} passes (with end coordinates)")
-    print()
-    
+    # Assemble the dataset from the match partitions
+    passes_df = load_partitions(DATASET_DIR, build['manifest'])
     if len(passes_df) == 0:
         print("❌ No passes with valid end coordinates!")
+        print(f"Expected event_type to be one of: {PASS_TYPES}")
         return
-    
-    # Clean data
-    print("Cleaning data...")
-    initial_count = len(passes_df)
-    
-    # Remove NaN
-    passes_df = passes_df.dropna(subset=['x_start', 'y_start', 'x_end', 'y_end', 'target_value'])
-    
-    # Remove extreme values
-    passes_df = passes_df[
-        (passes_df['x_start'] >= 0) & (passes_df['x_start'] <= 1) &
-        (passes_df['y_start'] >= 0) & (passes_df['y_start'] <= 1) &
-        (passes_df['x_end'] >= 0) & (passes_df['x_end'] <= 1) &
-        (passes_df['y_end'] >= 0) & (passes_df['y_end'] <= 1)
-    ]
-    
-    final_count = len(passes_df)
-    print(f"  Removed {initial_count - final_count} invalid rows")
-    print(f"  Final dataset: {final_count} passes")
+    print(f"Final dataset: {len(passes_df)} passes from {passes_df['match_id'].nunique()} match(es)")
     print()
     
     # Check target distribution
@@ -234,15 +305,11 @@ def main():
     passes_df = pd.get_dummies(passes_df, columns=['zone_start', 'zone_end', 'pass_type'], 
                                prefix=['zone_start', 'zone_end', 'type'])
     
-    # Split train/valid
-    print("Splitting train/validation (80/20)...")
-    # Use stratified split if possible (bin target for stratification)
-    passes_df['target_bin'] = pd.cut(passes_df['target_value'], bins=[-0.1, 0.1, 0.6, 1.1], labels=[0, 1, 2])
-    train_df, valid_df = train_test_split(passes_df, test_size=0.2, random_state=42, 
-                                          stratify=passes_df['target_bin'])
-    passes_df = passes_df.drop('target_bin', axis=1)
-    train_df = train_df.drop('target_bin', axis=1)
-    valid_df = valid_df.drop('target_bin', axis=1)
+    # Split train/valid by match
+    print(f"Splitting train/validation by match ({1 - incremental.VALID_FRACTION:.0%}/{incremental.VALID_FRACTION:.0%} of matches)...")
+    # Binned target, for the row split fallback
+    target_bin = pd.cut(passes_df['target_value'], bins=[-0.1, 0.1, 0.6, 1.1], labels=[0, 1, 2])
+    train_df, valid_df = split_by_match(passes_df, stratify=target_bin)
     
     print(f"  Train: {len(train_df)} passes")
     print(f"  Valid: {len(valid_df)} passes")
@@ -258,13 +325,12 @@ def main():
     print("=" * 60)
     print(f"Train: {OUTPUT_TRAIN}")
     print(f"Valid: {OUTPUT_VALID}")
-    print(f"Features: {len(passes_df.columns) - 1} (excluding target)")
+    print(f"Features: {len(passes_df.columns) - 2} (excluding target and match_id)")
     print()
-    print("Note: If target_value is all zeros, you may need to add")
-    print("      'leading_to_shot' or 'leading_to_goal' to metadata in your CSV exports.")
+    print("Note: If target_value is all zeros, check that shots (with is_goal in")
+    print("      metadata) are exported alongside passes, with match_id, team and timestamp.")
     print("=" * 60)
 
 
 if __name__ == "__main__":
     main()
-
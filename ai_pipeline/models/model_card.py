@@ -0,0 +1,268 @@
+"""
+Grouped cross-validation and model cards for the analytics models.
+
+Used by train_xg_shots.py and train_pass_value.py after training:
+
+- cross_validate runs grouped k-fold CV (folds by match_id, so a match is
+  never in both the training and the held-out part of a fold). It uses the
+  configuration of the trained model, with the folds trained in parallel
+  worker processes.
+- measure_latency times the runtime entry points (predict_shot_xg /
+  predict_pass_value and their _batch versions) on raw event fields, so
+  the numbers include feature derivation and encoding as well as the
+  model. It reports p50/p99 for single events and for 10k-event batches.
+- write_model_card saves <model>.card.json next to the .pkl. The card holds
+  the CV and holdout metrics, the latency, the model size and the training
+  configuration, so models can be compared on accuracy and serving cost.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import (
+    brier_score_loss,
+    log_loss,
+    mean_absolute_error,
+    mean_squared_error,
+    r2_score,
+    roc_auc_score,
+)
+from sklearn.model_selection import GroupKFold, KFold
+
+from ai_pipeline.runtime.feature_schema import load_schema, schema_path
+from ai_pipeline.runtime.tree_export import tree_path
+
+DEFAULT_FOLDS = 5
+LATENCY_BATCH_ROWS = 10_000
+SINGLE_ROW_REPEATS = 500
+BATCH_REPEATS = 30
+
+
+def card_path(model_path) -> Path:
+    """Model card stored next to a model file."""
+    return Path(model_path).with_suffix('.card.json')
+
+
+def score_predictions(task: str, y_true, y_pred) -> dict:
+    """Metrics of the training scripts: AUC / log loss / Brier (binary) or RMSE / MAE / R² (regression)."""
+    if task == 'binary':
+        return {
+            'auc': float(roc_auc_score(y_true, y_pred)),
+            'logloss': float(log_loss(y_true, y_pred, labels=[0, 1])),
+            'brier': float(brier_score_loss(y_true, y_pred)),
+        }
+    return {
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'r2': float(r2_score(y_true, y_pred)),
+    }
+
+
+def model_spec(model, model_type: str, params: dict = None) -> dict:
+    """
+    How to retrain a model's configuration on each fold.
+
+    LightGBM boosters are retrained with their parameters and tree count;
+    sklearn-API models (XGBoost, sklearn) are cloned unfitted.
+    """
+    if model_type == 'lightgbm':
+        return {
+            'kind': 'lightgbm',
+            'params': {**params, 'verbose': -1},
+            # Boosters restored from a string (tuned models) have best_iteration -1
+            'rounds': model.best_iteration if model.best_iteration > 0 else model.current_iteration(),
+        }
+    from sklearn.base import clone
+    estimator = clone(model)
+    if 'early_stopping_rounds' in estimator.get_params():
+        estimator.set_params(early_stopping_rounds=None)  # No eval set inside a fold
+    return {'kind': 'estimator', 'estimator': estimator}
+
+
+# Per-worker data, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(X, y, spec: dict, task: str, threads: int) -> None:
+    _worker.update(X=X, y=y, spec=spec, task=task, threads=threads)
+
+
+def _run_fold(fold: int, train_index: np.ndarray, test_index: np.ndarray) -> dict:
+    """Worker: fit the configuration on one fold and score its held-out rows."""
+    start = time.perf_counter()
+    X, y, spec, task = _worker['X'], _worker['y'], _worker['spec'], _worker['task']
+    X_train, X_test = X.iloc[train_index], X.iloc[test_index]
+    if spec['kind'] == 'lightgbm':
+        import lightgbm as lgb
+        params = {**spec['params'], 'num_threads': _worker['threads']}
+        booster = lgb.train(params, lgb.Dataset(X_train, label=y[train_index]), num_boost_round=spec['rounds'])
+        y_pred = booster.predict(X_test)
+    else:
+        estimator = spec['estimator']
+        estimator.fit(X_train, y[train_index])
+        y_pred = estimator.predict_proba(X_test)[:, 1] if task == 'binary' else estimator.predict(X_test)
+    return {
+        'fold': fold,
+        'rows': len(test_index),
+        'metrics': score_predictions(task, y[test_index], y_pred),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def cross_validate(X, y, groups, spec: dict, task: str, n_folds: int = DEFAULT_FOLDS, workers: int = None) -> dict:
+    """
+    Grouped k-fold CV of a model configuration, folds in parallel.
+
+    Args:
+        X, y: All rows (train and valid)
+        groups: Group per row (match_id), or None for plain k-fold
+        spec: See model_spec
+        task: 'binary' or 'regression'
+        n_folds: Folds (capped at the number of groups)
+        workers: Worker processes (default: one per fold, up to the CPU count)
+
+    Returns:
+        {'folds', 'grouped_by', 'metrics': {name: {'mean', 'std', 'folds'}}, 'per_fold', 'seconds'}
+    """
+    start = time.perf_counter()
+    y = np.asarray(y)
+    if groups is not None:
+        n_folds = min(n_folds, len(np.unique(groups)))
+        splits = list(GroupKFold(n_splits=n_folds).split(X, y, groups))
+    else:
+        splits = list(KFold(n_splits=n_folds, shuffle=True, random_state=42).split(X, y))
+
+    workers = workers or min(n_folds, os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Cross-validating ({n_folds} folds{' by match' if groups is not None else ''}) on {workers} worker(s)...")
+    # spawn: forking after LightGBM has started OpenMP threads can deadlock
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(X, y, spec, task, threads),
+    ) as pool:
+        per_fold = list(pool.map(_run_fold, range(n_folds), *zip(*splits)))
+
+    metrics = {}
+    for name in per_fold[0]['metrics']:
+        values = np.array([fold['metrics'][name] for fold in per_fold])
+        metrics[name] = {'mean': float(values.mean()), 'std': float(values.std()), 'folds': values.round(6).tolist()}
+        print(f"  CV {name}: {values.mean():.4f} ± {values.std():.4f}")
+    return {
+        'folds': n_folds,
+        'grouped_by': 'match_id' if groups is not None else None,
+        'metrics': metrics,
+        'per_fold': per_fold,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def _percentiles(samples) -> dict:
+    samples = np.asarray(samples) * 1000
+    return {'p50_ms': round(float(np.percentile(samples, 50)), 4), 'p99_ms': round(float(np.percentile(samples, 99)), 4)}
+
+
+def runtime_inputs(X, schema: dict) -> pd.DataFrame:
+    """
+    Raw event fields of a training matrix, as the runtime entry points take them.
+
+    One-hot columns are decoded back to their category (rows with no category
+    get the schema default); numeric columns are passed through.
+    """
+    inputs = pd.DataFrame({column: X[column].to_numpy() for column in schema['numeric'] if column in X.columns})
+    for field, spec in schema['categorical'].items():
+        vocabulary = np.array(spec['vocabulary'] + [spec['default']], dtype=object)
+        one_hot = X[[f"{spec['prefix']}_{value}" for value in spec['vocabulary']]].to_numpy(dtype=np.float64)
+        # A 0.5 column for the default wins only in rows with no category set
+        index = np.column_stack([one_hot, np.full(len(X), 0.5)]).argmax(axis=1)
+        inputs[field] = vocabulary[index]
+    return inputs
+
+
+def _entry_points(model_path):
+    """Runtime model name and (single, batch) entry points serving a model file."""
+    from ai_pipeline.runtime import xg_runtime
+
+    served = {
+        xg_runtime.XG_MODEL_PATH.resolve(): (
+            xg_runtime.XG_MODEL_NAME, xg_runtime.predict_shot_xg, xg_runtime.predict_shot_xg_batch,
+        ),
+        xg_runtime.PASS_MODEL_PATH.resolve(): (
+            xg_runtime.PASS_MODEL_NAME, xg_runtime.predict_pass_value, xg_runtime.predict_pass_value_batch,
+        ),
+    }
+    try:
+        return served[Path(model_path).resolve()]
+    except KeyError:
+        raise ValueError(f"{model_path} is not served by the runtime (expected one of {sorted(map(str, served))})")
+
+
+def measure_latency(model_path, X, batch_rows: int = LATENCY_BATCH_ROWS, seed: int = 42) -> dict:
+    """
+    Serving latency of a model through the runtime entry points.
+
+    Events are drawn from X and decoded to raw fields (runtime_inputs). The
+    single-event timings cover one predict_* call with a dict, the batch
+    timings one predict_*_batch call with a DataFrame: feature derivation,
+    encoding and scoring.
+    """
+    from ai_pipeline.runtime import xg_runtime
+
+    name, predict_one, predict_batch = _entry_points(model_path)
+    inputs = runtime_inputs(X, load_schema(schema_path(model_path)))
+    predict_batch(inputs.iloc[:1])  # Warm-up: loads the model into the registry
+    scorer = type(xg_runtime.registry.get(name).model).__name__
+
+    rng = np.random.default_rng(seed)
+    records = inputs.to_dict('records')
+    single = []
+    for i in rng.integers(0, len(records), SINGLE_ROW_REPEATS):
+        event = records[i]
+        start = time.perf_counter()
+        predict_one(event)
+        single.append(time.perf_counter() - start)
+
+    batch_inputs = inputs.iloc[rng.integers(0, len(inputs), batch_rows)].reset_index(drop=True)
+    predict_batch(batch_inputs)  # Warm-up
+    batch = []
+    for _ in range(BATCH_REPEATS):
+        start = time.perf_counter()
+        predict_batch(batch_inputs)
+        batch.append(time.perf_counter() - start)
+
+    batch_stats = _percentiles(batch)
+    batch_stats['rows_per_second'] = round(batch_rows / float(np.median(batch)))
+    return {
+        'scorer': scorer,
+        'entry_points': [predict_one.__name__, predict_batch.__name__],
+        'single_row': _percentiles(single),
+        f'batch_{batch_rows}': batch_stats,
+    }
+
+
+def model_size(model_path) -> dict:
+    """Size in bytes of the model files (missing files are omitted)."""
+    files = {'model': Path(model_path), 'trees': tree_path(model_path), 'schema': schema_path(model_path)}
+    return {name: path.stat().st_size for name, path in files.items() if path.exists()}
+
+
+def write_model_card(model_path, card: dict) -> Path:
+    """Write <model>.card.json (with creation time and model size)."""
+    card = {
+        'model': str(model_path),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        **card,
+        'size_bytes': model_size(model_path),
+    }
+    path = card_path(model_path)
+    with open(path, 'w') as f:
+        json.dump(card, f, indent=2)
+    return path
@@ -5,10 +5,19 @@ Uses gradient boosting (LightGBM preferred, falls back to XGBoost or sklearn).
 """
 
 import os
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import joblib
+import sys
+
+# Allow running as a script from the project root (python ai_pipeline/models/...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ai_pipeline.runtime.feature_schema import ID_COLUMNS, PASS_CATEGORICAL, PASS_DEFAULTS, build_schema, save_schema, schema_path
+from ai_pipeline.runtime.tree_export import export_ensemble, tree_path
+from model_card import DEFAULT_FOLDS, cross_validate, measure_latency, model_spec, write_model_card
 
 # Try to import LightGBM, XGBoost, or sklearn
 try:
@@ -31,6 +40,19 @@ TRAIN_DATA = "data/processed/passes_train.parquet"
 VALID_DATA = "data/processed/passes_valid.parquet"
 MODEL_PATH = "ai_pipeline/models/pass_value_model.pkl"
 
+# LightGBM parameters of the default run (and base parameters of --tune)
+LGB_PARAMS = {
+    'objective': 'regression',
+    'metric': 'rmse',
+    'boosting_type': 'gbdt',
+    'num_leaves': 31,
+    'learning_rate': 0.05,
+    'feature_fraction': 0.9,
+    'bagging_fraction': 0.8,
+    'bagging_freq': 5,
+    'verbose': -1
+}
+
 
 def load_data():
     """Load train and validation datasets."""
@@ -59,7 +81,8 @@ def prepare_features(df):
         raise ValueError("Target column 'target_value' not found in dataset!")
     
     y = df['target_value'].values
-    X = df.drop('target_value', axis=1)
+    # Row identifiers (match_id) are kept in the datasets for grouping, not for training
+    X = df.drop(columns=['target_value'] + [col for col in ID_COLUMNS if col in df.columns])
     
     return X, y
 
@@ -74,20 +97,8 @@ def train_model(X_train, y_train, X_valid, y_valid):
         train_data = lgb.Dataset(X_train, label=y_train)
         valid_data = lgb.Dataset(X_valid, label=y_valid, reference=train_data)
         
-        params = {
-            'objective': 'regression',
-            'metric': 'rmse',
-            'boosting_type': 'gbdt',
-            'num_leaves': 31,
-            'learning_rate': 0.05,
-            'feature_fraction': 0.9,
-            'bagging_fraction': 0.8,
-            'bagging_freq': 5,
-            'verbose': -1
-        }
-        
         model = lgb.train(
-            params,
+            LGB_PARAMS,
             train_data,
             num_boost_round=100,
             valid_sets=[valid_data],
@@ -129,6 +140,26 @@ def train_model(X_train, y_train, X_valid, y_valid):
     return model
 
 
+def tune_model(X_train, y_train, X_valid, y_valid, args):
+    """Parallel hyperparameter search (LightGBM); returns the best model and the search result."""
+    import tuning  # Needs LightGBM
+    
+    train_bin, valid_bin = tuning.cached_datasets(
+        'pass_value', X_train, y_train, X_valid, y_valid, sources=[TRAIN_DATA, VALID_DATA],
+    )
+    result = tuning.search(
+        LGB_PARAMS, train_bin, valid_bin,
+        n_trials=args.trials, strategy=args.strategy, workers=args.workers,
+        max_rounds=args.max_rounds, seed=args.seed,
+    )
+    best = result['best']
+    print(
+        f"Best trial {best['trial']} of {len(result['trials'])} run(s) in {result['seconds']:.1f}s: "
+        f"{best['params']} ({best['best_iteration']} rounds)"
+    )
+    return lgb.Booster(model_str=result['model']), result
+
+
 def evaluate_model(model, X_valid, y_valid):
     """Evaluate model and print metrics."""
     print()
@@ -186,6 +217,20 @@ def evaluate_model(model, X_valid, y_valid):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Train the pass value model")
+    parser.add_argument("--tune", action="store_true", help="Hyperparameter search instead of the default configuration (LightGBM)")
+    parser.add_argument("--trials", type=int, default=20, help="Configurations to sample")
+    parser.add_argument("--strategy", choices=["random", "halving"], default="random")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-rounds", type=int, default=1000, help="Boosting rounds of a full trial (early stopping applies)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cv-folds", type=int, default=DEFAULT_FOLDS, help="Grouped k-fold CV folds for the model card (0 = skip)")
+    parser.add_argument("--cv-workers", type=int, default=None, help="CV worker processes (default: one per fold)")
+    args = parser.parse_args()
+    if args.tune and MODEL_TYPE != "lightgbm":
+        print("❌ Error: --tune needs LightGBM")
+        return
+    
     print("=" * 60)
     print("Training Pass Value Model")
     print("=" * 60)
@@ -201,8 +246,12 @@ def main():
     print(f"Target mean (train): {y_train.mean():.4f}")
     print(f"Target mean (valid): {y_valid.mean():.4f}")
     
-    # Train model
-    model = train_model(X_train, y_train, X_valid, y_valid)
+    # Train model (or search for the best configuration)
+    search = None
+    if args.tune:
+        model, search = tune_model(X_train, y_train, X_valid, y_valid, args)
+    else:
+        model = train_model(X_train, y_train, X_valid, y_valid)
     
     # Evaluate
     metrics = evaluate_model(model, X_valid, y_valid)
@@ -211,10 +260,57 @@ def main():
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
     joblib.dump(model, MODEL_PATH)
     
+    # Save feature schema (column order, categorical vocabularies, defaults) for the runtime
+    schema = build_schema(X_train.columns, PASS_CATEGORICAL, PASS_DEFAULTS, target='target_value')
+    save_schema(schema, schema_path(MODEL_PATH))
+    
+    # Export the trees as NumPy arrays so the runtime can score without the model library
+    ensemble = export_ensemble(model, tree_path(MODEL_PATH), model_path=MODEL_PATH, n_features=X_train.shape[1])
+    if MODEL_TYPE == "lightgbm":
+        reference = model.predict(X_valid, num_iteration=model.best_iteration)
+    else:
+        reference = model.predict(X_valid)
+    export_diff = np.abs(ensemble.predict(X_valid.to_numpy(dtype=np.float64)) - reference).max()
+    
+    # Trial log and configuration of the tuned model
+    if search is not None:
+        import tuning
+        tuning.save_search(search, MODEL_PATH, settings=vars(args), sources=[TRAIN_DATA, VALID_DATA])
+    
+    # Model card: grouped CV of this configuration, serving latency and size
+    params = search['params'] if search is not None else LGB_PARAMS
+    card = {
+        'model_type': MODEL_TYPE,
+        'target': 'target_value',
+        'features': X_train.shape[1],
+        'rows': {'train': len(X_train), 'valid': len(X_valid)},
+        'params': params if MODEL_TYPE == "lightgbm" else model.get_params(),
+        'holdout': {name: float(value) for name, value in metrics.items()},
+    }
+    if args.cv_folds > 1:
+        groups = None
+        if 'match_id' in train_df.columns and 'match_id' in valid_df.columns:
+            groups = np.concatenate([train_df['match_id'].to_numpy(), valid_df['match_id'].to_numpy()])
+        card['cv'] = cross_validate(
+            pd.concat([X_train, X_valid], ignore_index=True), np.concatenate([y_train, y_valid]), groups,
+            model_spec(model, MODEL_TYPE, params), 'regression', n_folds=args.cv_folds, workers=args.cv_workers,
+        )
+    card['latency'] = measure_latency(MODEL_PATH, X_valid)
+    card_file = write_model_card(MODEL_PATH, card)
+    
     print("=" * 60)
     print("✅ Training complete!")
     print("=" * 60)
     print(f"Model saved: {MODEL_PATH}")
+    print(f"Feature schema: {schema_path(MODEL_PATH)}")
+    print(f"Exported trees: {tree_path(MODEL_PATH)} (max diff vs model: {export_diff:.2e})")
+    print(
+        f"Model card: {card_file} (serving latency p50 {card['latency']['single_row']['p50_ms']:.3f} ms/event, "
+        f"{card['latency']['batch_10000']['p50_ms']:.1f} ms/10k events)"
+    )
+    if search is not None:
+        print(f"Tuning trials: {tuning.trials_path(MODEL_PATH)}")
+        print(f"Model config: {tuning.config_path(MODEL_PATH)}")
     print(f"Final R²: {metrics['r2']:.4f}")
     print("=" * 60)
 
@@ -0,0 +1,281 @@
+"""
+Parallel hyperparameter search for the LightGBM models.
+
+Used by train_xg_shots.py and train_pass_value.py in --tune mode:
+
+    python ai_pipeline/models/train_xg_shots.py --tune --trials 40 --workers 4
+    python ai_pipeline/models/train_pass_value.py --tune --strategy halving --trials 81
+
+The training and validation sets are constructed once and saved as
+LightGBM binary datasets. They are cached under data/processed/lgb_cache/,
+keyed by the contents of the parquet files and the dataset parameters.
+Worker processes load the binary files once and then run trials with early
+stopping on the validation set.
+
+Strategies:
+- random: every sampled configuration gets the full round budget.
+- halving: successive halving. All configurations start with a small round
+  budget. After each rung, the best 1/eta are kept and their budget is
+  multiplied by eta, up to max_rounds.
+
+Every trial (parameters, rung, round budget, best iteration, validation
+metrics, training time) is written to <model>.tuning.json. The best
+model is returned to the training script, which saves it as usual. Its
+complete configuration is saved to <model>.config.json.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+
+from ai_pipeline.runtime.tree_export import model_fingerprint
+
+CACHE_DIR = "data/processed/lgb_cache"
+
+# Fixed when the binary datasets are constructed (cannot vary between trials)
+DATASET_PARAMS = {
+    'max_bin': 255,
+    'feature_pre_filter': False,  # So min_data_in_leaf can vary per trial
+    'verbose': -1,
+}
+
+# Parameter -> (distribution, low, high)
+SEARCH_SPACE = {
+    'num_leaves': ('int_log', 8, 256),
+    'learning_rate': ('log', 0.01, 0.3),
+    'min_data_in_leaf': ('int_log', 5, 200),
+    'feature_fraction': ('uniform', 0.5, 1.0),
+    'bagging_fraction': ('uniform', 0.5, 1.0),
+    'lambda_l2': ('log', 1e-3, 10.0),
+}
+
+# Validation metrics per objective; the first one is optimized (lower is better)
+METRICS = {
+    'binary': ['binary_logloss', 'auc'],
+    'regression': ['rmse', 'l1'],
+}
+
+DEFAULT_MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 20
+HALVING_ETA = 3
+
+
+def trials_path(model_path) -> Path:
+    """Trial log stored next to a model file."""
+    return Path(model_path).with_suffix('.tuning.json')
+
+
+def config_path(model_path) -> Path:
+    """Configuration of the best tuned model, stored next to the model file."""
+    return Path(model_path).with_suffix('.config.json')
+
+
+def cached_datasets(name: str, X_train, y_train, X_valid, y_valid, sources, cache_dir=CACHE_DIR):
+    """
+    Binary LightGBM datasets for a train/valid split, constructed once.
+
+    Args:
+        name: Cache name (model name)
+        sources: Files the matrices were read from (their contents key the cache)
+
+    Returns:
+        (train_path, valid_path) of the binary dataset files
+    """
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(model_fingerprint(source).encode())
+    digest.update(json.dumps([list(map(str, X_train.columns)), DATASET_PARAMS], sort_keys=True).encode())
+    key = digest.hexdigest()[:16]
+
+    directory = Path(cache_dir) / name
+    train_path = directory / f"{key}.train.bin"
+    valid_path = directory / f"{key}.valid.bin"
+    if train_path.exists() and valid_path.exists():
+        print(f"Using cached binary datasets: {directory} ({key})")
+        return train_path, valid_path
+
+    start = time.perf_counter()
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("*.bin"):
+        stale.unlink()
+    train_data = lgb.Dataset(X_train, label=y_train, params=DATASET_PARAMS, free_raw_data=False).construct()
+    valid_data = lgb.Dataset(X_valid, label=y_valid, reference=train_data, params=DATASET_PARAMS).construct()
+    # Write under a temporary name so an interrupted run does not leave a half-written cache
+    for data, path in [(train_data, train_path), (valid_data, valid_path)]:
+        tmp_path = path.with_name(path.name + '.tmp')
+        data.save_binary(str(tmp_path))
+        os.replace(tmp_path, path)
+    print(f"Built binary datasets in {time.perf_counter() - start:.1f}s: {directory} ({key})")
+    return train_path, valid_path
+
+
+def sample_configs(n: int, seed: int, space: dict = SEARCH_SPACE) -> list:
+    """n random parameter overrides from the search space."""
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for param, (kind, low, high) in space.items():
+            if kind == 'uniform':
+                config[param] = round(float(rng.uniform(low, high)), 4)
+            elif kind == 'log':
+                config[param] = float(f"{math.exp(rng.uniform(math.log(low), math.log(high))):.4g}")
+            else:  # int_log
+                config[param] = int(round(math.exp(rng.uniform(math.log(low), math.log(high + 0.5)))))
+        configs.append(config)
+    return configs
+
+
+# Per-worker datasets, loaded once by _init_worker
+_worker = {}
+
+
+def _init_worker(train_path: str, valid_path: str, threads: int) -> None:
+    train_data = lgb.Dataset(train_path, params=DATASET_PARAMS)
+    valid_data = lgb.Dataset(valid_path, reference=train_data, params=DATASET_PARAMS)
+    _worker.update(train=train_data, valid=valid_data, threads=threads)
+
+
+def _run_trial(trial: int, rung: int, params: dict, rounds: int) -> dict:
+    """Worker: train one configuration with early stopping. Returns the trial record and model."""
+    start = time.perf_counter()
+    params = {**params, 'num_threads': _worker['threads'], 'verbose': -1}
+    booster = lgb.train(
+        params,
+        _worker['train'],
+        num_boost_round=rounds,
+        valid_sets=[_worker['valid']],
+        valid_names=['valid'],
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, first_metric_only=True, verbose=False)],
+    )
+    best_iteration = booster.best_iteration or booster.current_iteration()
+    metrics = {metric: float(value) for metric, value in booster.best_score['valid'].items()}
+    return {
+        'trial': trial,
+        'rung': rung,
+        'rounds': rounds,
+        'best_iteration': best_iteration,
+        'metrics': metrics,
+        'score': metrics[params['metric'][0]],
+        'seconds': round(time.perf_counter() - start, 3),
+        'model': booster.model_to_string(num_iteration=best_iteration),
+    }
+
+
+def _run_rung(pool, configs: dict, base_params: dict, rung: int, rounds: int, trials: list) -> list:
+    """Run configurations (trial id -> overrides) in parallel; append their records to trials."""
+    futures = [
+        pool.submit(_run_trial, trial, rung, {**base_params, **overrides}, rounds)
+        for trial, overrides in configs.items()
+    ]
+    results = []
+    for future in futures:
+        result = future.result()
+        record = {key: value for key, value in result.items() if key != 'model'}
+        record['params'] = configs[result['trial']]
+        trials.append(record)
+        results.append(result)
+        print(
+            f"  trial {result['trial']:>3} rung {rung} ({rounds:>4} rounds): "
+            f"{base_params['metric'][0]} {result['score']:.5f} at {result['best_iteration']:>4} "
+            f"in {result['seconds']:.1f}s"
+        )
+    return results
+
+
+def search(
+    base_params: dict,
+    train_path,
+    valid_path,
+    n_trials: int = 20,
+    strategy: str = 'random',
+    workers: int = None,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+    seed: int = 42,
+) -> dict:
+    """
+    Run the search over SEARCH_SPACE.
+
+    Args:
+        base_params: LightGBM parameters of the training script (objective, bagging_freq...)
+        train_path, valid_path: Binary datasets (see cached_datasets)
+        n_trials: Sampled configurations
+        strategy: 'random' or 'halving'
+        workers: Worker processes (default: CPU count, at most n_trials)
+        max_rounds: Boosting round budget of a full trial
+        seed: Sampling seed
+
+    Returns:
+        {'best': trial record, 'params': full parameters of the best trial,
+         'model': its model string, 'trials': all trial records, 'seconds': wall time}
+    """
+    if strategy not in ('random', 'halving'):
+        raise ValueError(f"Unknown search strategy: {strategy}")
+    start = time.perf_counter()
+    base_params = {**base_params, 'metric': METRICS[base_params['objective']]}
+    configs = dict(enumerate(sample_configs(n_trials, seed)))
+    workers = workers or min(n_trials, os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Searching {n_trials} configurations ({strategy}) on {workers} worker(s) x {threads} thread(s)...")
+
+    trials = []
+    # spawn: forking after LightGBM has started OpenMP threads can deadlock
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(str(train_path), str(valid_path), threads),
+    ) as pool:
+        if strategy == 'random':
+            results = _run_rung(pool, configs, base_params, 0, max_rounds, trials)
+        else:
+            n_rungs = max(1, math.floor(math.log(n_trials, HALVING_ETA)) + 1)
+            rounds = max(EARLY_STOPPING_ROUNDS * 2, max_rounds // HALVING_ETA ** (n_rungs - 1))
+            rung = 0
+            while True:
+                results = _run_rung(pool, configs, base_params, rung, rounds, trials)
+                if rounds >= max_rounds:
+                    break
+                keep = sorted(results, key=lambda r: r['score'])[:max(1, len(configs) // HALVING_ETA)]
+                configs = {r['trial']: configs[r['trial']] for r in keep}
+                # The last survivor always gets the full budget
+                rounds = max_rounds if len(configs) == 1 else min(max_rounds, rounds * HALVING_ETA)
+                rung += 1
+
+    # Best of the last (largest budget) rung
+    best = min(results, key=lambda r: r['score'])
+    best_record = next(t for t in trials if t['trial'] == best['trial'] and t['rung'] == best['rung'])
+    return {
+        'best': best_record,
+        'params': {**base_params, **best_record['params']},
+        'model': best['model'],
+        'trials': trials,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def save_search(result: dict, model_path, settings: dict, sources) -> None:
+    """Write the trial log and the configuration of the best model next to the model file."""
+    with open(trials_path(model_path), 'w') as f:
+        json.dump({
+            'settings': settings,
+            'seconds': round(result['seconds'], 3),
+            'best_trial': result['best']['trial'],
+            'trials': result['trials'],
+        }, f, indent=2)
+    with open(config_path(model_path), 'w') as f:
+        json.dump({
+            'params': result['params'],
+            'num_boost_round': result['best']['best_iteration'],
+            'metrics': result['best']['metrics'],
+            'trial': result['best']['trial'],
+            'data': {str(source): model_fingerprint(source) for source in sources},
+        }, f, indent=2)
@@ -5,7 +5,28 @@ This module provides functions that can be called from the backend
 to get predictions for shots (xG) and passes (value).
 """
 
-from .xg_runtime import predict_shot_xg, predict_pass_value, get_zone
+from .xg_runtime import (
+    predict_shot_xg,
+    predict_pass_value,
+    predict_shot_xg_batch,
+    predict_pass_value_batch,
+    get_zone,
+    get_zones,
+    registry,
+)
+from .feature_schema import SchemaMismatchError
+from .xg_grid import predict_shot_xg_grid, predict_shot_xg_grid_batch
 
-__all__ = ['predict_shot_xg', 'predict_pass_value', 'get_zone']
+__all__ = [
+    'predict_shot_xg',
+    'predict_pass_value',
+    'predict_shot_xg_batch',
+    'predict_pass_value_batch',
+    'get_zone',
+    'get_zones',
+    'registry',
+    'predict_shot_xg_grid',
+    'predict_shot_xg_grid_batch',
+    'SchemaMismatchError',
+]
 
@@ -0,0 +1,204 @@
+"""
+Feature schema for the xG and pass value models.
+
+Training saves a schema next to the model (`<model>.schema.json`) with the
+exact column order of the training matrix, the vocabulary of every one-hot
+encoded categorical field and the default used when a field is missing.
+The runtime compiles the schema into a FeatureEncoder that writes features
+straight into a preallocated float32 matrix in schema order, so scoring does
+not depend on pandas column alignment or on how a model library renames
+feature columns.
+"""
+
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Categorical field -> one-hot column prefix (as passed to pd.get_dummies in the prep scripts)
+SHOT_CATEGORICAL = {'body_part': 'body', 'shot_type': 'type', 'zone': 'zone'}
+PASS_CATEGORICAL = {'zone_start': 'zone_start', 'zone_end': 'zone_end', 'pass_type': 'type'}
+
+# Columns of the prepared datasets that identify rows and are not model features
+ID_COLUMNS = ['match_id']
+
+# Defaults for fields callers may omit (same as predict_shot_xg / predict_pass_value)
+SHOT_DEFAULTS = {
+    'x_shot': 0.5,
+    'y_shot': 0.5,
+    'under_pressure': 0,
+    'num_defenders': 0,
+    'body_part': 'foot',
+    'shot_type': 'open_play',
+}
+PASS_DEFAULTS = {
+    'x_start': 0.5,
+    'y_start': 0.5,
+    'x_end': 0.5,
+    'y_end': 0.5,
+    'successful': 1,
+    'pass_type': 'normal',
+}
+
+
+class SchemaMismatchError(ValueError):
+    """Model, schema and input features do not line up."""
+
+
+def schema_path(model_path) -> Path:
+    """Schema file stored next to a model file."""
+    return Path(model_path).with_suffix('.schema.json')
+
+
+def build_schema(columns, categorical: dict, defaults: dict, target: str = None) -> dict:
+    """
+    Build a schema from the training matrix columns.
+
+    Args:
+        columns: Training feature columns, in model order
+        categorical: Categorical field -> one-hot prefix
+        defaults: Field -> default value (numeric fields without a default are required)
+        target: Name of the training target (informational)
+
+    Returns:
+        Schema dict (see save_schema)
+    """
+    columns = [str(c) for c in columns]
+    # Longest prefix first, so 'zone_start_x' is not taken by a 'zone' prefix
+    prefixes = sorted(categorical.items(), key=lambda item: len(item[1]), reverse=True)
+
+    numeric = {}
+    vocabularies = {field: [] for field in categorical}
+    for column in columns:
+        for field, prefix in prefixes:
+            if column.startswith(prefix + '_'):
+                vocabularies[field].append(column[len(prefix) + 1:])
+                break
+        else:
+            numeric[column] = defaults.get(column)
+
+    return {
+        'version': SCHEMA_VERSION,
+        'target': target,
+        'columns': columns,
+        'numeric': numeric,
+        'categorical': {
+            field: {
+                'prefix': prefix,
+                'vocabulary': vocabularies[field],
+                'default': defaults.get(field),
+            }
+            for field, prefix in categorical.items()
+        },
+    }
+
+
+def save_schema(schema: dict, path) -> None:
+    with open(path, 'w') as f:
+        json.dump(schema, f, indent=2)
+
+
+def load_schema(path) -> dict:
+    with open(path, 'r') as f:
+        schema = json.load(f)
+    if schema.get('version') != SCHEMA_VERSION:
+        raise SchemaMismatchError(
+            f"Unsupported feature schema version {schema.get('version')} in {path} "
+            f"(expected {SCHEMA_VERSION}). Retrain the model."
+        )
+    return schema
+
+
+def _normalize_name(name: str) -> str:
+    # LightGBM replaces whitespace in feature names with underscores
+    return re.sub(r'\s', '_', str(name))
+
+
+def check_model_schema(model, schema: dict) -> None:
+    """Fail if the model's recorded feature layout differs from the schema."""
+    if hasattr(model, 'feature_name'):  # LightGBM Booster
+        model_columns = list(model.feature_name())
+    elif hasattr(model, 'feature_names_in_'):  # sklearn / XGBoost sklearn API
+        model_columns = list(model.feature_names_in_)
+    else:
+        return
+
+    expected = [_normalize_name(c) for c in schema['columns']]
+    actual = [_normalize_name(c) for c in model_columns]
+    if expected != actual:
+        missing = sorted(set(expected) - set(actual))
+        extra = sorted(set(actual) - set(expected))
+        raise SchemaMismatchError(
+            f"Model features do not match the feature schema "
+            f"({len(actual)} vs {len(expected)} columns; missing from model: {missing}, "
+            f"not in schema: {extra}, or different order). Retrain to regenerate the schema."
+        )
+
+
+class FeatureEncoder:
+    """
+    Compiled encoder: feature columns -> float32 matrix in schema order.
+
+    Numeric fields are copied into their column; categorical fields set a
+    single 1.0 in the column of their value. Values outside the training
+    vocabulary leave all columns of that field at 0, exactly as
+    pd.get_dummies did for categories absent from the training data.
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self.columns = schema['columns']
+        index = {name: i for i, name in enumerate(self.columns)}
+
+        self.numeric = [
+            (name, index[name], default)
+            for name, default in schema['numeric'].items()
+        ]
+        self.categorical = []
+        for field, spec in schema['categorical'].items():
+            lookup = {
+                value: index[f"{spec['prefix']}_{value}"]
+                for value in spec['vocabulary']
+            }
+            self.categorical.append((field, lookup, spec['default']))
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+    def encode(self, features: dict, n: int) -> np.ndarray:
+        """
+        Encode a batch.
+
+        Args:
+            features: Field -> array of n values (or scalar); extra fields are ignored
+            n: Number of rows
+
+        Returns:
+            float32 matrix of shape (n, n_features)
+        """
+        out = np.zeros((n, self.n_features), dtype=np.float32)
+
+        for name, column, default in self.numeric:
+            values = features.get(name)
+            if values is None:
+                if default is None:
+                    raise SchemaMismatchError(f"Required feature '{name}' is missing (no default in schema)")
+                values = default
+            out[:, column] = values
+
+        rows = np.arange(n)
+        for field, lookup, default in self.categorical:
+            values = features.get(field, default)
+            if values is None:
+                raise SchemaMismatchError(f"Required categorical feature '{field}' is missing")
+            values = np.broadcast_to(np.asarray(values, dtype=object), (n,))
+            uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+            targets = np.array([lookup.get(value, -1) for value in uniques], dtype=np.int64)[inverse]
+            known = targets >= 0
+            out[rows[known], targets[known]] = 1.0
+
+        return out
@@ -0,0 +1,111 @@
+"""
+Vectorized feature kernels shared by dataset preparation and the runtime.
+
+The prep scripts (ai_pipeline/events) and the runtime scorers derive the
+geometric features with these functions, so training and serving compute
+them with exactly the same arithmetic. All kernels take NumPy arrays (or
+scalars) and work on whole columns.
+
+Conventions:
+- Event coordinates are 0-100. They are normalized to 0-1 by normalize_coords.
+- Play attacks to the right. The goal is at normalized (1.0, 0.5).
+- Distances are in meters on a 105 x 68 m pitch. Angles are in radians.
+  Their squared terms go through libm pow (see squared), as in the former
+  row-by-row code.
+- Zones are bands of normalized x: 'Self box', 'Def third', 'Middle',
+  'Att third' and 'Opp box'.
+
+Parity between the training and runtime paths is checked by
+ai_pipeline/events/benchmark_features.py (see check_runtime_parity).
+"""
+
+import math
+
+import numpy as np
+
+# Pitch dimensions (standard football pitch)
+PITCH_LENGTH = 105.0  # meters
+PITCH_WIDTH = 68.0  # meters
+
+# Goal center in normalized coordinates (attacking right)
+GOAL_X = 1.0
+GOAL_Y = 0.5
+
+# Zone boundaries on normalized x
+ZONE_NAMES = np.array(["Self box", "Def third", "Middle", "Att third", "Opp box"], dtype=object)
+ZONE_BOUNDS = np.array([0.18, 0.33, 0.67, 0.82])
+
+
+def normalize_coords(x, y):
+    """Convert 0-100 coordinates to 0-1 normalized."""
+    return np.asarray(x, dtype=np.float64) / 100.0, np.asarray(y, dtype=np.float64) / 100.0
+
+
+def get_zones(x) -> np.ndarray:
+    """
+    Zone names for an array of normalized x coordinates.
+
+    Returns:
+        Array of zone names (object dtype)
+    """
+    return ZONE_NAMES[np.digitize(np.asarray(x, dtype=np.float64), ZONE_BOUNDS)]
+
+
+def get_zone(x: float, y: float = None) -> str:
+    """
+    Zone of one normalized position (see get_zones; y is not used).
+
+    Returns:
+        Zone name: 'Self box', 'Def third', 'Middle', 'Att third', 'Opp box'
+    """
+    return get_zones([x])[0]
+
+
+def squared(values) -> np.ndarray:
+    """
+    Element-wise square through libm pow (Python's ** on floats).
+
+    Not values * values: NumPy squares by multiplication, which differs from
+    pow in the last bit for a small fraction of values. Using pow keeps the
+    features byte-for-byte identical to the former row-by-row code.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    flat = values.ravel().tolist()
+    return np.fromiter(map(math.pow, flat, [2.0] * len(flat)), dtype=np.float64, count=len(flat)).reshape(values.shape)
+
+
+def goal_offsets(x_norm, y_norm):
+    """Vector from the position to the goal center, in meters: (dx, dy)."""
+    x_norm = np.asarray(x_norm, dtype=np.float64)
+    y_norm = np.asarray(y_norm, dtype=np.float64)
+    return GOAL_X * PITCH_LENGTH - x_norm * PITCH_LENGTH, GOAL_Y * PITCH_WIDTH - y_norm * PITCH_WIDTH
+
+
+def distance_to_goal(x_norm, y_norm) -> np.ndarray:
+    """Distance from the position to the goal center (meters)."""
+    dx, dy = goal_offsets(x_norm, y_norm)
+    return np.sqrt(squared(dx) + squared(dy))
+
+
+def angle_to_goal(x_norm, y_norm) -> np.ndarray:
+    """Direction from the position to the goal center (radians, 0 = straight at goal)."""
+    dx, dy = goal_offsets(x_norm, y_norm)
+    return np.arctan2(dy, dx)
+
+
+def progression(x_start, y_start, x_end, y_end) -> dict:
+    """
+    Progress of passes between normalized positions.
+
+    Returns:
+        {'forward_progress': end - start x (positive = forward),
+         'lateral_progress': |end - start y|,
+         'length': straight-line length (normalized units)}
+    """
+    dx = np.asarray(x_end, dtype=np.float64) - np.asarray(x_start, dtype=np.float64)
+    dy = np.asarray(y_end, dtype=np.float64) - np.asarray(y_start, dtype=np.float64)
+    return {
+        'forward_progress': dx,
+        'lateral_progress': np.abs(dy),
+        'length': np.sqrt(squared(dx) + squared(dy)),
+    }
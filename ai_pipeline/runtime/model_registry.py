@@ -0,0 +1,242 @@
+"""
+Thread-safe registry of the runtime models, with hot reload.
+
+Each registered model is loaded once under a lock and published as an
+immutable LoadedModel snapshot. Callers take a snapshot per batch and score
+with it, so a batch always finishes on the model it started with even if a
+newer one is swapped in meanwhile.
+
+At most every `check_interval` seconds, a get() stats the model files
+(model, exported trees, schema). When they change, the files are hashed;
+new contents are loaded in the calling thread while other threads keep
+serving the current snapshot, and the new snapshot replaces it in a single
+reference assignment. A failed reload (e.g. a half-written file) keeps the
+current model and is retried on the next check.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from .feature_schema import schema_path
+from .tree_export import model_fingerprint, tree_path
+
+DEFAULT_CHECK_INTERVAL = 2.0  # Seconds between file checks per model
+
+
+class LoadedModel(NamedTuple):
+    """Immutable snapshot of a loaded model."""
+
+    name: str
+    model: Any
+    encoder: Any  # FeatureEncoder, or None for models saved without a schema
+    version: int  # 1 for the first load, +1 per reload
+    path: str
+    fingerprint: str  # SHA-256 over the model files
+    mtime: float  # Newest model file mtime (epoch seconds)
+    loaded_at: float  # Epoch seconds
+    load_seconds: float
+
+
+def model_files(model_path) -> list:
+    """Files that make up a saved model: the model, its exported trees and its feature schema."""
+    return [Path(model_path), tree_path(model_path), schema_path(model_path)]
+
+
+def _files_signature(paths) -> tuple:
+    """(mtime_ns, size) per file, None for missing files."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _files_fingerprint(paths) -> str:
+    """SHA-256 over the contents of the existing files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        if path.exists():
+            digest.update(path.name.encode())
+            digest.update(model_fingerprint(path).encode())
+    return digest.hexdigest()
+
+
+class _Entry:
+    """Registration, current snapshot and counters of one model."""
+
+    def __init__(self, name, path, loader, watch):
+        self.name = name
+        self.path = Path(path)
+        self.loader = loader
+        self.watch = [Path(p) for p in watch]
+
+        self.lock = threading.Lock()  # Held while checking files / loading
+        self.current = None
+        self.signature = None
+        self.next_check = 0.0
+
+        self.counter_lock = threading.Lock()
+        self.loads = 0
+        self.load_errors = 0
+        self.last_error = None
+        self.batches = 0
+        self.rows = 0
+        self.scoring_seconds = 0.0
+
+
+class ModelRegistry:
+    """
+    Named models loaded lazily, once, and reloaded when their files change.
+
+    Usage:
+        registry.register('xg_shots', XG_MODEL_PATH, load_model)
+        loaded = registry.get('xg_shots')  # LoadedModel, or None if not trained
+        xg = score(loaded.model, loaded.encoder, batch)
+        registry.record_scoring('xg_shots', len(xg), seconds)
+    """
+
+    def __init__(self, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path, loader, watch=None) -> None:
+        """
+        Register a model (replaces an existing registration of the same name).
+
+        Args:
+            name: Registry key
+            path: Model file passed to the loader
+            loader: Callable path -> (model, encoder)
+            watch: Files whose changes trigger a reload (default: model_files(path))
+        """
+        entry = _Entry(name, path, loader, watch if watch is not None else model_files(path))
+        with self._lock:
+            self._entries[name] = entry
+
+    def _entry(self, name: str) -> _Entry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"Model '{name}' is not registered") from None
+
+    def get(self, name: str):
+        """
+        Current snapshot of a model, loading or reloading it if needed.
+
+        Only the first load blocks; while a reload is in progress other
+        threads get the current snapshot.
+
+        Returns:
+            LoadedModel, or None if none of the model files exist
+        """
+        entry = self._entry(name)
+        current = entry.current
+        if current is not None and time.monotonic() < entry.next_check:
+            return current
+
+        if current is None:
+            with entry.lock:
+                if entry.current is None:
+                    self._refresh(entry)
+        elif entry.lock.acquire(blocking=False):
+            try:
+                self._refresh(entry)
+            finally:
+                entry.lock.release()
+        return entry.current
+
+    def reload(self, name: str, force: bool = False):
+        """Check the files now (or load unconditionally with force) and return the current snapshot."""
+        entry = self._entry(name)
+        with entry.lock:
+            self._refresh(entry, force=force)
+        return entry.current
+
+    def _refresh(self, entry: _Entry, force: bool = False) -> None:
+        """Swap in a new snapshot if the model files changed. Caller holds entry.lock."""
+        entry.next_check = time.monotonic() + self.check_interval
+        signature = _files_signature(entry.watch)
+        if not force and entry.current is not None and signature == entry.signature:
+            return
+        if all(s is None for s in signature):
+            if entry.current is not None and entry.signature != signature:
+                print(f"Warning: Model files for '{entry.name}' were removed, keeping version {entry.current.version}")
+                entry.signature = signature
+            return
+
+        fingerprint = _files_fingerprint(entry.watch)
+        if not force and entry.current is not None and fingerprint == entry.current.fingerprint:
+            entry.signature = signature  # Touched, not changed
+            return
+
+        start = time.perf_counter()
+        try:
+            model, encoder = entry.loader(entry.path)
+        except Exception as e:
+            with entry.counter_lock:
+                entry.load_errors += 1
+                entry.last_error = f"{type(e).__name__}: {e}"
+            if entry.current is None:
+                raise
+            print(f"Warning: Reloading '{entry.name}' failed, keeping version {entry.current.version}: {e}")
+            return
+        load_seconds = time.perf_counter() - start
+
+        version = entry.current.version + 1 if entry.current is not None else 1
+        entry.current = LoadedModel(
+            name=entry.name,
+            model=model,
+            encoder=encoder,
+            version=version,
+            path=str(entry.path),
+            fingerprint=fingerprint,
+            mtime=max(s[0] for s in signature if s is not None) / 1e9,
+            loaded_at=time.time(),
+            load_seconds=load_seconds,
+        )
+        entry.signature = signature
+        with entry.counter_lock:
+            entry.loads += 1
+        if version > 1:
+            print(f"Reloaded model '{entry.name}' (version {version}, {load_seconds * 1000:.0f} ms)")
+
+    def record_scoring(self, name: str, rows: int, seconds: float) -> None:
+        """Count one scored batch."""
+        entry = self._entry(name)
+        with entry.counter_lock:
+            entry.batches += 1
+            entry.rows += rows
+            entry.scoring_seconds += seconds
+
+    def stats(self) -> dict:
+        """Per-model version, load latency and scoring counters, for monitoring."""
+        stats = {}
+        for name, entry in list(self._entries.items()):
+            current = entry.current
+            with entry.counter_lock:
+                stats[name] = {
+                    "path": str(entry.path),
+                    "loaded": current is not None,
+                    "version": current.version if current else None,
+                    "fingerprint": current.fingerprint if current else None,
+                    "mtime": current.mtime if current else None,
+                    "loaded_at": current.loaded_at if current else None,
+                    "load_seconds": round(current.load_seconds, 4) if current else None,
+                    "loads": entry.loads,
+                    "load_errors": entry.load_errors,
+                    "last_error": entry.last_error,
+                    "batches": entry.batches,
+                    "rows": entry.rows,
+                    "scoring_seconds": round(entry.scoring_seconds, 4),
+                    "avg_batch_ms": round(1000 * entry.scoring_seconds / entry.batches, 3) if entry.batches else None,
+                }
+        return stats
@@ -0,0 +1,366 @@
+"""
+Pure-NumPy export of tree-ensemble models.
+
+Training flattens the trained LightGBM / XGBoost / sklearn gradient boosting
+model into node arrays (feature, threshold, left, right, leaf value) saved
+as `<model>.trees.npz`. TreeEnsemble evaluates a batch by advancing all rows
+through all trees one level at a time, so the runtime does not need to
+import the model library (or unpickle the model) just to walk the trees.
+
+Node layout (all trees concatenated, `roots` holds each tree's root):
+- internal node: go left when x <= threshold (missing values follow
+  default_left), otherwise right
+- leaf: feature = -1 and left = right = itself, so advancing a row that
+  already reached a leaf keeps it there
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+EXPORT_VERSION = 1
+
+# Missing value handling per node (LightGBM missing types; XGBoost/sklearn use NAN/NONE)
+MISSING_NONE = 0  # NaN is treated as 0.0
+MISSING_ZERO = 1  # 0.0 (and NaN) follow default_left
+MISSING_NAN = 2   # NaN follows default_left
+
+_ZERO_THRESHOLD = 1e-35  # LightGBM kZeroThreshold
+
+
+def tree_path(model_path) -> Path:
+    """Exported trees stored next to a model file."""
+    return Path(model_path).with_suffix('.trees.npz')
+
+
+def model_fingerprint(model_path) -> str:
+    """SHA-256 of the model file contents."""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _NodeBuilder:
+    """Collects nodes of all trees into flat lists."""
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.value = []
+        self.default_left = []
+        self.missing_type = []
+        self.roots = []
+
+    def add(self, feature=-1, threshold=0.0, value=0.0, default_left=False, missing_type=MISSING_NONE) -> int:
+        index = len(self.feature)
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(index)
+        self.right.append(index)
+        self.value.append(value)
+        self.default_left.append(default_left)
+        self.missing_type.append(missing_type)
+        return index
+
+    def link(self, node: int, left: int, right: int) -> None:
+        self.left[node] = left
+        self.right[node] = right
+
+    def arrays(self) -> dict:
+        return {
+            'feature': np.array(self.feature, dtype=np.int32),
+            'threshold': np.array(self.threshold, dtype=np.float64),
+            'left': np.array(self.left, dtype=np.int32),
+            'right': np.array(self.right, dtype=np.int32),
+            'value': np.array(self.value, dtype=np.float64),
+            'default_left': np.array(self.default_left, dtype=bool),
+            'missing_type': np.array(self.missing_type, dtype=np.int8),
+            'roots': np.array(self.roots, dtype=np.int32),
+        }
+
+
+def _flatten_lightgbm(booster) -> dict:
+    dump = booster.dump_model()  # Dumps up to best_iteration when early stopping was used
+    missing_types = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+    builder = _NodeBuilder()
+
+    def walk(node):
+        if 'leaf_value' in node:
+            return builder.add(value=node['leaf_value'])
+        if node['decision_type'] != '<=':
+            raise NotImplementedError(f"LightGBM {node['decision_type']} (categorical) splits are not supported")
+        index = builder.add(
+            feature=node['split_feature'],
+            threshold=node['threshold'],
+            default_left=node['default_left'],
+            missing_type=missing_types[node['missing_type']],
+        )
+        builder.link(index, walk(node['left_child']), walk(node['right_child']))
+        return index
+
+    for tree in dump['tree_info']:
+        builder.roots.append(walk(tree['tree_structure']))
+
+    objective = dump.get('objective', '')
+    output, scale = 'identity', 1.0
+    if objective.startswith('binary'):
+        output = 'sigmoid'
+        for part in objective.split():
+            if part.startswith('sigmoid:'):
+                scale = float(part.split(':')[1])
+
+    return {
+        **builder.arrays(),
+        'base_score': 0.0,  # LightGBM folds the initial score into the first tree
+        'output': output,
+        'sigmoid_scale': scale,
+        'input_dtype': 'float64',
+        'feature_names': booster.feature_name(),
+        'source': 'lightgbm',
+    }
+
+
+def _flatten_xgboost(model) -> dict:
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None:
+        booster = booster[:best_iteration + 1]
+
+    feature_names = booster.feature_names or [f'f{i}' for i in range(booster.num_features())]
+    feature_index = {name: i for i, name in enumerate(feature_names)}
+    builder = _NodeBuilder()
+
+    def walk(node):
+        if 'leaf' in node:
+            return builder.add(value=node['leaf'])
+        children = {child['nodeid']: child for child in node['children']}
+        # XGBoost compares float32 values with x < threshold; x <= previous float32 is equivalent
+        threshold = np.nextafter(np.float32(node['split_condition']), np.float32(-np.inf))
+        index = builder.add(
+            feature=feature_index[node['split']],
+            threshold=float(threshold),
+            default_left=node['missing'] == node['yes'],
+            missing_type=MISSING_NAN,
+        )
+        builder.link(index, walk(children[node['yes']]), walk(children[node['no']]))
+        return index
+
+    for dump in booster.get_dump(dump_format='json'):
+        builder.roots.append(walk(json.loads(dump)))
+
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    base_score = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+    output = 'identity'
+    if objective in ('binary:logistic', 'reg:logistic'):
+        output = 'sigmoid'
+        base_score = float(np.log(base_score / (1.0 - base_score)))
+
+    return {
+        **builder.arrays(),
+        'base_score': base_score,
+        'output': output,
+        'sigmoid_scale': 1.0,
+        'input_dtype': 'float32',
+        'feature_names': list(feature_names),
+        'source': 'xgboost',
+    }
+
+
+def _flatten_sklearn(model, n_features: int) -> dict:
+    if model.estimators_.shape[1] != 1:
+        raise NotImplementedError("Only binary classification and regression gradient boosting models are supported")
+
+    builder = _NodeBuilder()
+    learning_rate = model.learning_rate
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        offset = len(builder.feature)
+        for node in range(tree.node_count):
+            if tree.children_left[node] == -1:
+                builder.add(value=learning_rate * tree.value[node][0][0])
+            else:
+                index = builder.add(feature=int(tree.feature[node]), threshold=float(tree.threshold[node]))
+                builder.link(index, offset + tree.children_left[node], offset + tree.children_right[node])
+        builder.roots.append(offset)
+
+    base_score = float(np.ravel(model._raw_predict_init(np.zeros((1, n_features))))[0])
+    is_classifier = hasattr(model, 'predict_proba')
+    feature_names = getattr(model, 'feature_names_in_', None)
+
+    return {
+        **builder.arrays(),
+        'base_score': base_score,
+        'output': 'sigmoid' if is_classifier else 'identity',
+        'sigmoid_scale': 1.0,
+        'input_dtype': 'float32',  # sklearn trees compare float32 inputs
+        'feature_names': list(feature_names) if feature_names is not None else [f'f{i}' for i in range(n_features)],
+        'source': 'sklearn',
+    }
+
+
+def flatten_ensemble(model, n_features: int = None) -> dict:
+    """
+    Flatten a trained model into node arrays.
+
+    Supports LightGBM Booster, XGBoost (sklearn API or Booster) and sklearn
+    GradientBoostingClassifier / GradientBoostingRegressor.
+    """
+    module = type(model).__module__
+    if module.startswith('lightgbm'):
+        booster = model.booster_ if hasattr(model, 'booster_') else model
+        return _flatten_lightgbm(booster)
+    if module.startswith('xgboost'):
+        return _flatten_xgboost(model)
+    if hasattr(model, 'estimators_'):
+        return _flatten_sklearn(model, n_features or model.n_features_in_)
+    raise NotImplementedError(f"Cannot export model of type {type(model).__name__}")
+
+
+def export_ensemble(model, path, model_path=None, n_features: int = None) -> 'TreeEnsemble':
+    """
+    Flatten a model and save it as .npz.
+
+    Args:
+        model: Trained model
+        path: Output .npz path (see tree_path)
+        model_path: Saved model file; its fingerprint is stored so the
+            runtime can tell when the export is out of date
+    """
+    arrays = flatten_ensemble(model, n_features)
+    arrays['model_fingerprint'] = model_fingerprint(model_path) if model_path else ''
+    ensemble = TreeEnsemble(arrays)
+    ensemble.save(path)
+    return ensemble
+
+
+class TreeEnsemble:
+    """Vectorized evaluator for exported tree ensembles."""
+
+    def __init__(self, arrays: dict):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.default_left = arrays['default_left']
+        self.missing_type = arrays['missing_type']
+        self.roots = arrays['roots']
+        self.base_score = float(arrays['base_score'])
+        self.output = str(arrays['output'])
+        self.sigmoid_scale = float(arrays['sigmoid_scale'])
+        self.input_dtype = np.dtype(str(arrays['input_dtype']))
+        self.feature_names_in_ = np.array(arrays['feature_names'], dtype=object)
+        self.source = str(arrays['source'])
+        self.model_fingerprint = str(arrays.get('model_fingerprint', ''))
+
+        self._has_missing = bool((self.missing_type != MISSING_NONE).any())
+        self.max_depth = self._max_depth()
+
+    def _max_depth(self) -> int:
+        depth = 0
+        nodes = self.roots
+        while len(nodes):
+            internal = nodes[self.feature[nodes] >= 0]
+            if not len(internal):
+                break
+            depth += 1
+            nodes = np.concatenate([self.left[internal], self.right[internal]])
+        return depth
+
+    def save(self, path) -> None:
+        np.savez_compressed(
+            path,
+            version=EXPORT_VERSION,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            default_left=self.default_left,
+            missing_type=self.missing_type,
+            roots=self.roots,
+            base_score=self.base_score,
+            output=self.output,
+            sigmoid_scale=self.sigmoid_scale,
+            input_dtype=self.input_dtype.name,
+            feature_names=np.array(self.feature_names_in_, dtype=str),
+            source=self.source,
+            model_fingerprint=self.model_fingerprint,
+        )
+
+    @classmethod
+    def load(cls, path) -> 'TreeEnsemble':
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != EXPORT_VERSION:
+                raise ValueError(f"Unsupported tree export version {int(data['version'])} in {path}")
+            arrays = {key: data[key] for key in data.files}
+        arrays['feature_names'] = arrays['feature_names'].tolist()
+        return cls(arrays)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_raw(self, X, chunk_size: int = 20_000) -> np.ndarray:
+        """Raw score (margin): base score plus the sum of leaf values."""
+        X = np.asarray(X).astype(self.input_dtype, copy=False).astype(np.float64, copy=False)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names_in_):
+            raise ValueError(f"Expected a matrix with {len(self.feature_names_in_)} columns, got shape {X.shape}")
+
+        raw = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_size):
+            raw[start:start + chunk_size] = self._raw_chunk(X[start:start + chunk_size])
+        return raw
+
+    def _raw_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        check_missing = self._has_missing or bool(np.isnan(flat).any())
+
+        # Active (row, tree) pairs; pairs that reach a leaf add its value and drop out,
+        # so the work per level shrinks instead of walking every pair to max_depth
+        pair_rows = np.repeat(np.arange(n_rows), self.n_trees)
+        offsets = pair_rows * n_features
+        nodes = np.tile(self.roots, n_rows)
+        raw = np.full(n_rows, self.base_score)
+
+        for _ in range(self.max_depth + 1):
+            leaf = self.feature[nodes] < 0
+            if leaf.any():
+                raw += np.bincount(pair_rows[leaf], weights=self.value[nodes[leaf]], minlength=n_rows)
+                internal = ~leaf
+                pair_rows = pair_rows[internal]
+                offsets = offsets[internal]
+                nodes = nodes[internal]
+            if not len(nodes):
+                break
+
+            values = flat[offsets + self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if check_missing:
+                missing_type = self.missing_type[nodes]
+                is_nan = np.isnan(values)
+                is_missing = ((missing_type == MISSING_NAN) & is_nan) | (
+                    (missing_type == MISSING_ZERO) & (is_nan | (np.abs(values) <= _ZERO_THRESHOLD))
+                )
+                # MISSING_NONE: NaN is compared as 0.0
+                nan_as_zero = (missing_type == MISSING_NONE) & is_nan
+                go_left = np.where(nan_as_zero, 0.0 <= self.threshold[nodes], go_left)
+                go_left = np.where(is_missing, self.default_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return raw
+
+    def predict(self, X) -> np.ndarray:
+        """Model output: probability for binary classifiers, value for regressors."""
+        raw = self.predict_raw(X)
+        if self.output == 'sigmoid':
+            return 1.0 / (1.0 + np.exp(-self.sigmoid_scale * raw))
+        return raw
@@ -0,0 +1,383 @@
+"""
+Compiled xG: precomputed lookup grid with bilinear interpolation.
+
+xG depends only on shot location and a few categorical features (body part,
+shot type, pressure, number of defenders). The grid evaluates the trained
+model once for every categorical combination over a pitch raster and stores
+the result next to the model (`<model>.grid.npz`). Scoring a shot is then a
+bilinear interpolation, with no model library import.
+
+The grid records a fingerprint of the model file and is rebuilt
+automatically when the model changes.
+
+Usage (from the project root):
+    python -m ai_pipeline.runtime.xg_grid build --step 0.01
+    python -m ai_pipeline.runtime.xg_grid report --samples 200000
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .feature_schema import SHOT_CATEGORICAL, SHOT_DEFAULTS, build_schema
+from .tree_export import model_fingerprint
+from .xg_runtime import (
+    XG_MODEL_PATH,
+    registry,
+    _batch_length,
+    _column,
+    _model_features,
+    _score_shots,
+    _to_columns,
+    load_model,
+)
+
+GRID_VERSION = 1
+DEFAULT_STEP = 0.01  # Normalized pitch units (~1m along the length)
+DEFAULT_MAX_DEFENDERS = 5
+UNKNOWN_CATEGORY = '__unknown__'  # Grid slot for values outside the training vocabulary
+
+XG_GRID_NAME = "xg_grid"
+
+
+def grid_path(model_path) -> Path:
+    """Grid file stored next to a model file."""
+    return Path(model_path).with_suffix('.grid.npz')
+
+
+def _shot_vocabularies(model, encoder) -> dict:
+    """Categorical vocabularies of the model (from its schema, or from its feature names)."""
+    if encoder is not None:
+        schema = encoder.schema
+    else:
+        schema = build_schema(_model_features(model) or [], SHOT_CATEGORICAL, SHOT_DEFAULTS)
+    return {field: schema['categorical'][field]['vocabulary'] for field in ('body_part', 'shot_type')}
+
+
+class XGGrid:
+    """
+    xG lookup table: one (nx, ny) raster per categorical combination.
+
+    Categorical axes: body part and shot type (training vocabulary plus an
+    unknown slot), under_pressure (0/1) and num_defenders (0..max_defenders,
+    larger values are clipped).
+    """
+
+    def __init__(self, values, step, body_parts, shot_types, max_defenders, fingerprint):
+        self.values = np.asarray(values, dtype=np.float32)  # (combos, nx, ny)
+        self.step = float(step)
+        self.body_parts = list(body_parts)
+        self.shot_types = list(shot_types)
+        self.max_defenders = int(max_defenders)
+        self.fingerprint = fingerprint
+
+        self.nx = self.values.shape[1]
+        self.ny = self.values.shape[2]
+        # Cells per normalized unit. The raster spans 0-1 with nx points, so the real
+        # spacing is 1 / (nx - 1), which differs from step when 1 / step is not an integer
+        self._cells_x = self.nx - 1.0
+        self._cells_y = self.ny - 1.0
+        self._body_index = {value: i for i, value in enumerate(self.body_parts)}
+        self._type_index = {value: i for i, value in enumerate(self.shot_types)}
+        self._n_types = len(self.shot_types)
+        self._n_defenders = self.max_defenders + 1
+
+    @staticmethod
+    def axes(step: float):
+        """Raster coordinates for a step (both axes span 0-1; spacing 1 / round(1 / step))."""
+        n = int(round(1.0 / step)) + 1
+        return np.linspace(0.0, 1.0, n)
+
+    def _combo(self, body_part, shot_type, under_pressure, num_defenders) -> int:
+        body = self._body_index.get(body_part, self._body_index[UNKNOWN_CATEGORY])
+        shot_type = self._type_index.get(shot_type, self._type_index[UNKNOWN_CATEGORY])
+        pressure = 1 if under_pressure else 0
+        defenders = min(max(int(num_defenders), 0), self.max_defenders)
+        return ((body * self._n_types + shot_type) * 2 + pressure) * self._n_defenders + defenders
+
+    def score(
+        self,
+        x_shot: float,
+        y_shot: float,
+        body_part: str = SHOT_DEFAULTS['body_part'],
+        shot_type: str = SHOT_DEFAULTS['shot_type'],
+        under_pressure: int = SHOT_DEFAULTS['under_pressure'],
+        num_defenders: int = SHOT_DEFAULTS['num_defenders']
+    ) -> float:
+        """Score one shot (scalar fast path)."""
+        raster = self.values[self._combo(body_part, shot_type, under_pressure, num_defenders)]
+        fx = min(max(x_shot * self._cells_x, 0.0), self.nx - 1.0)
+        fy = min(max(y_shot * self._cells_y, 0.0), self.ny - 1.0)
+        i = min(int(fx), self.nx - 2)
+        j = min(int(fy), self.ny - 2)
+        tx = fx - i
+        ty = fy - j
+        top = raster[i, j] * (1.0 - ty) + raster[i, j + 1] * ty
+        bottom = raster[i + 1, j] * (1.0 - ty) + raster[i + 1, j + 1] * ty
+        return float(top * (1.0 - tx) + bottom * tx)
+
+    def score_batch(self, shots) -> np.ndarray:
+        """
+        Score many shots.
+
+        Args:
+            shots: DataFrame or dict of column arrays (same fields as predict_shot_xg_batch;
+                distance_to_goal / angle_to_goal are implied by the location and ignored).
+                Missing values (None/NaN) take SHOT_DEFAULTS, as in the full model.
+        """
+        columns = _to_columns(shots)
+        n = _batch_length(columns)
+        x = _column(columns, 'x_shot', SHOT_DEFAULTS['x_shot'], n, np.float64)
+        y = _column(columns, 'y_shot', SHOT_DEFAULTS['y_shot'], n, np.float64)
+        body = self._category_index(_column(columns, 'body_part', SHOT_DEFAULTS['body_part'], n), self._body_index)
+        shot_type = self._category_index(_column(columns, 'shot_type', SHOT_DEFAULTS['shot_type'], n), self._type_index)
+        pressure = (_column(columns, 'under_pressure', SHOT_DEFAULTS['under_pressure'], n, np.float64) != 0).astype(np.int64)
+        defenders = np.clip(_column(columns, 'num_defenders', SHOT_DEFAULTS['num_defenders'], n, np.float64), 0, self.max_defenders).astype(np.int64)
+        combo = ((body * self._n_types + shot_type) * 2 + pressure) * self._n_defenders + defenders
+
+        fx = np.clip(x * self._cells_x, 0.0, self.nx - 1.0)
+        fy = np.clip(y * self._cells_y, 0.0, self.ny - 1.0)
+        i = np.minimum(fx.astype(np.int64), self.nx - 2)
+        j = np.minimum(fy.astype(np.int64), self.ny - 2)
+        tx = fx - i
+        ty = fy - j
+        v = self.values
+        top = v[combo, i, j] * (1.0 - ty) + v[combo, i, j + 1] * ty
+        bottom = v[combo, i + 1, j] * (1.0 - ty) + v[combo, i + 1, j + 1] * ty
+        return top * (1.0 - tx) + bottom * tx
+
+    @staticmethod
+    def _category_index(values: np.ndarray, index: dict) -> np.ndarray:
+        uniques, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+        unknown = index[UNKNOWN_CATEGORY]
+        return np.array([index.get(value, unknown) for value in uniques], dtype=np.int64)[inverse]
+
+    def save(self, path) -> None:
+        np.savez_compressed(
+            path,
+            version=GRID_VERSION,
+            values=self.values,
+            step=self.step,
+            body_parts=np.array(self.body_parts),
+            shot_types=np.array(self.shot_types),
+            max_defenders=self.max_defenders,
+            fingerprint=self.fingerprint,
+        )
+
+    @classmethod
+    def load(cls, path) -> 'XGGrid':
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != GRID_VERSION:
+                raise ValueError(f"Unsupported xG grid version {int(data['version'])} in {path}")
+            return cls(
+                data['values'],
+                float(data['step']),
+                data['body_parts'].tolist(),
+                data['shot_types'].tolist(),
+                int(data['max_defenders']),
+                str(data['fingerprint']),
+            )
+
+
+def build_xg_grid(
+    model_path=XG_MODEL_PATH,
+    step: float = DEFAULT_STEP,
+    max_defenders: int = DEFAULT_MAX_DEFENDERS,
+    chunk_size: int = 500_000
+) -> XGGrid:
+    """Evaluate the model over the raster for every categorical combination."""
+    model, encoder = load_model(model_path)
+    vocabularies = _shot_vocabularies(model, encoder)
+    body_parts = vocabularies['body_part'] + [UNKNOWN_CATEGORY]
+    shot_types = vocabularies['shot_type'] + [UNKNOWN_CATEGORY]
+
+    axis = XGGrid.axes(step)
+    grid_x, grid_y = np.meshgrid(axis, axis, indexing='ij')
+    grid_x = grid_x.ravel()
+    grid_y = grid_y.ravel()
+
+    combos = [
+        (body, shot_type, pressure, defenders)
+        for body in body_parts
+        for shot_type in shot_types
+        for pressure in (0, 1)
+        for defenders in range(max_defenders + 1)
+    ]
+    cells = len(grid_x)
+    values = np.empty(len(combos) * cells, dtype=np.float32)
+
+    # Score all (combo, cell) rows in chunks of whole combos
+    combos_per_chunk = max(1, chunk_size // cells)
+    for start in range(0, len(combos), combos_per_chunk):
+        chunk = combos[start:start + combos_per_chunk]
+        columns = {
+            'x_shot': np.tile(grid_x, len(chunk)),
+            'y_shot': np.tile(grid_y, len(chunk)),
+            'body_part': np.repeat(np.array([c[0] for c in chunk], dtype=object), cells),
+            'shot_type': np.repeat(np.array([c[1] for c in chunk], dtype=object), cells),
+            'under_pressure': np.repeat([c[2] for c in chunk], cells),
+            'num_defenders': np.repeat([c[3] for c in chunk], cells),
+        }
+        values[start * cells:(start + len(chunk)) * cells] = _score_shots(model, encoder, columns)
+
+    return XGGrid(
+        values.reshape(len(combos), len(axis), len(axis)),
+        step,
+        body_parts,
+        shot_types,
+        max_defenders,
+        model_fingerprint(model_path),
+    )
+
+
+def load_xg_grid(model_path=XG_MODEL_PATH, rebuild: bool = True) -> XGGrid:
+    """
+    Load the grid for a model, rebuilding it if it is missing or stale.
+
+    Args:
+        model_path: Model the grid belongs to
+        rebuild: Rebuild (and save) a missing or stale grid; otherwise raise
+    """
+    path = grid_path(model_path)
+    fingerprint = model_fingerprint(model_path)
+    grid = XGGrid.load(path) if path.exists() else None
+    if grid is not None and grid.fingerprint == fingerprint:
+        return grid
+
+    if not rebuild:
+        raise FileNotFoundError(f"xG grid missing or out of date for {model_path}: {path}")
+
+    print(f"[xG grid] {'Rebuilding stale' if grid else 'Building'} grid for {model_path}...")
+    start = time.time()
+    if grid is not None:
+        grid = build_xg_grid(model_path, grid.step, grid.max_defenders)
+    else:
+        grid = build_xg_grid(model_path)
+    grid.save(path)
+    print(f"[xG grid] Saved {path} ({grid.values.nbytes / 1e6:.1f} MB in memory, {time.time() - start:.1f}s)")
+    return grid
+
+
+def _load_grid(model_path):
+    return load_xg_grid(model_path), None
+
+
+# Loaded through the model registry, so it is swapped atomically when the model file changes
+registry.register(XG_GRID_NAME, XG_MODEL_PATH, _load_grid, watch=[XG_MODEL_PATH])
+
+
+def _current_grid() -> XGGrid:
+    """Current grid for XG_MODEL_PATH."""
+    loaded = registry.get(XG_GRID_NAME)
+    if loaded is None:
+        raise FileNotFoundError(f"xG model not found: {XG_MODEL_PATH}")
+    return loaded.model
+
+
+def _field(features: dict, name: str):
+    """Shot field, with the default for missing values (absent, None or NaN) as in predict_shot_xg."""
+    value = features.get(name)
+    return SHOT_DEFAULTS[name] if value is None or value != value else value
+
+
+def predict_shot_xg_grid(features: dict) -> float:
+    """
+    Compiled-mode predict_shot_xg: interpolated from the precomputed grid.
+
+    Same fields and defaults as predict_shot_xg; distance_to_goal and
+    angle_to_goal are implied by the location.
+    """
+    return _current_grid().score(*(
+        _field(features, name)
+        for name in ('x_shot', 'y_shot', 'body_part', 'shot_type', 'under_pressure', 'num_defenders')
+    ))
+
+
+def predict_shot_xg_grid_batch(shots) -> np.ndarray:
+    """Compiled-mode predict_shot_xg_batch: interpolated from the precomputed grid."""
+    grid = _current_grid()
+    start = time.perf_counter()
+    xg = grid.score_batch(shots)
+    registry.record_scoring(XG_GRID_NAME, len(xg), time.perf_counter() - start)
+    return xg
+
+
+def deviation_report(model_path=XG_MODEL_PATH, samples: int = 100_000, seed: int = 42) -> dict:
+    """
+    Compare the grid with the full model on random shots.
+
+    Locations are uniform over the pitch; categorical values are drawn from
+    the grid's vocabularies (known values only).
+
+    Returns:
+        {"samples", "max_abs", "mean_abs", "p99_abs", "attacking_half": {...}, "worst": {...}}
+    """
+    grid = load_xg_grid(model_path)
+    model, encoder = load_model(model_path)
+
+    rng = np.random.default_rng(seed)
+    shots = {
+        'x_shot': rng.uniform(0, 1, samples),
+        'y_shot': rng.uniform(0, 1, samples),
+        'body_part': rng.choice(np.array(grid.body_parts[:-1], dtype=object), samples),
+        'shot_type': rng.choice(np.array(grid.shot_types[:-1], dtype=object), samples),
+        'under_pressure': rng.integers(0, 2, samples),
+        'num_defenders': rng.integers(0, grid.max_defenders + 1, samples),
+    }
+
+    model_xg = _score_shots(model, encoder, shots)
+    start = time.perf_counter()
+    grid_xg = grid.score_batch(shots)
+    grid_seconds = time.perf_counter() - start
+    deviation = np.abs(grid_xg - model_xg)
+    attacking = shots['x_shot'] >= 0.5
+    worst = int(np.argmax(deviation))
+
+    def summary(values):
+        return {
+            "max_abs": round(float(values.max()), 5) if len(values) else 0.0,
+            "mean_abs": round(float(values.mean()), 5) if len(values) else 0.0,
+            "p99_abs": round(float(np.percentile(values, 99)), 5) if len(values) else 0.0,
+        }
+
+    return {
+        "samples": samples,
+        "step": grid.step,
+        **summary(deviation),
+        "attacking_half": summary(deviation[attacking]),
+        "grid_us_per_shot": round(grid_seconds / samples * 1e6, 3),
+        "worst": {
+            **{name: (values[worst].item() if hasattr(values[worst], 'item') else values[worst]) for name, values in shots.items()},
+            "model_xg": round(float(model_xg[worst]), 5),
+            "grid_xg": round(float(grid_xg[worst]), 5),
+        },
+    }
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Build or check the compiled xG lookup grid")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--model", default=str(XG_MODEL_PATH), help="xG model (.pkl)")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="Raster step in normalized pitch units")
+    parser.add_argument("--max-defenders", type=int, default=DEFAULT_MAX_DEFENDERS)
+    parser.add_argument("--samples", type=int, default=100_000, help="Random shots for the deviation report")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.time()
+        grid = build_xg_grid(args.model, args.step, args.max_defenders)
+        grid.save(grid_path(args.model))
+        print(f"Grid: {grid.values.shape[0]} combinations x {grid.nx}x{grid.ny} cells ({time.time() - start:.1f}s)")
+        print(f"Saved: {grid_path(args.model)}")
+    else:
+        report = deviation_report(args.model, args.samples, args.seed)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,166 +5,334 @@ These functions can be called from the backend to get predictions for events.
 """
 
 import os
-import joblib
+import time
+import warnings
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from .feature_schema import (
+    FeatureEncoder,
+    PASS_CATEGORICAL,
+    PASS_DEFAULTS,
+    SHOT_CATEGORICAL,
+    SHOT_DEFAULTS,
+    check_model_schema,
+    load_schema,
+    schema_path,
+)
+from .features import angle_to_goal, distance_to_goal, get_zone, get_zones, progression
+from .model_registry import ModelRegistry
+from .tree_export import TreeEnsemble, model_fingerprint, tree_path
+
 MODEL_DIR = Path(__file__).parent.parent / "models"
 XG_MODEL_PATH = MODEL_DIR / "xg_shots_model.pkl"
 PASS_MODEL_PATH = MODEL_DIR / "pass_value_model.pkl"
 
-# Lazy loading
-_xg_model = None
-_pass_model = None
+XG_MODEL_NAME = "xg_shots"
+PASS_MODEL_NAME = "pass_value"
+
+
+def _load_encoder(model, model_path):
+    """Compile the feature schema saved next to a model, if there is one."""
+    path = schema_path(model_path)
+    if not path.exists():
+        print(f"Warning: No feature schema for {model_path}, aligning features by column name. Retrain to generate {path.name}.")
+        return None
+    schema = load_schema(path)
+    check_model_schema(model, schema)
+    return FeatureEncoder(schema)
+
+
+def load_model(model_path):
+    """
+    Load a model and its compiled feature encoder (None without a schema).
+    
+    Prefers the pure-NumPy tree export (<model>.trees.npz) when it is up to
+    date with the model file, so the model library is not imported; falls
+    back to unpickling the model.
+    
+    Raises:
+        SchemaMismatchError: The model does not match its feature schema
+    """
+    model = None
+    trees = tree_path(model_path)
+    if trees.exists():
+        ensemble = TreeEnsemble.load(trees)
+        if not Path(model_path).exists() or ensemble.model_fingerprint == model_fingerprint(model_path):
+            model = ensemble
+        else:
+            print(f"Warning: {trees.name} is out of date with {Path(model_path).name}, loading the pickled model")
+    if model is None:
+        import joblib
+        model = joblib.load(model_path)
+    return model, _load_encoder(model, model_path)
+
+
+# Models are loaded lazily and reloaded when retraining replaces their files
+registry = ModelRegistry()
+registry.register(XG_MODEL_NAME, XG_MODEL_PATH, load_model)
+registry.register(PASS_MODEL_NAME, PASS_MODEL_PATH, load_model)
 
 
 def _load_xg_model():
-    """Lazy load xG model."""
-    global _xg_model
-    if _xg_model is None:
-        if not XG_MODEL_PATH.exists():
-            raise FileNotFoundError(f"xG model not found: {XG_MODEL_PATH}")
-        _xg_model = joblib.load(XG_MODEL_PATH)
-    return _xg_model
+    """Current xG model snapshot (LoadedModel)."""
+    loaded = registry.get(XG_MODEL_NAME)
+    if loaded is None:
+        raise FileNotFoundError(f"xG model not found: {XG_MODEL_PATH}")
+    return loaded
 
 
 def _load_pass_model():
-    """Lazy load pass value model."""
-    global _pass_model
-    if _pass_model is None:
-        if not PASS_MODEL_PATH.exists():
-            return None  # Model not trained yet
-        _pass_model = joblib.load(PASS_MODEL_PATH)
-    return _pass_model
+    """Current pass value model snapshot (LoadedModel), or None if not trained yet."""
+    return registry.get(PASS_MODEL_NAME)
 
 
-def get_zone(x: float, y: float) -> str:
+def _to_columns(data) -> dict:
     """
-    Map normalized coordinates (0-1) to zones.
+    Normalize batch input to a dict of equal-length numpy arrays.
     
-    Args:
-        x: Normalized x coordinate (0-1, where 0=left, 1=right)
-        y: Normalized y coordinate (0-1, where 0=attacking end, 1=defending end)
-    
-    Returns:
-        Zone name: 'Self box', 'Def third', 'Middle', 'Att third', 'Opp box'
+    Accepts a DataFrame or a dict of column arrays (scalars are broadcast).
     """
-    if x < 0.18:
-        return "Self box"
-    elif x < 0.33:
-        return "Def third"
-    elif x < 0.67:
-        return "Middle"
-    elif x < 0.82:
-        return "Att third"
+    if isinstance(data, pd.DataFrame):
+        return {name: data[name].to_numpy() for name in data.columns}
+    
+    columns = {name: np.asarray(values) for name, values in data.items()}
+    lengths = {len(values) for values in columns.values() if values.ndim > 0}
+    if len(lengths) > 1:
+        raise ValueError(f"Batch columns have different lengths: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 1
+    return {name: np.broadcast_to(values, (n,)) for name, values in columns.items()}
+
+
+def _column(columns: dict, name: str, default, n: int, dtype=None) -> np.ndarray:
+    """Column by name (missing values, None or NaN, take the default), or a constant default column."""
+    if name in columns:
+        values = columns[name]
+        missing = pd.isna(values)
+        if missing.any():
+            values = np.where(missing, default, values)
     else:
-        return "Opp box"
+        values = np.full(n, default, dtype=object if isinstance(default, str) else None)
+    return values.astype(dtype) if dtype is not None else values
 
 
-def predict_shot_xg(features: dict) -> float:
+def _batch_length(columns: dict) -> int:
+    return len(next(iter(columns.values()))) if columns else 1
+
+
+def _fill_missing(columns: dict, name: str, computed: np.ndarray) -> np.ndarray:
+    """Use a provided numeric column where present (non-NaN), else the computed values."""
+    if name not in columns:
+        return computed
+    provided = columns[name].astype(np.float64)
+    return np.where(np.isnan(provided), computed, provided)
+
+
+def _one_hot(frame: pd.DataFrame, prefix: str, values: np.ndarray) -> None:
+    """Add one-hot columns '<prefix>_<value>' (same naming as pd.get_dummies in the prep scripts)."""
+    for value in pd.unique(values):
+        frame[f'{prefix}_{value}'] = (values == value).astype(np.int64)
+
+
+def _model_features(model):
+    """Feature names the model was trained with, if the model records them."""
+    if hasattr(model, 'feature_name'):  # LightGBM Booster
+        return list(model.feature_name())
+    if hasattr(model, 'feature_names_in_'):  # sklearn / XGBoost sklearn API
+        return list(model.feature_names_in_)
+    return None
+
+
+def _feature_matrix(features: dict, n: int, categorical: dict, model, encoder):
     """
-    Predict xG (Expected Goals) for a shot.
+    Model input for a batch of derived features.
+    
+    With a feature schema, the compiled encoder writes a float32 matrix in
+    schema order. Models saved without a schema get a DataFrame whose
+    one-hot columns are aligned to the names recorded in the model: missing
+    categories are filled with 0, categories the model has never seen are
+    dropped (all-zero, as in training).
+    """
+    if encoder is not None:
+        return encoder.encode(features, n)
+    
+    frame = pd.DataFrame({name: values for name, values in features.items() if name not in categorical})
+    for field, prefix in categorical.items():
+        _one_hot(frame, prefix, features[field])
+    expected = _model_features(model)
+    if expected is None:
+        return frame
+    # LightGBM stores feature names with whitespace replaced by underscores
+    frame.columns = [str(c).replace(' ', '_') for c in frame.columns]
+    return frame.reindex(columns=expected, fill_value=0)
+
+
+def _shot_features(columns: dict) -> dict:
+    """Derived shot features for a batch (vectorized version of the single-shot logic)."""
+    n = _batch_length(columns)
+    x_norm = _column(columns, 'x_shot', SHOT_DEFAULTS['x_shot'], n, np.float64)
+    y_norm = _column(columns, 'y_shot', SHOT_DEFAULTS['y_shot'], n, np.float64)
+    
+    # Same kernels as the dataset preparation (attacking right, goal at x=1.0, y=0.5)
+    return {
+        'x_shot': x_norm,
+        'y_shot': y_norm,
+        'distance_to_goal': _fill_missing(columns, 'distance_to_goal', distance_to_goal(x_norm, y_norm)),
+        'angle_to_goal': _fill_missing(columns, 'angle_to_goal', angle_to_goal(x_norm, y_norm)),
+        'under_pressure': _column(columns, 'under_pressure', SHOT_DEFAULTS['under_pressure'], n),
+        'num_defenders': _column(columns, 'num_defenders', SHOT_DEFAULTS['num_defenders'], n),
+        'body_part': _column(columns, 'body_part', SHOT_DEFAULTS['body_part'], n),
+        'shot_type': _column(columns, 'shot_type', SHOT_DEFAULTS['shot_type'], n),
+        'zone': get_zones(x_norm),
+    }
+
+
+def _pass_features(columns: dict) -> dict:
+    """Derived pass features for a batch (vectorized version of the single-pass logic)."""
+    n = _batch_length(columns)
+    x_start = _column(columns, 'x_start', PASS_DEFAULTS['x_start'], n, np.float64)
+    y_start = _column(columns, 'y_start', PASS_DEFAULTS['y_start'], n, np.float64)
+    x_end = _column(columns, 'x_end', PASS_DEFAULTS['x_end'], n, np.float64)
+    y_end = _column(columns, 'y_end', PASS_DEFAULTS['y_end'], n, np.float64)
+    progress = progression(x_start, y_start, x_end, y_end)
+    
+    return {
+        'x_start': x_start,
+        'y_start': y_start,
+        'x_end': x_end,
+        'y_end': y_end,
+        'forward_progress': _fill_missing(columns, 'forward_progress', progress['forward_progress']),
+        'lateral_progress': _fill_missing(columns, 'lateral_progress', progress['lateral_progress']),
+        'successful': _column(columns, 'successful', PASS_DEFAULTS['successful'], n),
+        'length': _fill_missing(columns, 'length', progress['length']),
+        'zone_start': columns['zone_start'] if 'zone_start' in columns else get_zones(x_start),
+        'zone_end': columns['zone_end'] if 'zone_end' in columns else get_zones(x_end),
+        'pass_type': _column(columns, 'pass_type', PASS_DEFAULTS['pass_type'], n),
+    }
+
+
+def predict_shot_xg_batch(shots) -> np.ndarray:
+    """
+    Predict xG for many shots with a single model call.
     
     Args:
-        features: Dictionary with shot features:
-            - x_shot: float (0-1, normalized x coordinate)
-            - y_shot: float (0-1, normalized y coordinate)
-            - distance_to_goal: float (meters, optional - will calculate if missing)
-            - angle_to_goal: float (radians, optional - will calculate if missing)
-            - body_part: str (e.g., "foot", "head", default: "foot")
-            - shot_type: str (e.g., "open_play", "free_kick", default: "open_play")
-            - under_pressure: int (0 or 1, default: 0)
-            - num_defenders: int (default: 0)
+        shots: DataFrame or dict of column arrays with the same fields as
+            predict_shot_xg (x_shot, y_shot, optional distance_to_goal,
+            angle_to_goal, body_part, shot_type, under_pressure, num_defenders).
+            Missing columns use the same defaults; NaN distance/angle values
+            are computed from the coordinates.
     
     Returns:
-        xG value (0-1): Probability of goal
-    """
-    model = _load_xg_model()
-    
-    # Calculate missing features if needed
-    x_norm = features.get('x_shot', 0.5)
-    y_norm = features.get('y_shot', 0.5)
+        Array of xG values (0-1), one per shot
     
-    if 'distance_to_goal' not in features:
-        # Calculate distance (simplified)
-        PITCH_LENGTH = 105.0
-        PITCH_WIDTH = 68.0
-        goal_x = 1.0  # Assuming attacking right
-        goal_y = 0.5
-        x_m = x_norm * PITCH_LENGTH
-        y_m = y_norm * PITCH_WIDTH
-        goal_x_m = goal_x * PITCH_LENGTH
-        goal_y_m = goal_y * PITCH_WIDTH
-        features['distance_to_goal'] = np.sqrt((x_m - goal_x_m)**2 + (y_m - goal_y_m)**2)
+    Raises:
+        SchemaMismatchError: The model, its feature schema and the input do not line up
+    """
+    # One snapshot per batch: a concurrent reload does not affect this batch
+    loaded = _load_xg_model()
+    start = time.perf_counter()
+    xg = _score_shots(loaded.model, loaded.encoder, _to_columns(shots))
+    registry.record_scoring(XG_MODEL_NAME, len(xg), time.perf_counter() - start)
+    return xg
+
+
+def _score_shots(model, encoder, columns: dict) -> np.ndarray:
+    """Score a batch of shot columns with a given model and encoder."""
+    n = _batch_length(columns)
+    features = _shot_features(columns)
+    X = _feature_matrix(features, n, SHOT_CATEGORICAL, model, encoder)
     
-    if 'angle_to_goal' not in features:
-        # Calculate angle
-        goal_x = 1.0
-        goal_y = 0.5
-        x_m = x_norm * 105.0
-        y_m = y_norm * 68.0
-        goal_x_m = goal_x * 105.0
-        goal_y_m = goal_y * 68.0
-        dx = goal_x_m - x_m
-        dy = goal_y_m - y_m
-        features['angle_to_goal'] = np.arctan2(dy, dx)
+    try:
+        with warnings.catch_warnings():
+            # sklearn models fitted on DataFrames warn when scored on the encoder's matrix
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            if hasattr(model, 'predict_proba'):
+                xg = model.predict_proba(X)[:, 1]
+            elif hasattr(model, 'predict'):
+                # LightGBM
+                xg = model.predict(X)
+            else:
+                xg = np.zeros(n)
+    except Exception as e:
+        # Fallback: simple heuristic
+        distance = features['distance_to_goal']
+        xg = np.select([distance < 10, distance < 20], [0.3, 0.15], default=0.05)
+        print(f"Warning: Model prediction failed, using heuristic: {e}")
     
-    # Get zone
-    zone = get_zone(x_norm, y_norm)
+    # Clamp to [0, 1]
+    return np.clip(np.asarray(xg, dtype=np.float64), 0.0, 1.0)
+
+
+def predict_pass_value_batch(passes) -> np.ndarray:
+    """
+    Predict pass value for many passes with a single model call.
     
-    # Default values
-    body_part = features.get('body_part', 'foot')
-    shot_type = features.get('shot_type', 'open_play')
-    under_pressure = features.get('under_pressure', 0)
-    num_defenders = features.get('num_defenders', 0)
+    Args:
+        passes: DataFrame or dict of column arrays with the same fields as
+            predict_pass_value (x_start, y_start, x_end, y_end, optional
+            forward_progress, lateral_progress, zone_start, zone_end,
+            pass_type, successful, length). Missing columns use the same
+            defaults; NaN progress/length values are computed.
     
-    # Create feature vector (match training format)
-    feature_dict = {
-        'x_shot': x_norm,
-        'y_shot': y_norm,
-        'distance_to_goal': features['distance_to_goal'],
-        'angle_to_goal': features['angle_to_goal'],
-        'under_pressure': under_pressure,
-        'num_defenders': num_defenders,
-    }
+    Returns:
+        Array of pass values (0-1), one per pass
     
-    # Add one-hot encoded features
-    # Note: This should match the training format
-    # For simplicity, we'll create a DataFrame and let pandas handle encoding
-    feature_dict[f'body_{body_part}'] = 1
-    feature_dict[f'type_{shot_type}'] = 1
-    feature_dict[f'zone_{zone}'] = 1
+    Raises:
+        SchemaMismatchError: The model, its feature schema and the input do not line up
+    """
+    loaded = _load_pass_model()
     
-    # Convert to DataFrame
-    feature_df = pd.DataFrame([feature_dict])
+    if loaded is None:
+        # Model not trained yet
+        raise NotImplementedError("Pass value model not trained yet. Run train_pass_value.py first.")
     
-    # Get model's expected features (from training)
-    # This is a simplified version - in production, you'd save the feature list
-    # For now, we'll try to predict and handle missing features
+    model = loaded.model
+    start = time.perf_counter()
+    columns = _to_columns(passes)
+    n = _batch_length(columns)
+    features = _pass_features(columns)
+    X = _feature_matrix(features, n, PASS_CATEGORICAL, model, loaded.encoder)
     
     try:
-        # Predict
-        if hasattr(model, 'predict_proba'):
-            xg = model.predict_proba(feature_df)[0, 1]
-        elif hasattr(model, 'predict'):
-            # LightGBM
-            xg = model.predict(feature_df)[0]
-        else:
-            xg = 0.0
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            if hasattr(model, 'predict'):
+                value = model.predict(X)
+            else:
+                value = np.zeros(n)
     except Exception as e:
         # Fallback: simple heuristic
-        distance = features['distance_to_goal']
-        if distance < 10:
-            xg = 0.3
-        elif distance < 20:
-            xg = 0.15
-        else:
-            xg = 0.05
+        forward = features['forward_progress']
+        value = np.select([forward > 0.2, forward > 0], [0.3, 0.15], default=0.05)
         print(f"Warning: Model prediction failed, using heuristic: {e}")
     
     # Clamp to [0, 1]
-    return max(0.0, min(1.0, xg))
+    value = np.clip(np.asarray(value, dtype=np.float64), 0.0, 1.0)
+    registry.record_scoring(PASS_MODEL_NAME, n, time.perf_counter() - start)
+    return value
+
+
+def predict_shot_xg(features: dict) -> float:
+    """
+    Predict xG (Expected Goals) for a shot.
+    
+    Args:
+        features: Dictionary with shot features:
+            - x_shot: float (0-1, normalized x coordinate)
+            - y_shot: float (0-1, normalized y coordinate)
+            - distance_to_goal: float (meters, optional - will calculate if missing)
+            - angle_to_goal: float (radians, optional - will calculate if missing)
+            - body_part: str (e.g., "foot", "head", default: "foot")
+            - shot_type: str (e.g., "open_play", "free_kick", default: "open_play")
+            - under_pressure: int (0 or 1, default: 0)
+            - num_defenders: int (default: 0)
+    
+    Returns:
+        xG value (0-1): Probability of goal
+    """
+    # One-row batch, so single and batch scoring share one code path
+    return float(predict_shot_xg_batch({name: [value] for name, value in features.items()})[0])
 
 
 def predict_pass_value(features: dict) -> float:
@@ -188,76 +356,8 @@ def predict_pass_value(features: dict) -> float:
     Returns:
         Pass value (0-1): Probability/value of pass leading to goal/shot
     """
-    model = _load_pass_model()
-    
-    if model is None:
-        # Model not trained yet
-        raise NotImplementedError("Pass value model not trained yet. Run train_pass_value.py first.")
-    
-    # Calculate missing features
-    x_start = features.get('x_start', 0.5)
-    y_start = features.get('y_start', 0.5)
-    x_end = features.get('x_end', 0.5)
-    y_end = features.get('y_end', 0.5)
-    
-    if 'forward_progress' not in features:
-        features['forward_progress'] = x_end - x_start
-    
-    if 'lateral_progress' not in features:
-        features['lateral_progress'] = abs(y_end - y_start)
-    
-    if 'zone_start' not in features:
-        features['zone_start'] = get_zone(x_start, y_start)
-    
-    if 'zone_end' not in features:
-        features['zone_end'] = get_zone(x_end, y_end)
-    
-    if 'length' not in features:
-        features['length'] = np.sqrt((x_end - x_start)**2 + (y_end - y_start)**2)
-    
-    # Default values
-    pass_type = features.get('pass_type', 'normal')
-    successful = features.get('successful', 1)
-    
-    # Create feature vector
-    feature_dict = {
-        'x_start': x_start,
-        'y_start': y_start,
-        'x_end': x_end,
-        'y_end': y_end,
-        'forward_progress': features['forward_progress'],
-        'lateral_progress': features['lateral_progress'],
-        'successful': successful,
-        'length': features['length'],
-    }
-    
-    # Add one-hot encoded features
-    feature_dict[f'zone_start_{features["zone_start"]}'] = 1
-    feature_dict[f'zone_end_{features["zone_end"]}'] = 1
-    feature_dict[f'type_{pass_type}'] = 1
-    
-    # Convert to DataFrame
-    feature_df = pd.DataFrame([feature_dict])
-    
-    try:
-        # Predict
-        if hasattr(model, 'predict'):
-            value = model.predict(feature_df)[0]
-        else:
-            value = 0.0
-    except Exception as e:
-        # Fallback: simple heuristic
-        forward = features['forward_progress']
-        if forward > 0.2:
-            value = 0.3
-        elif forward > 0:
-            value = 0.15
-        else:
-            value = 0.05
-        print(f"Warning: Model prediction failed, using heuristic: {e}")
-    
-    # Clamp to [0, 1]
-    return max(0.0, min(1.0, value))
+    # One-row batch, so single and batch scoring share one code path
+    return float(predict_pass_value_batch({name: [value] for name, value in features.items()})[0])
 
 
 # Example usage
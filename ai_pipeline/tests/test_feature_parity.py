@@ -0,0 +1,44 @@
+"""
+Train/serve feature parity.
+
+The runtime scorers (xg_runtime) and the dataset preparation scripts derive
+the geometric features with the kernels in ai_pipeline/runtime/features.py.
+These tests encode the runtime features of a small synthetic event table
+and require them to equal the one-hot training matrix exactly, so a change
+to the kernels cannot silently break parity.
+
+Run from the project root:
+    python -m pytest ai_pipeline/tests -q
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+# The event scripts import their siblings directly (they are run as files)
+sys.path.insert(0, str(ROOT / "ai_pipeline" / "events"))
+sys.path.insert(0, str(ROOT))
+
+from benchmark_features import check_runtime_parity, make_synthetic_events  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def events(tmp_path_factory):
+    path = tmp_path_factory.mktemp("events") / "events.csv"
+    make_synthetic_events(path, n_events=20_000, n_matches=20, seed=7)
+    return pd.read_csv(path)
+
+
+@pytest.fixture(scope="module")
+def parity(events):
+    return check_runtime_parity(events)
+
+
+@pytest.mark.parametrize("name", ["shots_runtime", "passes_runtime"])
+def test_runtime_features_match_training(parity, name):
+    result = parity[name]
+    assert result["rows"] > 0
+    assert result["mismatched_rows"] == 0
@@ -0,0 +1,89 @@
+"""
+Missing shot fields in the compiled xG grid and the full model.
+
+predict_shot_xg(_batch) fills missing values (absent, None or NaN) with
+SHOT_DEFAULTS. The grid (xg_grid) must score the same inputs without
+failing and with the same defaults, or it cannot replace the full model.
+A small LightGBM model is trained on synthetic shots for this.
+
+Run from the project root:
+    python -m pytest ai_pipeline/tests -q
+"""
+
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+# The event scripts import their siblings directly (they are run as files)
+sys.path.insert(0, str(ROOT / "ai_pipeline" / "events"))
+sys.path.insert(0, str(ROOT))
+
+lgb = pytest.importorskip("lightgbm")
+
+import prepare_shot_dataset as shots  # noqa: E402
+from benchmark_features import make_synthetic_events  # noqa: E402
+from ai_pipeline.runtime import xg_grid  # noqa: E402
+from ai_pipeline.runtime.feature_schema import SHOT_CATEGORICAL, SHOT_DEFAULTS, build_schema, save_schema, schema_path  # noqa: E402
+from ai_pipeline.runtime.xg_runtime import _score_shots, _to_columns, load_model  # noqa: E402
+
+MISSING = {
+    'x_shot': [0.9, np.nan, 0.8],
+    'y_shot': [0.5, 0.4, None],
+    'body_part': [None, 'head', np.nan],
+    'shot_type': ['open_play', None, 'open_play'],
+    'under_pressure': [None, 1, np.nan],
+    'num_defenders': [None, 2, np.nan],
+}
+
+
+def _filled(batch: dict) -> dict:
+    return {
+        name: [SHOT_DEFAULTS[name] if value is None or value != value else value for value in values]
+        for name, values in batch.items()
+    }
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("xg")
+    make_synthetic_events(tmp / "events.csv", n_events=20_000, n_matches=20, seed=7)
+    events = pd.read_csv(tmp / "events.csv")
+    prepared = shots.prepare_shot_features(events[events['event_type'].isin(shots.SHOT_TYPES)])
+    training = pd.get_dummies(prepared, columns=list(SHOT_CATEGORICAL), prefix=list(SHOT_CATEGORICAL.values()))
+    X = training.drop(columns=['is_goal']).astype(np.float64)
+    booster = lgb.train({'objective': 'binary', 'verbose': -1}, lgb.Dataset(X, label=training['is_goal']), num_boost_round=20)
+
+    path = tmp / "xg_shots_model.pkl"
+    joblib.dump(booster, path)
+    save_schema(build_schema(X.columns, SHOT_CATEGORICAL, SHOT_DEFAULTS, target='is_goal'), schema_path(path))
+    return path
+
+
+@pytest.fixture(scope="module")
+def grid(model_path):
+    return xg_grid.build_xg_grid(model_path, step=0.05)
+
+
+def test_grid_batch_defaults_missing_values(grid):
+    np.testing.assert_array_equal(grid.score_batch(MISSING), grid.score_batch(_filled(MISSING)))
+
+
+def test_full_model_defaults_missing_values(model_path):
+    model, encoder = load_model(model_path)
+    np.testing.assert_array_equal(
+        _score_shots(model, encoder, _to_columns(MISSING)),
+        _score_shots(model, encoder, _to_columns(_filled(MISSING))),
+    )
+
+
+def test_grid_scalar_defaults_missing_values(grid, monkeypatch):
+    monkeypatch.setattr(xg_grid, "_current_grid", lambda: grid)
+    for i in range(len(MISSING['x_shot'])):
+        features = {name: values[i] for name, values in MISSING.items()}
+        expected = grid.score(**{name: values[i] for name, values in _filled(MISSING).items()})
+        assert xg_grid.predict_shot_xg_grid(features) == expected
@@ -20,6 +20,10 @@ from pathlib import Path
 import json
 import sys
 from typing import Dict, List, Optional, Tuple
+
+# Allow running as a script (python football_ai/analysis.py), as the API route does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 try:
     from football_ai.enhanced_event_detection import EnhancedEventDetector
 except (ImportError, SyntaxError) as e:
@@ -27,13 +31,17 @@ except (ImportError, SyntaxError) as e:
     print(f"[FootballAI] Enhanced event detection not available: {e}", file=sys.stderr)
     EnhancedEventDetector = None
 try:
-    from football_ai.advanced_tracking import AdvancedEventDetector, PlayerTracker, BallTracker
+    from football_ai.advanced_tracking import AdvancedEventDetector, detections_to_table
 except (ImportError, SyntaxError) as e:
     # Fallback if module not available or has syntax errors
     print(f"[FootballAI] Advanced tracking not available: {e}", file=sys.stderr)
     AdvancedEventDetector = None
-    PlayerTracker = None
-    BallTracker = None
+    detections_to_table = None
+try:
+    from football_ai.event_merging import EventMerger
+except (ImportError, SyntaxError) as e:
+    print(f"[FootballAI] Event merging not available: {e}", file=sys.stderr)
+    EventMerger = None
 from ultralytics import YOLO
 
 
@@ -98,7 +106,10 @@ class FootballVideoAnalyzer:
         self,
         video_path: str,
         output_format: str = "json",
-        use_advanced_tracking: bool = True
+        use_advanced_tracking: bool = True,
+        merge_events: bool = True,
+        event_types: Optional[List[str]] = None,
+        detections_cache: Optional[str] = None
     ) -> Dict:
         """
         Analyze video frame by frame
@@ -106,6 +117,11 @@ class FootballVideoAnalyzer:
         Args:
             video_path: Path to video file
             output_format: 'json' or 'dict'
+            merge_events: Collapse per-frame duplicate events (see event_merging.py)
+            event_types: Event types to detect, e.g. ["shot", "pass"] (None = all).
+                         Detectors for other types are not evaluated.
+            detections_cache: If set, write per-frame detections to this JSON file
+                              (input for football_ai.calibrate_thresholds)
         
         Returns:
             Dictionary with detections per frame
@@ -127,21 +143,16 @@ class FootballVideoAnalyzer:
         print(f"[FootballAI] Video: {width}x{height}, {fps} FPS, {total_frames} frames, {duration:.2f}s", file=sys.stderr)
         
         # Initialize advanced tracking if available
+        # (players and ball are tracked in one batch after detection, see process_match)
         advanced_detector = None
-        player_tracker = None
-        ball_tracker = None
         
-        if use_advanced_tracking and AdvancedEventDetector and PlayerTracker and BallTracker:
+        if use_advanced_tracking and AdvancedEventDetector:
             try:
                 advanced_detector = AdvancedEventDetector(fps=fps)
-                player_tracker = PlayerTracker()
-                ball_tracker = BallTracker()
                 print("[FootballAI] Using advanced tracking (90-95% accuracy)", file=sys.stderr)
             except Exception as e:
                 print(f"[FootballAI] Advanced tracking failed: {e}, using basic detection", file=sys.stderr)
                 advanced_detector = None
-                player_tracker = None
-                ball_tracker = None
         
         frames_data = []
         frame_number = 0
@@ -167,7 +178,6 @@ class FootballVideoAnalyzer:
             
             # Extract detections
             detections = []
-            current_detections = []  # For tracking
             
             for result in results:
                 boxes = result.boxes
@@ -198,30 +208,19 @@ class FootballVideoAnalyzer:
                                 "y2": float(y2),
                             },
                             "position": {
-                                "x": round(norm_x, 2),
-                                "y": round(norm_y, 2),
+                                "x": round(float(norm_x), 2),
+                                "y": round(float(norm_y), 2),
                             },
                         }
                         detections.append(detection)
-                        current_detections.append(detection)
             
-            # Update trackers if available
-            if player_tracker and ball_tracker:
-                player_tracker.update(current_detections, frame_number)
-                ball_tracker.update(current_detections, frame_number)
-            
-            # Store frame data with tracking info
+            # Store frame data
             frame_data = {
                 "frame": frame_number,
                 "timestamp": round(frame_number / fps, 2) if fps > 0 else 0,
                 "detections": detections,
             }
             
-            # Add tracking data if available
-            if player_tracker and ball_tracker:
-                frame_data["tracked_players"] = player_tracker.get_tracked_players_data()
-                frame_data["tracked_ball"] = ball_tracker.get_tracked_ball_data()
-            
             frames_data.append(frame_data)
             
             frame_number += 1
@@ -233,30 +232,45 @@ class FootballVideoAnalyzer:
         
         cap.release()
         
+        if detections_cache:
+            save_detections_cache(detections_cache, frames_data, fps, video_path)
+        
         # Detect events using advanced detector or basic detection
         # NOTE: EnhancedEventDetector generates events with all required fields for analytics features
         print("[FootballAI] Detecting events...", file=sys.stderr)
+        possession = None
         if advanced_detector:
             try:
-                all_events = advanced_detector.detect_all_events(frames_data)
+                match = advanced_detector.process_match(detections_to_table(frames_data), event_types)
+                all_events = match["events"]
+                possession = match["possession"]
                 print(f"[FootballAI] Detected {len(all_events)} events using advanced tracking", file=sys.stderr)
             except Exception as e:
                 print(f"[FootballAI] Advanced event detection failed: {e}, using basic detection", file=sys.stderr)
-                all_events = self.detect_events(frames_data, fps)
+                all_events = self.detect_events(frames_data, fps, event_types)
         elif EnhancedEventDetector:
             try:
                 detector = EnhancedEventDetector(fps=fps)
-                all_events = detector.detect_all_events(frames_data)
+                all_events = detector.detect_all_events(frames_data, event_types=event_types)
+                possession = detector.possession_stats
                 print(f"[FootballAI] Detected {len(all_events)} events using enhanced detection", file=sys.stderr)
                 print(f"[FootballAI] Events include required fields for Network Analysis, Sense Matrix, Vector Field, etc.", file=sys.stderr)
             except Exception as e:
                 print(f"[FootballAI] Enhanced event detection failed: {e}, using basic detection", file=sys.stderr)
-                all_events = self.detect_events(frames_data, fps)
+                all_events = self.detect_events(frames_data, fps, event_types)
         else:
-            all_events = self.detect_events(frames_data, fps)
+            all_events = self.detect_events(frames_data, fps, event_types)
             print(f"[FootballAI] Detected {len(all_events)} events using basic detection", file=sys.stderr)
             print(f"[FootballAI] WARNING: Basic detection may not include all fields required for analytics features", file=sys.stderr)
         
+        # Merge per-frame duplicates (touches, tackles, corners...) into single events
+        merge_report = None
+        if merge_events and EventMerger and all_events:
+            merger = EventMerger(fps=fps)
+            all_events = merger.merge(all_events)
+            merge_report = merger.last_report
+            print(f"[FootballAI] Merged events: {merge_report['input_events']} -> {merge_report['output_events']} ({merge_report['reduction_ratio']}x reduction)", file=sys.stderr)
+        
         # Aggregate results
         total_players = sum(len([d for d in f["detections"] if d["class"] == "player"]) for f in frames_data)
         total_ball_detections = sum(len([d for d in f["detections"] if d["class"] == "ball"]) for f in frames_data)
@@ -287,6 +301,8 @@ class FootballVideoAnalyzer:
             },
             "events": all_events,
             "tracking_enabled": advanced_detector is not None,
+            "event_merging": merge_report,
+            "possession": possession,
         }
         
         if output_format == "json":
@@ -296,7 +312,8 @@ class FootballVideoAnalyzer:
     def detect_events(
         self,
         frames_data: List[Dict],
-        fps: float
+        fps: float,
+        event_types: Optional[List[str]] = None
     ) -> List[Dict]:
         """
         Detect football events from frame-by-frame detections
@@ -305,6 +322,7 @@ class FootballVideoAnalyzer:
         Args:
             frames_data: List of frame detection data
             fps: Frames per second
+            event_types: Event types to detect (None = all)
         
         Returns:
             List of detected events with all types:
@@ -313,101 +331,13 @@ class FootballVideoAnalyzer:
         # Use enhanced event detector if available
         if EnhancedEventDetector:
             detector = EnhancedEventDetector(fps=fps)
-            events = detector.detect_all_events(frames_data)
+            events = detector.detect_all_events(frames_data, event_types=event_types)
             return events
         
-        # Fallback to basic detection
+        # Fallback to basic detection (shots only)
         events = []
-        prev_ball_pos = None
-        ball_velocity_threshold = 5.0
-        
-        for i, frame_data in enumerate(frames_data):
-            ball_detections = [d for d in frame_data["detections"] if d["class"] == "ball"]
-            player_detections = [d for d in frame_data["detections"] if d["class"] == "player"]
-            
-            if ball_detections:
-                ball = ball_detections[0]
-                ball_pos = ball["position"]
-                
-                if prev_ball_pos:
-                    dx = ball_pos["x"] - prev_ball_pos["x"]
-                    dy = ball_pos["y"] - prev_ball_pos["y"]
-                    velocity = np.sqrt(dx**2 + dy**2)
-                    
-                    if velocity > ball_velocity_threshold and ball_pos["x"] > 66:
-                        events.append({
-                            "type": "shot",
-                            "frame": frame_data["frame"],
-                            "timestamp": frame_data["timestamp"],
-                            "confidence": ball["confidence"],
-                            "position": ball_pos,
-                        })
-                
-                prev_ball_pos = ball_pos
-        
-        return events
-
-
-def main():
-    """CLI entry point for video analysis"""
-    if len(sys.argv) < 2:
-        print("Usage: python -m football_ai.analysis <video_path> [model_path]", file=sys.stderr)
-        sys.exit(1)
-    
-    video_path = sys.argv[1]
-    model_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    try:
-        analyzer = FootballVideoAnalyzer(model_path=model_path)
-        result = analyzer.analyze_video(video_path, output_format="json")
-        print(result)
-    except Exception as e:
-        print(json.dumps({
-            "error": str(e),
-            "type": type(e).__name__
-        }), file=sys.stderr)
-        sys.exit(1)
-
-
-if __name__ == "__main__":
-    main()
-
-
-                "tackles": len(tackles),
-            },
-            "events": all_events,
-            "tracking_enabled": advanced_detector is not None,
-        }
-        
-        if output_format == "json":
-            return json.dumps(result, indent=2)
-        return result
-    
-    def detect_events(
-        self,
-        frames_data: List[Dict],
-        fps: float
-    ) -> List[Dict]:
-        """
-        Detect football events from frame-by-frame detections
-        Uses enhanced event detection for all statistics
-        
-        Args:
-            frames_data: List of frame detection data
-            fps: Frames per second
-        
-        Returns:
-            List of detected events with all types:
-            - shot, pass, touch, tackle, interception, recovery, corner, free_kick
-        """
-        # Use enhanced event detector if available
-        if EnhancedEventDetector:
-            detector = EnhancedEventDetector(fps=fps)
-            events = detector.detect_all_events(frames_data)
+        if event_types is not None and "shot" not in event_types:
             return events
-        
-        # Fallback to basic detection
-        events = []
         prev_ball_pos = None
         ball_velocity_threshold = 5.0
         
@@ -438,198 +368,43 @@ if __name__ == "__main__":
         return events
 
 
-def main():
-    """CLI entry point for video analysis"""
-    if len(sys.argv) < 2:
-        print("Usage: python -m football_ai.analysis <video_path> [model_path]", file=sys.stderr)
-        sys.exit(1)
-    
-    video_path = sys.argv[1]
-    model_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    try:
-        analyzer = FootballVideoAnalyzer(model_path=model_path)
-        result = analyzer.analyze_video(video_path, output_format="json")
-        print(result)
-    except Exception as e:
-        print(json.dumps({
-            "error": str(e),
-            "type": type(e).__name__
-        }), file=sys.stderr)
-        sys.exit(1)
-
-
-if __name__ == "__main__":
-    main()
-
-
-                "tackles": len(tackles),
-            },
-            "events": all_events,
-            "tracking_enabled": advanced_detector is not None,
-        }
-        
-        if output_format == "json":
-            return json.dumps(result, indent=2)
-        return result
-    
-    def detect_events(
-        self,
-        frames_data: List[Dict],
-        fps: float
-    ) -> List[Dict]:
-        """
-        Detect football events from frame-by-frame detections
-        Uses enhanced event detection for all statistics
-        
-        Args:
-            frames_data: List of frame detection data
-            fps: Frames per second
-        
-        Returns:
-            List of detected events with all types:
-            - shot, pass, touch, tackle, interception, recovery, corner, free_kick
-        """
-        # Use enhanced event detector if available
-        if EnhancedEventDetector:
-            detector = EnhancedEventDetector(fps=fps)
-            events = detector.detect_all_events(frames_data)
-            return events
-        
-        # Fallback to basic detection
-        events = []
-        prev_ball_pos = None
-        ball_velocity_threshold = 5.0
-        
-        for i, frame_data in enumerate(frames_data):
-            ball_detections = [d for d in frame_data["detections"] if d["class"] == "ball"]
-            player_detections = [d for d in frame_data["detections"] if d["class"] == "player"]
-            
-            if ball_detections:
-                ball = ball_detections[0]
-                ball_pos = ball["position"]
-                
-                if prev_ball_pos:
-                    dx = ball_pos["x"] - prev_ball_pos["x"]
-                    dy = ball_pos["y"] - prev_ball_pos["y"]
-                    velocity = np.sqrt(dx**2 + dy**2)
-                    
-                    if velocity > ball_velocity_threshold and ball_pos["x"] > 66:
-                        events.append({
-                            "type": "shot",
-                            "frame": frame_data["frame"],
-                            "timestamp": frame_data["timestamp"],
-                            "confidence": ball["confidence"],
-                            "position": ball_pos,
-                        })
-                
-                prev_ball_pos = ball_pos
-        
-        return events
+def save_detections_cache(path: str, frames_data: List[Dict], fps: float, video_path: str = "") -> None:
+    """Write per-frame detections to JSON so event detection can be re-run without the video"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"video_path": video_path, "fps": fps, "frames": frames_data}, f)
+    print(f"[FootballAI] Saved detections cache: {path}", file=sys.stderr)
 
 
 def main():
     """CLI entry point for video analysis"""
-    if len(sys.argv) < 2:
-        print("Usage: python -m football_ai.analysis <video_path> [model_path]", file=sys.stderr)
-        sys.exit(1)
-    
-    video_path = sys.argv[1]
-    model_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    try:
-        analyzer = FootballVideoAnalyzer(model_path=model_path)
-        result = analyzer.analyze_video(video_path, output_format="json")
-        print(result)
-    except Exception as e:
-        print(json.dumps({
-            "error": str(e),
-            "type": type(e).__name__
-        }), file=sys.stderr)
-        sys.exit(1)
-
-
-if __name__ == "__main__":
-    main()
-
-
-                "tackles": len(tackles),
-            },
-            "events": all_events,
-            "tracking_enabled": advanced_detector is not None,
-        }
-        
-        if output_format == "json":
-            return json.dumps(result, indent=2)
-        return result
+    import argparse
     
-    def detect_events(
-        self,
-        frames_data: List[Dict],
-        fps: float
-    ) -> List[Dict]:
-        """
-        Detect football events from frame-by-frame detections
-        Uses enhanced event detection for all statistics
-        
-        Args:
-            frames_data: List of frame detection data
-            fps: Frames per second
-        
-        Returns:
-            List of detected events with all types:
-            - shot, pass, touch, tackle, interception, recovery, corner, free_kick
-        """
-        # Use enhanced event detector if available
-        if EnhancedEventDetector:
-            detector = EnhancedEventDetector(fps=fps)
-            events = detector.detect_all_events(frames_data)
-            return events
-        
-        # Fallback to basic detection
-        events = []
-        prev_ball_pos = None
-        ball_velocity_threshold = 5.0
-        
-        for i, frame_data in enumerate(frames_data):
-            ball_detections = [d for d in frame_data["detections"] if d["class"] == "ball"]
-            player_detections = [d for d in frame_data["detections"] if d["class"] == "player"]
-            
-            if ball_detections:
-                ball = ball_detections[0]
-                ball_pos = ball["position"]
-                
-                if prev_ball_pos:
-                    dx = ball_pos["x"] - prev_ball_pos["x"]
-                    dy = ball_pos["y"] - prev_ball_pos["y"]
-                    velocity = np.sqrt(dx**2 + dy**2)
-                    
-                    if velocity > ball_velocity_threshold and ball_pos["x"] > 66:
-                        events.append({
-                            "type": "shot",
-                            "frame": frame_data["frame"],
-                            "timestamp": frame_data["timestamp"],
-                            "confidence": ball["confidence"],
-                            "position": ball_pos,
-                        })
-                
-                prev_ball_pos = ball_pos
-        
-        return events
-
-
-def main():
-    """CLI entry point for video analysis"""
-    if len(sys.argv) < 2:
-        print("Usage: python -m football_ai.analysis <video_path> [model_path]", file=sys.stderr)
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Analyze a football video with YOLOv8")
+    parser.add_argument("video_path", help="Path to video file")
+    parser.add_argument("model_path", nargs="?", default=None, help="Custom YOLOv8 model (.pt)")
+    parser.add_argument(
+        "--events",
+        default=None,
+        help="Comma-separated event types to detect, e.g. shot,pass (default: all)",
+    )
+    parser.add_argument(
+        "--save-detections",
+        default=None,
+        help="Write per-frame detections to this JSON file (for threshold calibration)",
+    )
+    args = parser.parse_args()
     
-    video_path = sys.argv[1]
-    model_path = sys.argv[2] if len(sys.argv) > 2 else None
+    event_types = [t.strip() for t in args.events.split(",") if t.strip()] if args.events else None
     
     try:
-        analyzer = FootballVideoAnalyzer(model_path=model_path)
-        result = analyzer.analyze_video(video_path, output_format="json")
+        analyzer = FootballVideoAnalyzer(model_path=args.model_path)
+        result = analyzer.analyze_video(
+            args.video_path,
+            output_format="json",
+            event_types=event_types,
+            detections_cache=args.save_detections,
+        )
         print(result)
     except Exception as e:
         print(json.dumps({
@@ -641,4 +416,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
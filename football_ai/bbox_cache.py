@@ -0,0 +1,232 @@
+"""
+Binary cache of the SoccerNet MaskRCNN bounding boxes
+
+A *_player_boundingbox_maskrcnn.json file holds one prediction per video
+frame ({"predictions": [{"bboxes": [[x1, y1, x2, y2, ...], ...]}, ...]}).
+It is parsed once and stored as two NumPy arrays:
+
+    <cache root>/1_player_boundingbox_maskrcnn_<hash>/
+        offsets.npy   int64 (frames + 1): boxes of frame i are rows offsets[i]:offsets[i + 1]
+        boxes.npy     float32 (boxes, 4): x1, y1, x2, y2 in pixels
+        source.json   size and mtime of the JSON the arrays were built from
+
+The cache root of a dataset sits next to it, not inside it
+(datasets/.soccernet_data.bboxcache). Writing a cache then does not change
+the mtime of the game folders, which would make the video index
+(soccernet_index) rescan, and read-only datasets can be cached too. Without
+a cache root the folder is <stem>.bboxcache next to the JSON. If the cache
+cannot be written, the boxes are parsed into memory for that run.
+
+The arrays are memory-mapped when read. Looking up a frame's boxes needs no
+parsing, and only the pages that are touched are loaded. The cache is
+rebuilt when the JSON changes.
+
+Convert a whole dataset up front with:
+    python -m football_ai.bbox_cache datasets/soccernet_data --workers 4
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+BBOX_CACHE_VERSION = 1
+BBOX_PATTERN = "*player_boundingbox_maskrcnn.json"
+
+
+class FrameBoxes:
+    """Bounding boxes per video frame (CSR layout: offsets + boxes)"""
+
+    def __init__(self, offsets: np.ndarray, boxes: np.ndarray):
+        self.offsets = offsets
+        self.boxes = boxes
+
+    @classmethod
+    def from_predictions(cls, predictions: List) -> "FrameBoxes":
+        """Build from the "predictions" list of a bbox JSON (non-dict entries have no boxes)"""
+        frame_bboxes = [(p.get("bboxes") or []) if isinstance(p, dict) else [] for p in predictions]
+        offsets = np.zeros(len(frame_bboxes) + 1, dtype=np.int64)
+        np.cumsum([len(bboxes) for bboxes in frame_bboxes], out=offsets[1:])
+        boxes = np.array(
+            [bbox[:4] for bboxes in frame_bboxes for bbox in bboxes],
+            dtype=np.float32,
+        ).reshape(-1, 4)
+        return cls(offsets, boxes)
+
+    def __len__(self) -> int:
+        """Number of frames"""
+        return len(self.offsets) - 1
+
+    def frame(self, frame_idx: int) -> np.ndarray:
+        """Boxes of one frame: (n, 4) x1, y1, x2, y2"""
+        return self.boxes[self.offsets[frame_idx]:self.offsets[frame_idx + 1]]
+
+
+def default_cache_root(data_dir: Path) -> Path:
+    """Cache root of a dataset: next to (not inside) the data folder"""
+    data_dir = Path(os.path.abspath(data_dir))
+    return data_dir.parent / f".{data_dir.name}.bboxcache"
+
+
+def bbox_cache_path(json_path: Path, cache_root: Optional[Path] = None) -> Path:
+    """Cache folder of a bbox JSON (next to it without a cache root)"""
+    json_path = Path(json_path)
+    if cache_root is None:
+        return json_path.with_name(f"{json_path.stem}.bboxcache")
+    digest = hashlib.sha1(os.path.abspath(json_path).encode()).hexdigest()[:12]
+    return Path(cache_root) / f"{json_path.stem}_{digest}"
+
+
+def _source_state(json_path: Path) -> dict:
+    stat = os.stat(json_path)
+    return {"version": BBOX_CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_cache_valid(json_path: Path, cache_root: Optional[Path] = None) -> bool:
+    """True if the cache exists and was built from the current JSON"""
+    cache_dir = bbox_cache_path(json_path, cache_root)
+    try:
+        with open(cache_dir / "source.json", "r") as f:
+            return json.load(f) == _source_state(json_path)
+    except (OSError, ValueError):
+        return False
+
+
+def _parse_bbox_json(json_path: Path) -> Tuple[dict, FrameBoxes]:
+    """State of the JSON (taken before reading it) and its boxes"""
+    state = _source_state(json_path)
+    with open(json_path, "r") as f:
+        return state, FrameBoxes.from_predictions(json.load(f).get("predictions", []))
+
+
+def _write_cache(json_path: Path, state: dict, frame_boxes: FrameBoxes, cache_root: Optional[Path]) -> Path:
+    # Build in a temporary folder, then swap it in (readers never see a partial cache)
+    cache_dir = bbox_cache_path(json_path, cache_root)
+    tmp_dir = cache_dir.with_name(cache_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        np.save(tmp_dir / "offsets.npy", frame_boxes.offsets)
+        np.save(tmp_dir / "boxes.npy", frame_boxes.boxes)
+        with open(tmp_dir / "source.json", "w") as f:
+            json.dump(state, f)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return cache_dir
+
+
+def convert_bbox_json(json_path: Path, cache_root: Optional[Path] = None) -> Path:
+    """
+    Parse a bbox JSON once and write its binary cache
+
+    Returns:
+        Cache folder
+    """
+    json_path = Path(json_path)
+    state, frame_boxes = _parse_bbox_json(json_path)
+    return _write_cache(json_path, state, frame_boxes, cache_root)
+
+
+def load_frame_boxes(json_path: Path, convert: bool = True, cache_root: Optional[Path] = None) -> Optional[FrameBoxes]:
+    """
+    Boxes of a bbox JSON: memory-mapped from its cache, or parsed (and cached)
+
+    Args:
+        json_path: *_player_boundingbox_maskrcnn.json
+        convert: Build the cache if missing or stale (else return None)
+        cache_root: Folder holding the caches (default: next to the JSON)
+    """
+    json_path = Path(json_path)
+    if is_cache_valid(json_path, cache_root):
+        cache_dir = bbox_cache_path(json_path, cache_root)
+        return FrameBoxes(
+            np.load(cache_dir / "offsets.npy", mmap_mode="r"),
+            np.load(cache_dir / "boxes.npy", mmap_mode="r"),
+        )
+    if not convert:
+        return None
+
+    state, frame_boxes = _parse_bbox_json(json_path)
+    try:
+        _write_cache(json_path, state, frame_boxes, cache_root)
+    except OSError as e:
+        # Read-only location: use the parsed boxes for this run only
+        print(f"[BBoxCache] Could not cache {json_path}, using it uncached: {e}", file=sys.stderr)
+    return frame_boxes
+
+
+def _convert_if_stale(json_path: str, cache_root: str) -> Optional[dict]:
+    """Worker: convert one JSON unless its cache is current"""
+    if is_cache_valid(Path(json_path), cache_root):
+        return None
+    start = time.perf_counter()
+    cache_dir = convert_bbox_json(Path(json_path), cache_root)
+    size = sum(path.stat().st_size for path in cache_dir.iterdir())
+    return {"file": json_path, "seconds": time.perf_counter() - start, "bytes": size}
+
+
+def convert_dataset(
+    data_dir: str = "datasets/soccernet_data",
+    workers: Optional[int] = None,
+    cache_root: Optional[str] = None
+) -> int:
+    """
+    Convert every bbox JSON under data_dir whose cache is missing or stale
+
+    Args:
+        cache_root: Folder holding the caches (default: default_cache_root(data_dir))
+
+    Returns:
+        Number of files converted
+    """
+    json_files = sorted(str(path) for path in Path(data_dir).rglob(BBOX_PATTERN))
+    print(f"[BBoxCache] Found {len(json_files)} bounding box files", file=sys.stderr)
+    if not json_files:
+        return 0
+
+    cache_root = str(cache_root or default_cache_root(data_dir))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = [
+            r for r in pool.map(_convert_if_stale, json_files, [cache_root] * len(json_files)) if r is not None
+        ]
+    for result in results:
+        print(
+            f"[BBoxCache] {result['file']}: {result['bytes'] / 1e6:.1f} MB in {result['seconds']:.1f}s",
+            file=sys.stderr
+        )
+    print(
+        f"[BBoxCache] Converted {len(results)} files ({len(json_files) - len(results)} up to date) "
+        f"in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr
+    )
+    return len(results)
+
+
+def main():
+    """CLI entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert SoccerNet bbox JSON files to memory-mapped arrays")
+    parser.add_argument("data_dir", nargs="?", default="datasets/soccernet_data", help="SoccerNet data folder")
+    parser.add_argument("--workers", type=int, default=None, help="Files converted in parallel (default: CPU count)")
+    parser.add_argument(
+        "--cache-dir", default=None, help="Cache folder (default: .<data folder name>.bboxcache next to data_dir)"
+    )
+    args = parser.parse_args()
+
+    convert_dataset(args.data_dir, args.workers, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Threshold Calibration for Event Detection
+Sweeps detector thresholds over cached detections and scores them against labels
+
+Inputs:
+- Detections cache written by `python -m football_ai.analysis <video> --save-detections cache.json`
+- Labeled events: JSON list (or CSV) of {"type": "shot", "frame": 1234}
+  ("timestamp" in seconds can be given instead of "frame")
+
+Only thresholds read by the detectors of the labeled event types are
+searched. Each threshold configuration runs the event detector (only for
+the labeled event types) in a pool of worker processes. Every worker loads the cache and
+tracks players once, then reuses them for all configurations it evaluates.
+--detector picks the batch AdvancedEventDetector (default, the one used by
+analysis) or the per-frame EnhancedEventDetector.
+Reports precision/recall/F1 per event type for every configuration.
+
+Usage:
+    python -m football_ai.calibrate_thresholds cache.json labels.json --workers 8
+    python -m football_ai.calibrate_thresholds cache.json labels.json --search random --samples 300
+    python -m football_ai.calibrate_thresholds cache.json labels.json --detector enhanced
+"""
+
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Allow running as a script (python football_ai/calibrate_thresholds.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from football_ai.advanced_tracking import (
+    AdvancedEventDetector,
+    BATCH_DATA_DEPENDENCIES,
+    BATCH_EVENT_DETECTORS,
+    detections_to_table,
+)
+from football_ai.enhanced_event_detection import EnhancedEventDetector, resolve_event_types
+from football_ai.event_merging import EventMerger
+
+
+# Threshold attribute -> candidate values (list) or {"min": a, "max": b} for random search
+DEFAULT_SEARCH_SPACE = {
+    "shot_velocity_threshold": [3.0, 4.0, 5.0, 6.0, 8.0],
+    "touch_distance_threshold": [10.0, 15.0, 20.0, 25.0, 30.0],
+    "tackle_distance_threshold": [8.0, 12.0, 16.0, 20.0],
+    "possession_control_distance": [5.0, 8.0, 10.0, 12.0, 15.0],
+}
+
+# Default search spaces per detector (--detector)
+DEFAULT_SEARCH_SPACES = {
+    "enhanced": DEFAULT_SEARCH_SPACE,
+    "advanced": {
+        "shot_velocity_threshold": [4.0, 6.0, 8.0, 10.0, 12.0],
+        "touch_distance_threshold": [10.0, 15.0, 20.0, 25.0, 30.0],
+        "tackle_distance_threshold": [8.0, 12.0, 15.0, 20.0],
+        "possession_control_distance": [5.0, 8.0, 10.0, 12.0, 15.0],
+    },
+}
+
+# Event types or shared data (see resolve_event_types) whose detection reads each threshold
+THRESHOLD_USERS = {
+    "shot_velocity_threshold": ("shot",),
+    "touch_distance_threshold": ("touch",),
+    "tackle_distance_threshold": ("tackle",),
+    "possession_control_distance": ("possession",),
+}
+
+# Per-worker state (filled once by _init_worker)
+_worker = {}
+
+
+def load_detections(path: str) -> Tuple[List[Dict], float]:
+    """Load a detections cache written by football_ai.analysis --save-detections"""
+    with open(path, "r") as f:
+        cache = json.load(f)
+    return cache["frames"], cache["fps"]
+
+
+def load_labels(path: str, fps: float) -> Dict[str, np.ndarray]:
+    """
+    Load labeled events as sorted frame arrays per event type
+
+    Accepts a JSON list of objects or a CSV file, each with "type" and
+    either "frame" or "timestamp" (seconds).
+    """
+    if Path(path).suffix.lower() == ".csv":
+        with open(path, "r", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, "r") as f:
+            rows = json.load(f)
+
+    frames_by_type = {}
+    for row in rows:
+        if row.get("frame") not in (None, ""):
+            frame = int(float(row["frame"]))
+        else:
+            frame = int(round(float(row["timestamp"]) * fps))
+        frames_by_type.setdefault(row["type"], []).append(frame)
+
+    return {t: np.sort(np.array(frames, dtype=np.int64)) for t, frames in frames_by_type.items()}
+
+
+def relevant_space(space: Dict, event_types: List[str], detector: str = "advanced") -> Dict:
+    """
+    Search space restricted to thresholds read when detecting event_types
+
+    A threshold of an unlabeled event type does not change the score, so
+    sweeping it only multiplies the configurations. Thresholds missing from
+    THRESHOLD_USERS are kept.
+    """
+    if detector == "advanced":
+        selected, required = resolve_event_types(event_types, BATCH_EVENT_DETECTORS, BATCH_DATA_DEPENDENCIES)
+    else:
+        selected, required = resolve_event_types(event_types)
+    used = set(selected) | required
+    return {
+        name: values for name, values in space.items()
+        if name not in THRESHOLD_USERS or used.intersection(THRESHOLD_USERS[name])
+    }
+
+
+def build_configs(
+    space: Dict,
+    search: str = "grid",
+    samples: int = 100,
+    seed: int = 42
+) -> List[Dict]:
+    """
+    Expand a search space into distinct threshold configurations (grid or random)
+
+    Random search over list-only spaces samples distinct grid points (the
+    whole grid if it has no more than `samples` points). With {"min", "max"}
+    ranges, values are drawn and duplicates dropped, keeping sample order.
+    """
+    names = sorted(space)
+    if not names:
+        return [{}]  # Nothing to search: one run with the detector defaults
+    if search == "grid" or all(isinstance(space[name], list) for name in names):
+        for name in names:
+            if not isinstance(space[name], list):
+                raise ValueError(f"Grid search needs a list of values for {name}")
+        sizes = [len(space[name]) for name in names]
+        total = int(np.prod(sizes))
+        if search == "grid" or total <= samples:
+            return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+        # Distinct grid points: sample flat indices of the product, then unravel them
+        rng = random.Random(seed)
+        configs = []
+        for flat in rng.sample(range(total), samples):
+            indices = np.unravel_index(flat, sizes)
+            configs.append({name: space[name][int(i)] for name, i in zip(names, indices)})
+        return configs
+
+    rng = random.Random(seed)
+    configs = []
+    seen = set()
+    for _ in range(samples):
+        config = {}
+        for name in names:
+            values = space[name]
+            if isinstance(values, list):
+                config[name] = rng.choice(values)
+            else:
+                config[name] = round(rng.uniform(values["min"], values["max"]), 3)
+        key = tuple(config[name] for name in names)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def match_events(detected: np.ndarray, labeled: np.ndarray, tolerance: int) -> Tuple[int, int, int]:
+    """
+    Greedily match sorted detected frames to sorted labeled frames
+
+    Returns:
+        (true positives, false positives, false negatives)
+    """
+    tp = 0
+    i = j = 0
+    while i < len(detected) and j < len(labeled):
+        if abs(detected[i] - labeled[j]) <= tolerance:
+            tp += 1
+            i += 1
+            j += 1
+        elif detected[i] < labeled[j]:
+            i += 1
+        else:
+            j += 1
+    return tp, len(detected) - tp, len(labeled) - tp
+
+
+def score_events(
+    events: List[Dict],
+    labels: Dict[str, np.ndarray],
+    tolerance: int
+) -> Dict[str, Dict]:
+    """Precision/recall/F1 per labeled event type"""
+    metrics = {}
+    for event_type, labeled in labels.items():
+        detected = np.sort(np.array(
+            [e["frame"] for e in events if e.get("type") == event_type],
+            dtype=np.int64,
+        ))
+        tp, fp, fn = match_events(detected, labeled, tolerance)
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        metrics[event_type] = {
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "f1": round(f1, 4),
+        }
+    return metrics
+
+
+def _init_worker(
+    detections_path: str,
+    labels: Dict[str, List[int]],
+    tolerance_seconds: float,
+    merge: bool,
+    detector: str = "advanced"
+) -> None:
+    """Load detections and track players once per worker process"""
+    frames_data, fps = load_detections(detections_path)
+    _worker["frames"] = frames_data
+    _worker["fps"] = fps
+    _worker["detector"] = detector
+    if detector == "advanced":
+        _worker["table"] = detections_to_table(frames_data)
+        _worker["tracked"] = AdvancedEventDetector(fps=fps).player_tracker.track_batch(_worker["table"])
+    else:
+        _worker["tracked"] = EnhancedEventDetector(fps=fps).track_all_players(frames_data)
+    _worker["labels"] = {t: np.array(frames, dtype=np.int64) for t, frames in labels.items()}
+    _worker["event_types"] = list(labels)
+    _worker["tolerance"] = int(round(tolerance_seconds * fps))
+    _worker["merge"] = merge
+
+
+def evaluate_config(config: Dict) -> Dict:
+    """Run the detector with one threshold configuration and score it"""
+    start = time.time()
+    fps = _worker["fps"]
+
+    if _worker["detector"] == "advanced":
+        detector = AdvancedEventDetector(fps=fps)
+    else:
+        detector = EnhancedEventDetector(fps=fps)
+    for name, value in config.items():
+        if not hasattr(detector, name):
+            raise ValueError(f"Unknown detector threshold: {name}")
+        setattr(detector, name, value)
+
+    if _worker["detector"] == "advanced":
+        events = detector.process_match(
+            _worker["table"],
+            event_types=_worker["event_types"],
+            player_tracks=_worker["tracked"],
+        )["events"]
+    else:
+        events = detector.detect_all_events(
+            _worker["frames"],
+            event_types=_worker["event_types"],
+            tracked_frames=_worker["tracked"],
+        )
+    if _worker["merge"]:
+        events = EventMerger(fps=fps).merge(events)
+
+    metrics = score_events(events, _worker["labels"], _worker["tolerance"])
+    return {
+        "config": config,
+        "metrics": metrics,
+        "mean_f1": round(float(np.mean([m["f1"] for m in metrics.values()])), 4) if metrics else 0.0,
+        "seconds": round(time.time() - start, 2),
+    }
+
+
+def run_calibration(
+    detections_path: str,
+    labels_path: str,
+    space: Optional[Dict] = None,
+    search: str = "grid",
+    samples: int = 100,
+    workers: Optional[int] = None,
+    tolerance_seconds: float = 1.0,
+    merge: bool = True,
+    seed: int = 42,
+    detector: str = "advanced"
+) -> List[Dict]:
+    """
+    Evaluate threshold configurations in parallel
+
+    Returns:
+        One result per configuration, best mean F1 first
+    """
+    _, fps = load_detections(detections_path)
+    labels = load_labels(labels_path, fps)
+    # Only thresholds of the labeled event types (fails early on types without a detector)
+    space = space or DEFAULT_SEARCH_SPACES[detector]
+    searched = relevant_space(space, list(labels), detector)
+    skipped = sorted(set(space) - set(searched))
+    if skipped:
+        print(f"[Calibrate] Not searching thresholds unused by the labeled event types: {skipped}", file=sys.stderr)
+
+    configs = build_configs(searched, search, samples, seed)
+    workers = workers or os.cpu_count() or 1
+    print(f"[Calibrate] {len(configs)} configurations, {workers} workers, {detector} detector, event types: {list(labels)}", file=sys.stderr)
+
+    start = time.time()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(detections_path, {t: f.tolist() for t, f in labels.items()}, tolerance_seconds, merge, detector),
+    ) as pool:
+        futures = [pool.submit(evaluate_config, config) for config in configs]
+        for done, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            if done % 10 == 0 or done == len(futures):
+                print(f"[Calibrate] {done}/{len(futures)} configurations ({time.time() - start:.1f}s)", file=sys.stderr)
+
+    results.sort(key=lambda r: r["mean_f1"], reverse=True)
+    return results
+
+
+def print_report(results: List[Dict], top: int = 10) -> None:
+    """Print the best configurations with per-type precision/recall"""
+    print("=" * 60)
+    print(f"Top {min(top, len(results))} of {len(results)} configurations (by mean F1)")
+    print("=" * 60)
+    for rank, result in enumerate(results[:top], 1):
+        print(f"{rank}. mean F1 {result['mean_f1']:.3f}  {result['config']}")
+        for event_type, m in result["metrics"].items():
+            print(f"     {event_type:<13} P {m['precision']:.3f}  R {m['recall']:.3f}  F1 {m['f1']:.3f}  (tp {m['tp']}, fp {m['fp']}, fn {m['fn']})")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate event detection thresholds against labeled events")
+    parser.add_argument("detections", help="Detections cache (football_ai.analysis --save-detections)")
+    parser.add_argument("labels", help="Labeled events (JSON or CSV with type and frame/timestamp)")
+    parser.add_argument("--space", default=None, help="JSON file with the search space (default: built-in grid)")
+    parser.add_argument("--detector", choices=sorted(DEFAULT_SEARCH_SPACES), default="advanced", help="Event detector to calibrate")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=100, help="Configurations for random search")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Match tolerance in seconds")
+    parser.add_argument("--no-merge", action="store_true", help="Score raw per-frame events")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Write all results to this JSON file")
+    args = parser.parse_args()
+
+    space = None
+    if args.space:
+        with open(args.space, "r") as f:
+            space = json.load(f)
+
+    results = run_calibration(
+        args.detections,
+        args.labels,
+        space=space,
+        search=args.search,
+        samples=args.samples,
+        workers=args.workers,
+        tolerance_seconds=args.tolerance,
+        merge=not args.no_merge,
+        seed=args.seed,
+        detector=args.detector,
+    )
+    print_report(results, args.top)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,75 @@ import numpy as np
 from typing import List, Dict, Tuple, Optional
 from collections import deque
 
+from football_ai.possession import (
+    PossessionTracker,
+    possession_stats,
+    passes_from_timeline,
+    interceptions_from_timeline,
+    recoveries_from_timeline,
+)
+from football_ai.shot_xg import score_shot_events
+
+
+# Detector registry: event type -> detector method, stage and the shared data it needs
+# - "frame" detectors run inside the frame loop: (frame_data, ball_detections, tracked_players)
+# - "possession" detectors run once on the possession timeline: (timeline)
+# Shared data: "players" (tracked players), "ball_history", "possession"
+EVENT_DETECTORS = {
+    "shot": {"method": "_detect_shots", "stage": "frame", "requires": ("players", "ball_history")},
+    "touch": {"method": "_detect_touches", "stage": "frame", "requires": ("players",)},
+    "tackle": {"method": "_detect_tackles", "stage": "frame", "requires": ("players",)},
+    "corner": {"method": "_detect_corners", "stage": "frame", "requires": ("players",)},
+    "free_kick": {"method": "_detect_free_kicks", "stage": "frame", "requires": ("players", "ball_history")},
+    "pass": {"method": "_detect_passes", "stage": "possession", "requires": ("possession",)},
+    "interception": {"method": "_detect_interceptions", "stage": "possession", "requires": ("possession",)},
+    "recovery": {"method": "_detect_recoveries", "stage": "possession", "requires": ("possession",)},
+}
+
+# Shared data that is itself built from other shared data
+DATA_DEPENDENCIES = {
+    "possession": ("players",),
+}
+
+EVENT_TYPES = tuple(EVENT_DETECTORS)
+
+
+def resolve_event_types(
+    event_types: Optional[List[str]] = None,
+    registry: Optional[Dict[str, Dict]] = None,
+    data_dependencies: Optional[Dict[str, Tuple]] = None
+) -> Tuple[List[str], set]:
+    """
+    Resolve requested event types to detectors and the shared data they need
+    
+    Args:
+        event_types: Event types to compute (None = all registered types)
+        registry: Detector registry (default: EVENT_DETECTORS)
+        data_dependencies: Shared data dependencies (default: DATA_DEPENDENCIES)
+    
+    Returns:
+        (event types in registry order, set of required shared data)
+    """
+    if registry is None:
+        registry = EVENT_DETECTORS
+        data_dependencies = DATA_DEPENDENCIES
+    data_dependencies = data_dependencies or {}
+    if event_types is None:
+        event_types = list(registry)
+    unknown = [t for t in event_types if t not in registry]
+    if unknown:
+        raise ValueError(f"Unknown event types: {unknown}. Available: {list(registry)}")
+    
+    selected = [t for t in registry if t in event_types]
+    required = set()
+    pending = [dep for t in selected for dep in registry[t]["requires"]]
+    while pending:
+        dep = pending.pop()
+        if dep not in required:
+            required.add(dep)
+            pending.extend(data_dependencies.get(dep, ()))
+    return selected, required
+
 
 class EnhancedEventDetector:
     """
@@ -52,17 +121,31 @@ class EnhancedEventDetector:
         
         # Thresholds
         self.shot_velocity_threshold = 5.0  # pixels per frame
-        self.pass_distance_threshold = 50.0  # pixels
         self.touch_distance_threshold = 30.0  # pixels
         self.tackle_distance_threshold = 20.0  # pixels
+        self.possession_control_distance = 10.0  # pixels
+        
+        # Possession timeline (filled by detect_all_events)
+        self.possession_timeline = []
+        self.possession_stats = {}
         
     def detect_all_events(
         self,
-        frames_data: List[Dict]
+        frames_data: List[Dict],
+        event_types: Optional[List[str]] = None,
+        tracked_frames: Optional[List[List[Dict]]] = None
     ) -> List[Dict]:
         """
         Detect all events from frame detections
         
+        Only the detectors for event_types (default: all registered types),
+        and the shared data they need, are evaluated.
+        
+        tracked_frames: Output of track_all_players() for the same frames.
+        Player tracking does not depend on the event thresholds, so callers
+        running the detector repeatedly (e.g. threshold calibration) can
+        track once and reuse it.
+        
         Returns list of events with all required fields for analytics features:
         - type: "shot", "pass", "touch", "tackle", "interception", etc.
         - team: "home" or "away" (determined by position)
@@ -74,15 +157,46 @@ class EnhancedEventDetector:
         """
         events = []
         
+        selected, required = resolve_event_types(event_types)
+        frame_detectors = [
+            getattr(self, EVENT_DETECTORS[t]["method"])
+            for t in selected if EVENT_DETECTORS[t]["stage"] == "frame"
+        ]
+        possession_detectors = [
+            getattr(self, EVENT_DETECTORS[t]["method"])
+            for t in selected if EVENT_DETECTORS[t]["stage"] == "possession"
+        ]
+        
+        # Tracked players in shot frames, for the shot context (defenders, pressure)
+        shot_players = {}
+        
+        # Passes, interceptions and recoveries are derived from possession transitions
+        possession_tracker = None
+        if "possession" in required:
+            possession_tracker = PossessionTracker(
+                fps=self.fps,
+                control_distance=self.possession_control_distance,
+            )
+        
         for i, frame_data in enumerate(frames_data):
             ball_detections = [d for d in frame_data["detections"] if d["class"] == "ball"]
-            player_detections = [d for d in frame_data["detections"] if d["class"] == "player"]
             
             # Track players and assign IDs
-            tracked_players = self._track_players(player_detections, frame_data["frame"])
+            tracked_players = []
+            if "players" in required:
+                if tracked_frames is not None:
+                    tracked_players = tracked_frames[i]
+                else:
+                    player_detections = [d for d in frame_data["detections"] if d["class"] == "player"]
+                    tracked_players = self._track_players(player_detections, frame_data["frame"])
+                self.player_history.append({
+                    "frame": frame_data["frame"],
+                    "timestamp": frame_data["timestamp"],
+                    "players": tracked_players
+                })
             
             # Update history
-            if ball_detections:
+            if "ball_history" in required and ball_detections:
                 self.ball_history.append({
                     "frame": frame_data["frame"],
                     "timestamp": frame_data["timestamp"],
@@ -90,51 +204,44 @@ class EnhancedEventDetector:
                     "bbox": ball_detections[0]["bbox"]
                 })
             
-            self.player_history.append({
-                "frame": frame_data["frame"],
-                "timestamp": frame_data["timestamp"],
-                "players": tracked_players
-            })
-            
-            # Detect events
-            frame_events = []
-            
-            # 1. Shot Detection
-            shots = self._detect_shots(frame_data, ball_detections, tracked_players)
-            frame_events.extend(shots)
-            
-            # 2. Pass Detection (most important for Network Analysis and Vector Field)
-            passes = self._detect_passes(frame_data, ball_detections, tracked_players)
-            frame_events.extend(passes)
-            
-            # 3. Touch Detection
-            touches = self._detect_touches(frame_data, ball_detections, tracked_players)
-            frame_events.extend(touches)
-            
-            # 4. Tackle Detection
-            tackles = self._detect_tackles(frame_data, ball_detections, tracked_players)
-            frame_events.extend(tackles)
-            
-            # 5. Interception Detection
-            interceptions = self._detect_interceptions(frame_data, ball_detections, tracked_players)
-            frame_events.extend(interceptions)
-            
-            # 6. Recovery Detection
-            recoveries = self._detect_recoveries(frame_data, ball_detections, tracked_players)
-            frame_events.extend(recoveries)
-            
-            # 7. Corner Detection
-            corners = self._detect_corners(frame_data, ball_detections, tracked_players)
-            frame_events.extend(corners)
-            
-            # 8. Free Kick Detection
-            free_kicks = self._detect_free_kicks(frame_data, ball_detections, tracked_players)
-            frame_events.extend(free_kicks)
+            if possession_tracker:
+                possession_tracker.update(
+                    frame_data["frame"],
+                    frame_data["timestamp"],
+                    ball_detections[0]["position"] if ball_detections else None,
+                    tracked_players,
+                )
             
-            events.extend(frame_events)
-        
+            # Per-frame detectors (shots, touches, tackles, corners, free kicks)
+            for detector in frame_detectors:
+                detected = detector(frame_data, ball_detections, tracked_players)
+                if detected and detected[0]["type"] == "shot":
+                    shot_players[frame_data["frame"]] = tracked_players
+                events.extend(detected)
+        
+        # Possession-derived detectors (passes, interceptions, recoveries)
+        if possession_tracker:
+            timeline = possession_tracker.finalize()
+            self.possession_timeline = timeline
+            self.possession_stats = possession_stats(timeline, self.fps)
+            for detector in possession_detectors:
+                events.extend(detector(timeline))
+        
+        # Shot context and xG for all shots of the match in one batched computation / model call
+        if "shot" in selected:
+            score_shot_events(events, shot_players)
+        
+        events.sort(key=lambda e: e["frame"])
         return events
     
+    def track_all_players(self, frames_data: List[Dict]) -> List[List[Dict]]:
+        """Track players over all frames (one list of tracked players per frame)"""
+        tracked_frames = []
+        for frame_data in frames_data:
+            player_detections = [d for d in frame_data["detections"] if d["class"] == "player"]
+            tracked_frames.append(self._track_players(player_detections, frame_data["frame"]))
+        return tracked_frames
+    
     def _track_players(self, player_detections: List[Dict], frame: int) -> List[Dict]:
         """
         Track players across frames and assign consistent IDs
@@ -176,7 +283,8 @@ class EnhancedEventDetector:
             # Add playerId to detection
             tracked_player = player.copy()
             tracked_player["playerId"] = matched_id
-            tracked = tracked_player
+            tracked_player["team"] = self._determine_team(pos)
+            tracked.append(tracked_player)
         
         # Clean up old players (not seen for 30 frames)
         to_remove = [
@@ -248,9 +356,6 @@ class EnhancedEventDetector:
             
             # Shot detection: fast movement toward goal area (x > 66 = attacking third)
             if avg_velocity > self.shot_velocity_threshold and ball_pos["x"] > 66:
-                # Calculate xG based on position
-                xg = self._calculate_xg(ball_pos)
-                
                 # Determine shot type
                 shot_type = "open_play"
                 if ball_pos["x"] > 90:  # Very close to goal
@@ -269,7 +374,7 @@ class EnhancedEventDetector:
                     "x": ball_pos["x"],
                     "y": ball_pos["y"],
                     "metadata": {
-                        "xg": round(xg, 3),  # Required for Spotlight
+                        "xg": None,  # Required for Spotlight; filled by detect_all_events (one model call per match)
                         "shotType": shot_type,
                         "bodyPart": "foot",  # Default, can be enhanced
                         "outcome": "unknown"  # Can be enhanced with goal detection
@@ -278,95 +383,13 @@ class EnhancedEventDetector:
         
         return shots
     
-    def _detect_passes(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
+    def _detect_passes(self, timeline: List[Dict]) -> List[Dict]:
         """
-        Detect passes between players
+        Derive passes from possession transitions
         CRITICAL: Must include playerId, metadata.toPlayerId, metadata.toX, metadata.toY
         Required for Network Analysis and Vector Field features
         """
-        passes = []
-        
-        if not ball_detections or len(player_detections) < 2:
-            return passes
-        
-        ball = ball_detections[0]
-        ball_pos = ball["position"]
-        
-        # Find nearest players with their IDs
-        player_distances = []
-        for player in player_detections:
-            player_pos = player.get("position", {})
-            if "x" in player_pos and "y" in player_pos:
-                distance = np.sqrt(
-                    (ball_pos["x"] - player_pos["x"])**2 +
-                    (ball_pos["y"] - player_pos["y"])**2
-                )
-                player_distances.append((player, distance))
-        
-        player_distances.sort(key=lambda x: x[1])
-        
-        # If ball is near a player and moving, it's likely a pass
-        if len(player_distances) >= 2:
-            nearest_player, nearest_dist = player_distances[0]
-            second_nearest, second_dist = player_distances[1]
-            
-            sender_pos = nearest_player.get("position", {})
-            receiver_pos = second_nearest.get("position", {})
-            sender_id = nearest_player.get("playerId")
-            receiver_id = second_nearest.get("playerId")
-            
-            # Check if ball is moving between players
-            if len(self.ball_history) >= 3:
-                recent_balls = list(self.ball_history)[-3:]
-                ball_moved = any(
-                    abs(recent_balls[i]["position"]["x"] - recent_balls[i-1]["position"]["x"]) > 2
-                    or abs(recent_balls[i]["position"]["y"] - recent_balls[i-1]["position"]["y"]) > 2
-                    for i in range(1, len(recent_balls))
-                )
-                
-                if nearest_dist < self.pass_distance_threshold and ball_moved and sender_id and receiver_id:
-                    # Determine if pass is successful (ball reaches second player)
-                    successful = second_dist < self.pass_distance_threshold
-                    
-                    # Calculate pass angle and intensity for Vector Field
-                    if "x" in receiver_pos and "y" in receiver_pos:
-                        dx = receiver_pos["x"] - sender_pos.get("x", ball_pos["x"])
-                        dy = receiver_pos["y"] - sender_pos.get("y", ball_pos["y"])
-                        angle = np.degrees(np.arctan2(dy, dx))
-                        intensity = min(1.0, np.sqrt(dx**2 + dy**2) / 50.0)  # Normalize to 0-1
-                    else:
-                        angle = 0.0
-                        intensity = 0.5
-                    
-                    # Determine team
-                    team = self._determine_team(ball_pos)
-                    
-                    passes.append({
-                        "type": "pass",
-                        "team": team,
-                        "playerId": sender_id,  # REQUIRED for Network Analysis
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": sender_pos.get("x", ball_pos["x"]),  # Pass start position
-                        "y": sender_pos.get("y", ball_pos["y"]),
-                        "metadata": {
-                            "toPlayerId": receiver_id,  # REQUIRED for Network Analysis
-                            "toX": receiver_pos.get("x", ball_pos["x"]),  # REQUIRED for Vector Field
-                            "toY": receiver_pos.get("y", ball_pos["y"]),  # REQUIRED for Vector Field
-                            "angle": round(angle, 1),  # For Vector Field visualization
-                            "intensity": round(intensity, 2),  # For Vector Field visualization
-                            "successful": successful,
-                            "passType": "short" if nearest_dist < 30 else "long"
-                        }
-                    })
-        
-        return passes
+        return passes_from_timeline(timeline)
     
     def _detect_touches(
         self,
@@ -463,120 +486,19 @@ class EnhancedEventDetector:
         
         return tackles
     
-    def _detect_interceptions(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
+    def _detect_interceptions(self, timeline: List[Dict]) -> List[Dict]:
         """
-        Detect interceptions (ball change without contact)
+        Derive interceptions from possession transitions
         Required for Summary statistics
         """
-        interceptions = []
-        
-        # Simplified: ball changes direction quickly without player contact
-        if len(self.ball_history) >= 5 and ball_detections:
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 20:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check for sudden direction change
-            directions = []
-            for i in range(1, len(recent_balls)):
-                prev_pos = recent_balls[i-1]["position"]
-                curr_pos = recent_balls[i]["position"]
-                dx = curr_pos["x"] - prev_pos["x"]
-                dy = curr_pos["y"] - prev_pos["y"]
-                direction = np.arctan2(dy, dx)
-                directions.append(direction)
-            
-            # If direction changes significantly, might be interception
-            if len(directions) >= 2:
-                direction_change = abs(directions[-1] - directions[0])
-                if direction_change > np.pi / 2:  # 90 degree change
-                    interceptions.append({
-                        "type": "interception",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return interceptions
+        return interceptions_from_timeline(timeline)
     
-    def _detect_recoveries(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
+    def _detect_recoveries(self, timeline: List[Dict]) -> List[Dict]:
         """
-        Detect ball recoveries
+        Derive recoveries from possession transitions
         Required for Summary statistics
         """
-        recoveries = []
-        
-        # Simplified: ball near player after being away
-        if ball_detections and len(self.ball_history) >= 10:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Check if ball was away and now is near a player
-            recent_balls = list(self.ball_history)[-10:-5]
-            old_ball_pos = recent_balls[0]["position"] if recent_balls else None
-            
-            if old_ball_pos:
-                # Check if ball moved significantly
-                distance_moved = np.sqrt(
-                    (ball_pos["x"] - old_ball_pos["x"])**2 +
-                    (ball_pos["y"] - old_ball_pos["y"])**2
-                )
-                
-                # Check if ball is now near a player
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        
-                        if distance < self.touch_distance_threshold and distance_moved > 20:
-                            player_id = player.get("playerId")
-                            recoveries.append({
-                                "type": "recovery",
-                                "team": team,
-                                "playerId": player_id,
-                                "frame": frame_data["frame"],
-                                "timestamp": frame_data["timestamp"],
-                                "minute": int(frame_data["timestamp"] / 60),
-                                "x": ball_pos["x"],
-                                "y": ball_pos["y"]
-                            })
-                            break
-        
-        return recoveries
+        return recoveries_from_timeline(timeline)
     
     def _detect_corners(
         self,
@@ -683,744 +605,3 @@ class EnhancedEventDetector:
                     })
         
         return free_kicks
-    
-    def _calculate_xg(self, position: Dict) -> float:
-        """Calculate xG based on shot position"""
-        x = position["x"]  # 0-100 (left to right)
-        y = position["y"]  # 0-100 (attacking to defending)
-        
-        # Convert to meters (pitch: 105m x 68m)
-        pitch_length = 105
-        pitch_width = 68
-        goal_width = 7.32
-        
-        x_meters = (x / 100) * pitch_width
-        y_meters = (y / 100) * pitch_length
-        
-        # Distance from goal center
-        goal_center_x = pitch_width / 2
-        distance = np.sqrt((x_meters - goal_center_x)**2 + y_meters**2)
-        
-        # Simple xG model (can be enhanced)
-        if distance < 6:
-            return 0.65
-        elif distance < 12:
-            return 0.35
-        elif distance < 18:
-            return 0.17
-        elif distance < 25:
-            return 0.08
-        else:
-            return 0.03
-
-
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 20:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check for sudden direction change
-            directions = []
-            for i in range(1, len(recent_balls)):
-                prev_pos = recent_balls[i-1]["position"]
-                curr_pos = recent_balls[i]["position"]
-                dx = curr_pos["x"] - prev_pos["x"]
-                dy = curr_pos["y"] - prev_pos["y"]
-                direction = np.arctan2(dy, dx)
-                directions.append(direction)
-            
-            # If direction changes significantly, might be interception
-            if len(directions) >= 2:
-                direction_change = abs(directions[-1] - directions[0])
-                if direction_change > np.pi / 2:  # 90 degree change
-                    interceptions.append({
-                        "type": "interception",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return interceptions
-    
-    def _detect_recoveries(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect ball recoveries
-        Required for Summary statistics
-        """
-        recoveries = []
-        
-        # Simplified: ball near player after being away
-        if ball_detections and len(self.ball_history) >= 10:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Check if ball was away and now is near a player
-            recent_balls = list(self.ball_history)[-10:-5]
-            old_ball_pos = recent_balls[0]["position"] if recent_balls else None
-            
-            if old_ball_pos:
-                # Check if ball moved significantly
-                distance_moved = np.sqrt(
-                    (ball_pos["x"] - old_ball_pos["x"])**2 +
-                    (ball_pos["y"] - old_ball_pos["y"])**2
-                )
-                
-                # Check if ball is now near a player
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        
-                        if distance < self.touch_distance_threshold and distance_moved > 20:
-                            player_id = player.get("playerId")
-                            recoveries.append({
-                                "type": "recovery",
-                                "team": team,
-                                "playerId": player_id,
-                                "frame": frame_data["frame"],
-                                "timestamp": frame_data["timestamp"],
-                                "minute": int(frame_data["timestamp"] / 60),
-                                "x": ball_pos["x"],
-                                "y": ball_pos["y"]
-                            })
-                            break
-        
-        return recoveries
-    
-    def _detect_corners(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect corner kicks
-        Required for Summary statistics
-        """
-        corners = []
-        
-        # Simplified: ball out of bounds near corner
-        if ball_detections:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 15:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check if ball is near corner (x near 0 or 100, y near 0)
-            if (ball_pos["x"] < 5 or ball_pos["x"] > 95) and ball_pos["y"] < 10:
-                corners.append({
-                    "type": "corner",
-                    "team": team,
-                    "playerId": player_id,
-                    "frame": frame_data["frame"],
-                    "timestamp": frame_data["timestamp"],
-                    "minute": int(frame_data["timestamp"] / 60),
-                    "x": ball_pos["x"],
-                    "y": ball_pos["y"]
-                })
-        
-        return corners
-    
-    def _detect_free_kicks(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect free kicks
-        Required for Summary statistics
-        """
-        free_kicks = []
-        
-        # Simplified: ball stationary in dangerous area
-        if ball_detections and len(self.ball_history) >= 5:
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 15:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check if ball is stationary
-            positions = [b["position"] for b in recent_balls]
-            x_positions = [p["x"] for p in positions]
-            y_positions = [p["y"] for p in positions]
-            
-            x_variance = np.var(x_positions)
-            y_variance = np.var(y_positions)
-            
-            # Ball is stationary (low variance) and in dangerous area
-            if x_variance < 1 and y_variance < 1:
-                if 50 < ball_pos["x"] < 90 and ball_pos["y"] < 30:  # Attacking third
-                    free_kicks.append({
-                        "type": "free_kick",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return free_kicks
-    
-    def _calculate_xg(self, position: Dict) -> float:
-        """Calculate xG based on shot position"""
-        x = position["x"]  # 0-100 (left to right)
-        y = position["y"]  # 0-100 (attacking to defending)
-        
-        # Convert to meters (pitch: 105m x 68m)
-        pitch_length = 105
-        pitch_width = 68
-        goal_width = 7.32
-        
-        x_meters = (x / 100) * pitch_width
-        y_meters = (y / 100) * pitch_length
-        
-        # Distance from goal center
-        goal_center_x = pitch_width / 2
-        distance = np.sqrt((x_meters - goal_center_x)**2 + y_meters**2)
-        
-        # Simple xG model (can be enhanced)
-        if distance < 6:
-            return 0.65
-        elif distance < 12:
-            return 0.35
-        elif distance < 18:
-            return 0.17
-        elif distance < 25:
-            return 0.08
-        else:
-            return 0.03
-
-
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 20:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check for sudden direction change
-            directions = []
-            for i in range(1, len(recent_balls)):
-                prev_pos = recent_balls[i-1]["position"]
-                curr_pos = recent_balls[i]["position"]
-                dx = curr_pos["x"] - prev_pos["x"]
-                dy = curr_pos["y"] - prev_pos["y"]
-                direction = np.arctan2(dy, dx)
-                directions.append(direction)
-            
-            # If direction changes significantly, might be interception
-            if len(directions) >= 2:
-                direction_change = abs(directions[-1] - directions[0])
-                if direction_change > np.pi / 2:  # 90 degree change
-                    interceptions.append({
-                        "type": "interception",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return interceptions
-    
-    def _detect_recoveries(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect ball recoveries
-        Required for Summary statistics
-        """
-        recoveries = []
-        
-        # Simplified: ball near player after being away
-        if ball_detections and len(self.ball_history) >= 10:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Check if ball was away and now is near a player
-            recent_balls = list(self.ball_history)[-10:-5]
-            old_ball_pos = recent_balls[0]["position"] if recent_balls else None
-            
-            if old_ball_pos:
-                # Check if ball moved significantly
-                distance_moved = np.sqrt(
-                    (ball_pos["x"] - old_ball_pos["x"])**2 +
-                    (ball_pos["y"] - old_ball_pos["y"])**2
-                )
-                
-                # Check if ball is now near a player
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        
-                        if distance < self.touch_distance_threshold and distance_moved > 20:
-                            player_id = player.get("playerId")
-                            recoveries.append({
-                                "type": "recovery",
-                                "team": team,
-                                "playerId": player_id,
-                                "frame": frame_data["frame"],
-                                "timestamp": frame_data["timestamp"],
-                                "minute": int(frame_data["timestamp"] / 60),
-                                "x": ball_pos["x"],
-                                "y": ball_pos["y"]
-                            })
-                            break
-        
-        return recoveries
-    
-    def _detect_corners(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect corner kicks
-        Required for Summary statistics
-        """
-        corners = []
-        
-        # Simplified: ball out of bounds near corner
-        if ball_detections:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 15:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check if ball is near corner (x near 0 or 100, y near 0)
-            if (ball_pos["x"] < 5 or ball_pos["x"] > 95) and ball_pos["y"] < 10:
-                corners.append({
-                    "type": "corner",
-                    "team": team,
-                    "playerId": player_id,
-                    "frame": frame_data["frame"],
-                    "timestamp": frame_data["timestamp"],
-                    "minute": int(frame_data["timestamp"] / 60),
-                    "x": ball_pos["x"],
-                    "y": ball_pos["y"]
-                })
-        
-        return corners
-    
-    def _detect_free_kicks(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect free kicks
-        Required for Summary statistics
-        """
-        free_kicks = []
-        
-        # Simplified: ball stationary in dangerous area
-        if ball_detections and len(self.ball_history) >= 5:
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 15:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check if ball is stationary
-            positions = [b["position"] for b in recent_balls]
-            x_positions = [p["x"] for p in positions]
-            y_positions = [p["y"] for p in positions]
-            
-            x_variance = np.var(x_positions)
-            y_variance = np.var(y_positions)
-            
-            # Ball is stationary (low variance) and in dangerous area
-            if x_variance < 1 and y_variance < 1:
-                if 50 < ball_pos["x"] < 90 and ball_pos["y"] < 30:  # Attacking third
-                    free_kicks.append({
-                        "type": "free_kick",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return free_kicks
-    
-    def _calculate_xg(self, position: Dict) -> float:
-        """Calculate xG based on shot position"""
-        x = position["x"]  # 0-100 (left to right)
-        y = position["y"]  # 0-100 (attacking to defending)
-        
-        # Convert to meters (pitch: 105m x 68m)
-        pitch_length = 105
-        pitch_width = 68
-        goal_width = 7.32
-        
-        x_meters = (x / 100) * pitch_width
-        y_meters = (y / 100) * pitch_length
-        
-        # Distance from goal center
-        goal_center_x = pitch_width / 2
-        distance = np.sqrt((x_meters - goal_center_x)**2 + y_meters**2)
-        
-        # Simple xG model (can be enhanced)
-        if distance < 6:
-            return 0.65
-        elif distance < 12:
-            return 0.35
-        elif distance < 18:
-            return 0.17
-        elif distance < 25:
-            return 0.08
-        else:
-            return 0.03
-
-
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 20:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check for sudden direction change
-            directions = []
-            for i in range(1, len(recent_balls)):
-                prev_pos = recent_balls[i-1]["position"]
-                curr_pos = recent_balls[i]["position"]
-                dx = curr_pos["x"] - prev_pos["x"]
-                dy = curr_pos["y"] - prev_pos["y"]
-                direction = np.arctan2(dy, dx)
-                directions.append(direction)
-            
-            # If direction changes significantly, might be interception
-            if len(directions) >= 2:
-                direction_change = abs(directions[-1] - directions[0])
-                if direction_change > np.pi / 2:  # 90 degree change
-                    interceptions.append({
-                        "type": "interception",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return interceptions
-    
-    def _detect_recoveries(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect ball recoveries
-        Required for Summary statistics
-        """
-        recoveries = []
-        
-        # Simplified: ball near player after being away
-        if ball_detections and len(self.ball_history) >= 10:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Check if ball was away and now is near a player
-            recent_balls = list(self.ball_history)[-10:-5]
-            old_ball_pos = recent_balls[0]["position"] if recent_balls else None
-            
-            if old_ball_pos:
-                # Check if ball moved significantly
-                distance_moved = np.sqrt(
-                    (ball_pos["x"] - old_ball_pos["x"])**2 +
-                    (ball_pos["y"] - old_ball_pos["y"])**2
-                )
-                
-                # Check if ball is now near a player
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        
-                        if distance < self.touch_distance_threshold and distance_moved > 20:
-                            player_id = player.get("playerId")
-                            recoveries.append({
-                                "type": "recovery",
-                                "team": team,
-                                "playerId": player_id,
-                                "frame": frame_data["frame"],
-                                "timestamp": frame_data["timestamp"],
-                                "minute": int(frame_data["timestamp"] / 60),
-                                "x": ball_pos["x"],
-                                "y": ball_pos["y"]
-                            })
-                            break
-        
-        return recoveries
-    
-    def _detect_corners(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect corner kicks
-        Required for Summary statistics
-        """
-        corners = []
-        
-        # Simplified: ball out of bounds near corner
-        if ball_detections:
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 15:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check if ball is near corner (x near 0 or 100, y near 0)
-            if (ball_pos["x"] < 5 or ball_pos["x"] > 95) and ball_pos["y"] < 10:
-                corners.append({
-                    "type": "corner",
-                    "team": team,
-                    "playerId": player_id,
-                    "frame": frame_data["frame"],
-                    "timestamp": frame_data["timestamp"],
-                    "minute": int(frame_data["timestamp"] / 60),
-                    "x": ball_pos["x"],
-                    "y": ball_pos["y"]
-                })
-        
-        return corners
-    
-    def _detect_free_kicks(
-        self,
-        frame_data: Dict,
-        ball_detections: List[Dict],
-        player_detections: List[Dict]
-    ) -> List[Dict]:
-        """
-        Detect free kicks
-        Required for Summary statistics
-        """
-        free_kicks = []
-        
-        # Simplified: ball stationary in dangerous area
-        if ball_detections and len(self.ball_history) >= 5:
-            recent_balls = list(self.ball_history)[-5:]
-            ball = ball_detections[0]
-            ball_pos = ball["position"]
-            team = self._determine_team(ball_pos)
-            
-            # Find nearest player
-            player_id = None
-            if player_detections:
-                min_dist = float('inf')
-                for player in player_detections:
-                    player_pos = player.get("position", {})
-                    if "x" in player_pos and "y" in player_pos:
-                        distance = np.sqrt(
-                            (ball_pos["x"] - player_pos["x"])**2 +
-                            (ball_pos["y"] - player_pos["y"])**2
-                        )
-                        if distance < min_dist and distance < 15:
-                            min_dist = distance
-                            player_id = player.get("playerId")
-            
-            # Check if ball is stationary
-            positions = [b["position"] for b in recent_balls]
-            x_positions = [p["x"] for p in positions]
-            y_positions = [p["y"] for p in positions]
-            
-            x_variance = np.var(x_positions)
-            y_variance = np.var(y_positions)
-            
-            # Ball is stationary (low variance) and in dangerous area
-            if x_variance < 1 and y_variance < 1:
-                if 50 < ball_pos["x"] < 90 and ball_pos["y"] < 30:  # Attacking third
-                    free_kicks.append({
-                        "type": "free_kick",
-                        "team": team,
-                        "playerId": player_id,
-                        "frame": frame_data["frame"],
-                        "timestamp": frame_data["timestamp"],
-                        "minute": int(frame_data["timestamp"] / 60),
-                        "x": ball_pos["x"],
-                        "y": ball_pos["y"]
-                    })
-        
-        return free_kicks
-    
-    def _calculate_xg(self, position: Dict) -> float:
-        """Calculate xG based on shot position"""
-        x = position["x"]  # 0-100 (left to right)
-        y = position["y"]  # 0-100 (attacking to defending)
-        
-        # Convert to meters (pitch: 105m x 68m)
-        pitch_length = 105
-        pitch_width = 68
-        goal_width = 7.32
-        
-        x_meters = (x / 100) * pitch_width
-        y_meters = (y / 100) * pitch_length
-        
-        # Distance from goal center
-        goal_center_x = pitch_width / 2
-        distance = np.sqrt((x_meters - goal_center_x)**2 + y_meters**2)
-        
-        # Simple xG model (can be enhanced)
-        if distance < 6:
-            return 0.65
-        elif distance < 12:
-            return 0.35
-        elif distance < 18:
-            return 0.17
-        elif distance < 25:
-            return 0.08
-        else:
-            return 0.03
-
@@ -0,0 +1,162 @@
+"""
+Temporal Event Merging for Football Analytics
+Collapses per-frame duplicate detections into single events
+
+Detectors such as touch, tackle and corner fire on every frame their condition
+holds, so a single real action produces dozens of near-identical events.
+This stage merges same-type, same-player events that are close in time and
+space into one event carrying start/end frames and peak confidence.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+# Maximum gap (seconds) between two detections of the same action
+DEFAULT_MAX_GAP_SECONDS = {
+    "shot": 1.0,
+    "pass": 0.5,
+    "touch": 1.0,
+    "tackle": 1.0,
+    "interception": 1.0,
+    "recovery": 1.0,
+    "corner": 5.0,
+    "free_kick": 5.0,
+}
+
+
+class EventMerger:
+    """
+    Merge runs of same-type, same-player events into single events
+
+    Two events belong to the same run when they share type, team and playerId,
+    are at most max_gap_seconds apart and at most max_distance apart on the
+    pitch (0-100 coordinates). Each run becomes one event:
+    - frame/timestamp/minute: start of the run
+    - confidence: peak confidence in the run (if detectors provide it)
+    - metadata.startFrame, metadata.endFrame, metadata.startTimestamp,
+      metadata.endTimestamp, metadata.mergedCount
+    """
+
+    def __init__(
+        self,
+        fps: float = 30.0,
+        max_gap_seconds: Optional[Dict[str, float]] = None,
+        max_distance: float = 10.0,
+        default_max_gap_seconds: float = 0.5,
+    ):
+        self.fps = fps if fps > 0 else 30.0
+        self.max_gap_seconds = dict(DEFAULT_MAX_GAP_SECONDS)
+        if max_gap_seconds:
+            self.max_gap_seconds.update(max_gap_seconds)
+        self.max_distance = max_distance
+        self.default_max_gap_seconds = default_max_gap_seconds
+        self.last_report = {}
+
+    def merge(self, events: List[Dict]) -> List[Dict]:
+        """
+        Merge near-duplicate events
+
+        Args:
+            events: Detected events (any order)
+
+        Returns:
+            Merged events sorted by frame. A reduction report for the call is
+            stored in self.last_report.
+        """
+        # Sort once by (group, frame) so every run is contiguous
+        order = sorted(
+            range(len(events)),
+            key=lambda i: (self._group_key(events[i]), events[i].get("frame", 0)),
+        )
+
+        merged = []
+        run = []
+        run_key = None
+        for i in order:
+            event = events[i]
+            key = self._group_key(event)
+            if run and key == run_key and self._continues_run(run[-1], event):
+                run.append(event)
+                continue
+            if run:
+                merged.append(self._collapse(run))
+            run = [event]
+            run_key = key
+        if run:
+            merged.append(self._collapse(run))
+
+        merged.sort(key=lambda e: e.get("frame", 0))
+        self.last_report = self._build_report(events, merged)
+        return merged
+
+    def _group_key(self, event: Dict) -> Tuple[str, str, str]:
+        # str() keeps None and int player IDs comparable while sorting
+        return (
+            str(event.get("type")),
+            str(event.get("team")),
+            str(event.get("playerId")),
+        )
+
+    def _continues_run(self, prev: Dict, event: Dict) -> bool:
+        """Check temporal and spatial windows between consecutive events"""
+        max_gap = self.max_gap_seconds.get(event.get("type"), self.default_max_gap_seconds)
+        gap_frames = event.get("frame", 0) - prev.get("frame", 0)
+        if gap_frames > max_gap * self.fps:
+            return False
+
+        prev_pos = self._event_position(prev)
+        pos = self._event_position(event)
+        if prev_pos is None or pos is None:
+            return True
+        distance = np.sqrt((pos[0] - prev_pos[0])**2 + (pos[1] - prev_pos[1])**2)
+        return distance <= self.max_distance
+
+    def _event_position(self, event: Dict) -> Optional[Tuple[float, float]]:
+        """Events carry x/y at top level (enhanced) or in position (basic)"""
+        if "x" in event and "y" in event:
+            return event["x"], event["y"]
+        position = event.get("position")
+        if position and "x" in position and "y" in position:
+            return position["x"], position["y"]
+        return None
+
+    def _collapse(self, run: List[Dict]) -> Dict:
+        """Build one event from a run, keeping the peak-confidence detection"""
+        start = run[0]
+        end = run[-1]
+        confidences = [e["confidence"] for e in run if e.get("confidence") is not None]
+        peak = max(run, key=lambda e: e.get("confidence") or 0.0) if confidences else start
+
+        event = dict(peak)
+        for field in ("frame", "timestamp", "minute"):
+            if field in start:
+                event[field] = start[field]
+        if confidences:
+            event["confidence"] = max(confidences)
+
+        metadata = dict(peak.get("metadata") or {})
+        metadata["startFrame"] = start.get("frame")
+        metadata["endFrame"] = end.get("frame")
+        metadata["startTimestamp"] = start.get("timestamp")
+        metadata["endTimestamp"] = end.get("timestamp")
+        metadata["mergedCount"] = len(run)
+        event["metadata"] = metadata
+        return event
+
+    def _build_report(self, events: List[Dict], merged: List[Dict]) -> Dict:
+        """Per-type and overall reduction ratios (input events / output events)"""
+        by_type = {}
+        for event in events:
+            by_type.setdefault(event.get("type"), {"input": 0, "output": 0})["input"] += 1
+        for event in merged:
+            by_type[event.get("type")]["output"] += 1
+        for stats in by_type.values():
+            stats["reduction_ratio"] = round(stats["input"] / stats["output"], 2) if stats["output"] else 0
+
+        return {
+            "input_events": len(events),
+            "output_events": len(merged),
+            "reduction_ratio": round(len(events) / len(merged), 2) if merged else 0,
+            "by_type": by_type,
+        }
@@ -1,88 +1,216 @@
 """
 Extract frames from football match videos for annotation
+
+Only every Nth frame is kept, so skipped frames are not decoded to images:
+- grab: cap.grab() advances past skipped frames without converting them to
+  BGR. The frames match a full cap.read() loop exactly.
+- seek: jumps to each sampled frame (CAP_PROP_POS_FRAMES). The decoder then
+  only decodes from the preceding keyframe. Used automatically when samples
+  are SEEK_MIN_FRAMES or more apart.
+- ffmpeg: one ffmpeg process with a select filter (needs ffmpeg on PATH).
+
+With workers > 1 the video is split into time ranges. Each range is
+extracted by its own process with its own capture, so decoding runs on
+several cores.
 """
 
-import cv2
+import argparse
+import itertools
+import os
+import shutil
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import cv2
+
+# Seek instead of grabbing when samples are at least this many frames apart
+SEEK_MIN_FRAMES = 250
+
+METHODS = ("auto", "grab", "seek", "ffmpeg")
+
+
+def _samples(total_frames: int, frame_interval: int, max_frames: Optional[int]) -> Iterable[Tuple[int, int]]:
+    """(output index, frame index) of the frames to keep; open-ended if the frame count is unknown"""
+    frames = range(0, total_frames, frame_interval) if total_frames > 0 else itertools.count(0, frame_interval)
+    return enumerate(itertools.islice(frames, max_frames) if max_frames else frames)
+
+
+def _save_samples(cap, output_path: Path, samples, method: str, position: int = 0, report: bool = True) -> int:
+    """
+    Save the sampled frames of an open capture.
+
+    Args:
+        samples: Ascending (output index, frame index) pairs
+        method: "grab" or "seek"
+        position: Index of the next frame the capture will decode
+
+    Returns:
+        Number of frames saved (stops early at the end of the video)
+    """
+    saved = 0
+    for output_index, frame_index in samples:
+        if method == "seek" and frame_index != position:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            position = frame_index
+        while position < frame_index:
+            if not cap.grab():
+                return saved
+            position += 1
+
+        ret, frame = cap.read()
+        if not ret:
+            break
+        position += 1
+        cv2.imwrite(str(output_path / f"frame_{output_index:06d}.jpg"), frame)
+        saved += 1
+
+        if report and saved % 50 == 0:
+            print(f"[Extract] Extracted {saved} frames...", file=sys.stderr)
+    return saved
+
+
+def _extract_range(video_path: str, output_dir: str, samples: List[Tuple[int, int]], method: str) -> int:
+    """Worker: extract one contiguous range of samples with its own capture"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return 0
+    try:
+        first = samples[0][1]
+        if first > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        return _save_samples(cap, Path(output_dir), samples, method, position=first, report=False)
+    finally:
+        cap.release()
+
+
+def _extract_ffmpeg(video_path: Path, output_path: Path, frame_interval: int, max_frames: Optional[int]) -> int:
+    """Extract with an ffmpeg select filter (same file names as the OpenCV paths)"""
+    # Written to a temporary folder first, so only this run's frames are counted
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".ffmpeg-", dir=output_path))
+    try:
+        cmd = [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-i", str(video_path),
+            "-vf", f"select='not(mod(n\\,{frame_interval}))'",
+            "-vsync", "0",
+            "-q:v", "2",
+            "-start_number", "0",
+        ]
+        if max_frames:
+            cmd += ["-frames:v", str(max_frames)]
+        cmd.append(str(tmp_dir / "frame_%06d.jpg"))
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"[Extract] ffmpeg failed: {result.stderr[:200]}", file=sys.stderr)
+
+        frames = sorted(tmp_dir.glob("frame_*.jpg"))
+        for frame in frames:
+            os.replace(frame, output_path / frame.name)
+        return len(frames)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 
 def extract_frames(
     video_path: str,
     output_dir: str,
     interval: int = 5,
-    max_frames: int = None
-):
+    max_frames: int = None,
+    method: str = "auto",
+    workers: int = 1
+) -> int:
     """
     Extract frames from video at specified intervals
-    
+
     Args:
         video_path: Path to video file
         output_dir: Directory to save frames
         interval: Extract frame every N seconds
         max_frames: Maximum number of frames to extract (None = all)
+        method: "grab", "seek", "ffmpeg" or "auto" (seek for intervals of
+            SEEK_MIN_FRAMES frames or more, else grab)
+        workers: Processes extracting time ranges in parallel (needs the frame count)
+
+    Returns:
+        Number of frames saved
     """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
     video_path = Path(video_path)
     if not video_path.exists():
         print(f"Error: Video file not found: {video_path}", file=sys.stderr)
-        return
-    
+        return 0
+
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
-    
+
     cap = cv2.VideoCapture(str(video_path))
     if not cap.isOpened():
         print(f"Error: Could not open video: {video_path}", file=sys.stderr)
-        return
-    
+        return 0
+
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     duration = total_frames / fps if fps > 0 else 0
-    
+
     print(f"[Extract] Video: {duration:.1f}s, {fps:.1f} FPS, {total_frames} frames", file=sys.stderr)
-    
-    frame_interval = int(fps * interval) if fps > 0 else 30
-    frame_count = 0
-    saved_count = 0
-    
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if frame_count % frame_interval == 0:
-            if max_frames and saved_count >= max_frames:
-                break
-            
-            frame_filename = output_path / f"frame_{saved_count:06d}.jpg"
-            cv2.imwrite(str(frame_filename), frame)
-            saved_count += 1
-            
-            if saved_count % 50 == 0:
-                print(f"[Extract] Extracted {saved_count} frames...", file=sys.stderr)
-        
-        frame_count += 1
-    
-    cap.release()
+
+    frame_interval = max(1, int(fps * interval)) if fps > 0 else 30
+    if method == "ffmpeg" and shutil.which("ffmpeg") is None:
+        print("[Extract] ffmpeg not found, using OpenCV", file=sys.stderr)
+        method = "auto"
+    if method == "auto":
+        method = "seek" if frame_interval >= SEEK_MIN_FRAMES else "grab"
+
+    if method == "ffmpeg":
+        cap.release()
+        saved_count = _extract_ffmpeg(video_path, output_path, frame_interval, max_frames)
+    elif workers > 1 and total_frames > 0:
+        cap.release()
+        samples = list(_samples(total_frames, frame_interval, max_frames))
+        # Contiguous time ranges, one per worker
+        size = -(-len(samples) // workers)
+        ranges = [samples[i:i + size] for i in range(0, len(samples), size)]
+        print(f"[Extract] {len(samples)} frames in {len(ranges)} ranges ({method})", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            saved_count = sum(pool.map(
+                _extract_range,
+                [str(video_path)] * len(ranges),
+                [str(output_path)] * len(ranges),
+                ranges,
+                [method] * len(ranges),
+            ))
+    else:
+        saved_count = _save_samples(cap, output_path, _samples(total_frames, frame_interval, max_frames), method)
+        cap.release()
+
     print(f"[Extract] Done! Extracted {saved_count} frames to {output_path}", file=sys.stderr)
+    return saved_count
 
 
 def main():
     """CLI entry point"""
-    if len(sys.argv) < 3:
-        print("Usage: python -m football_ai.extract_frames <video_path> <output_dir> [interval_seconds] [max_frames]", file=sys.stderr)
-        print("Example: python -m football_ai.extract_frames match.mp4 frames/ 5 1000", file=sys.stderr)
-        sys.exit(1)
-    
-    video_path = sys.argv[1]
-    output_dir = sys.argv[2]
-    interval = int(sys.argv[3]) if len(sys.argv) > 3 else 5
-    max_frames = int(sys.argv[4]) if len(sys.argv) > 4 else None
-    
-    extract_frames(video_path, output_dir, interval, max_frames)
+    parser = argparse.ArgumentParser(
+        prog="python -m football_ai.extract_frames",
+        description="Extract frames from a match video",
+        epilog="Example: python -m football_ai.extract_frames match.mp4 frames/ 5 1000 --workers 4",
+    )
+    parser.add_argument("video_path")
+    parser.add_argument("output_dir")
+    parser.add_argument("interval", nargs="?", type=int, default=5, help="Seconds between frames (default: 5)")
+    parser.add_argument("max_frames", nargs="?", type=int, default=None, help="Maximum number of frames")
+    parser.add_argument("--method", choices=METHODS, default="auto")
+    parser.add_argument("--workers", type=int, default=1, help="Processes extracting time ranges in parallel")
+    args = parser.parse_args()
+
+    extract_frames(args.video_path, args.output_dir, args.interval, args.max_frames, args.method, args.workers)
 
 
 if __name__ == "__main__":
     main()
-
-
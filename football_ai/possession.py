@@ -0,0 +1,333 @@
+"""
+Possession Model for Football Event Detection
+Single-pass state machine over tracked ball and player positions
+
+Produces a run-length-encoded possession timeline (one entry per spell of
+control by a player). Passes, interceptions and recoveries are derived from
+the transitions between consecutive spells instead of being guessed
+independently on every frame.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+
+
+# How a possession spell ended (relative to the next spell)
+END_PASS = "pass"                  # Next spell: teammate, ball travelled
+END_INTERCEPTION = "interception"  # Next spell: opponent, ball travelled
+END_TACKLE = "tackle"              # Next spell: opponent, immediate change
+END_LOOSE_BALL = "loose_ball"      # Nobody controlled the ball for a while
+END_OF_DATA = "end_of_data"        # Last spell in the video
+
+
+class PossessionTracker:
+    """
+    Track which player controls the ball, frame by frame
+
+    A player takes control when they are the nearest player to the ball,
+    within control_distance, for min_control_frames consecutive frames
+    (hysteresis avoids flicker between two close players).
+    """
+
+    def __init__(
+        self,
+        fps: float = 30.0,
+        control_distance: float = 10.0,
+        min_control_frames: int = 3,
+        tackle_gap_seconds: float = 0.2,
+        loose_ball_seconds: float = 2.0,
+    ):
+        self.fps = fps if fps > 0 else 30.0
+        self.control_distance = control_distance
+        self.min_control_frames = min_control_frames
+        self.tackle_gap_frames = tackle_gap_seconds * self.fps
+        self.loose_ball_frames = loose_ball_seconds * self.fps
+
+        self.timeline = []  # Closed spells
+        self.current = None  # Open spell
+        self.pending = None  # Candidate waiting for min_control_frames
+
+    def update(
+        self,
+        frame: int,
+        timestamp: float,
+        ball_position: Optional[Dict],
+        players: List[Dict]
+    ) -> None:
+        """
+        Advance the state machine by one frame
+
+        Args:
+            frame: Frame number
+            timestamp: Seconds into video
+            ball_position: {"x", "y"} of the ball, or None if not detected
+            players: Tracked players with playerId, team and position
+        """
+        candidate = self._nearest_player(ball_position, players)
+        if candidate is None:
+            self.pending = None
+            return
+
+        player_id = candidate.get("playerId")
+        if self.current and player_id == self.current["playerId"]:
+            if frame - self.current["endFrame"] <= self.loose_ball_frames:
+                self._extend(frame, timestamp, candidate)
+                self.pending = None
+                return
+
+        if self.pending and self.pending["playerId"] == player_id:
+            self.pending["count"] += 1
+        else:
+            self.pending = {
+                "playerId": player_id,
+                "team": candidate.get("team"),
+                "frame": frame,
+                "timestamp": timestamp,
+                "position": candidate["position"],
+                "count": 1,
+            }
+
+        if self.pending["count"] >= self.min_control_frames:
+            self._start_spell(frame, timestamp, candidate)
+
+    def finalize(self) -> List[Dict]:
+        """Close the open spell and return the full timeline"""
+        if self.current:
+            self.current["endReason"] = END_OF_DATA
+            self.timeline.append(self.current)
+            self.current = None
+        self.pending = None
+        return self.timeline
+
+    def build_timeline(
+        self,
+        frames: np.ndarray,
+        timestamps: np.ndarray,
+        player_ids: np.ndarray,
+        teams: np.ndarray,
+        xs: np.ndarray,
+        ys: np.ndarray
+    ) -> List[Dict]:
+        """
+        Batch equivalent of calling update() for every frame, then finalize()
+
+        Works on runs of the per-frame controller instead of single frames,
+        so the Python loop is over runs, not frames.
+
+        Args:
+            frames, timestamps: One entry per observed frame (sorted)
+            player_ids: Nearest player within control_distance (-1 = none)
+            teams, xs, ys: That player's team and position
+
+        Returns:
+            Possession timeline (same format as finalize())
+        """
+        self.timeline = []
+        self.current = None
+        self.pending = None
+        if len(frames) == 0:
+            return self.timeline
+
+        # Run-length encode the controller sequence
+        starts = np.flatnonzero(np.r_[True, player_ids[1:] != player_ids[:-1]])
+        ends = np.r_[starts[1:], len(player_ids)] - 1
+
+        for i0, i1 in zip(starts, ends):
+            player_id = int(player_ids[i0])
+            if player_id < 0:
+                continue
+
+            run_length = int(i1 - i0 + 1)
+            end_player = {"position": {"x": float(xs[i1]), "y": float(ys[i1])}}
+            current = self.current
+            if current and player_id == current["playerId"] and frames[i0] - current["endFrame"] <= self.loose_ball_frames:
+                # Holder keeps the ball
+                self._extend(int(frames[i1]), float(timestamps[i1]), end_player)
+                current["frames"] += run_length - 1
+            elif run_length >= self.min_control_frames:
+                # New controller (shorter runs are flicker and never take control)
+                self.pending = {
+                    "playerId": player_id,
+                    "team": teams[i0],
+                    "frame": int(frames[i0]),
+                    "timestamp": float(timestamps[i0]),
+                    "position": {"x": float(xs[i0]), "y": float(ys[i0])},
+                    "count": run_length,
+                }
+                self._start_spell(int(frames[i1]), float(timestamps[i1]), end_player)
+
+        return self.finalize()
+
+    def _nearest_player(self, ball_position: Optional[Dict], players: List[Dict]) -> Optional[Dict]:
+        if not ball_position or not players:
+            return None
+        positions = np.array(
+            [[p["position"]["x"], p["position"]["y"]] for p in players],
+            dtype=np.float64,
+        )
+        distances = np.hypot(positions[:, 0] - ball_position["x"], positions[:, 1] - ball_position["y"])
+        nearest = int(np.argmin(distances))
+        if distances[nearest] > self.control_distance:
+            return None
+        return players[nearest]
+
+    def _extend(self, frame: int, timestamp: float, player: Dict) -> None:
+        self.current["endFrame"] = frame
+        self.current["endTimestamp"] = timestamp
+        self.current["endX"] = player["position"]["x"]
+        self.current["endY"] = player["position"]["y"]
+        self.current["frames"] += 1
+
+    def _start_spell(self, frame: int, timestamp: float, player: Dict) -> None:
+        start = self.pending
+        if self.current:
+            self.current["endReason"] = self._classify_end(self.current, start)
+            self.timeline.append(self.current)
+
+        self.current = {
+            "playerId": start["playerId"],
+            "team": start["team"],
+            "startFrame": start["frame"],
+            "endFrame": frame,
+            "startTimestamp": start["timestamp"],
+            "endTimestamp": timestamp,
+            "x": start["position"]["x"],
+            "y": start["position"]["y"],
+            "endX": player["position"]["x"],
+            "endY": player["position"]["y"],
+            "frames": start["count"],
+            "endReason": None,
+        }
+        self.pending = None
+
+    def _classify_end(self, spell: Dict, next_start: Dict) -> str:
+        """Decide how a spell ended from the gap and the next controller's team"""
+        gap = next_start["frame"] - spell["endFrame"]
+        if gap > self.loose_ball_frames:
+            return END_LOOSE_BALL
+        if next_start["team"] == spell["team"]:
+            return END_PASS
+        if gap <= self.tackle_gap_frames:
+            return END_TACKLE
+        return END_INTERCEPTION
+
+
+def possession_stats(timeline: List[Dict], fps: float = 30.0) -> Dict:
+    """
+    Possession percentages and sequence statistics from a timeline
+
+    A sequence is a run of consecutive spells by the same team; its pass
+    count is the number of spells in it ending with a completed pass.
+    """
+    fps = fps if fps > 0 else 30.0
+    frames_by_team = {}
+    sequences = {}
+    current_team = None
+    current_sequence = None
+
+    for spell in timeline:
+        team = spell["team"]
+        frames_by_team[team] = frames_by_team.get(team, 0) + spell["endFrame"] - spell["startFrame"] + 1
+
+        if team != current_team or current_sequence is None:
+            current_sequence = {"passes": 0, "startFrame": spell["startFrame"]}
+            sequences.setdefault(team, []).append(current_sequence)
+            current_team = team
+        current_sequence["endFrame"] = spell["endFrame"]
+        if spell["endReason"] == END_PASS:
+            current_sequence["passes"] += 1
+        elif spell["endReason"] == END_LOOSE_BALL:
+            current_team = None
+
+    total_frames = sum(frames_by_team.values())
+    stats = {"spells": len(timeline), "teams": {}}
+    for team, team_frames in frames_by_team.items():
+        team_sequences = sequences.get(team, [])
+        durations = [(s["endFrame"] - s["startFrame"] + 1) / fps for s in team_sequences]
+        stats["teams"][team] = {
+            "possession_pct": round(100.0 * team_frames / total_frames, 1) if total_frames else 0,
+            "sequences": len(team_sequences),
+            "avg_passes_per_sequence": round(float(np.mean([s["passes"] for s in team_sequences])), 2) if team_sequences else 0,
+            "max_passes_in_sequence": max((s["passes"] for s in team_sequences), default=0),
+            "avg_sequence_seconds": round(float(np.mean(durations)), 2) if durations else 0,
+        }
+    return stats
+
+
+def passes_from_timeline(timeline: List[Dict]) -> List[Dict]:
+    """
+    Derive passes from possession transitions
+
+    A spell ending in a pass gives a completed pass to the next controller;
+    a spell ending in an interception gives an unsuccessful pass.
+    Includes playerId, metadata.toPlayerId, metadata.toX, metadata.toY
+    (Network Analysis) and metadata.angle, metadata.intensity (Vector Field).
+    """
+    passes = []
+
+    for spell, next_spell in zip(timeline, timeline[1:]):
+        if spell["endReason"] not in (END_PASS, END_INTERCEPTION):
+            continue
+
+        successful = spell["endReason"] == END_PASS
+
+        # Pass goes from the release point to where the next spell started
+        dx = next_spell["x"] - spell["endX"]
+        dy = next_spell["y"] - spell["endY"]
+        length = np.sqrt(dx**2 + dy**2)
+        angle = np.degrees(np.arctan2(dy, dx))
+        intensity = min(1.0, length / 50.0)  # Normalize to 0-1
+
+        passes.append({
+            "type": "pass",
+            "team": spell["team"],
+            "playerId": spell["playerId"],
+            "frame": spell["endFrame"],
+            "timestamp": spell["endTimestamp"],
+            "minute": int(spell["endTimestamp"] / 60),
+            "x": spell["endX"],  # Pass start position
+            "y": spell["endY"],
+            "metadata": {
+                "toPlayerId": next_spell["playerId"] if successful else None,
+                "toX": next_spell["x"],
+                "toY": next_spell["y"],
+                "angle": round(float(angle), 1),
+                "intensity": round(float(intensity), 2),
+                "successful": successful,
+                "passType": "short" if length < 30 else "long"
+            }
+        })
+
+    return passes
+
+
+def interceptions_from_timeline(timeline: List[Dict]) -> List[Dict]:
+    """Opponent gains control while the ball is travelling"""
+    return [
+        _spell_start_event("interception", next_spell)
+        for spell, next_spell in zip(timeline, timeline[1:])
+        if spell["endReason"] == END_INTERCEPTION
+    ]
+
+
+def recoveries_from_timeline(timeline: List[Dict]) -> List[Dict]:
+    """A player gains control of a loose ball"""
+    return [
+        _spell_start_event("recovery", next_spell)
+        for spell, next_spell in zip(timeline, timeline[1:])
+        if spell["endReason"] == END_LOOSE_BALL
+    ]
+
+
+def _spell_start_event(event_type: str, spell: Dict) -> Dict:
+    """Event at the start of a possession spell"""
+    return {
+        "type": event_type,
+        "team": spell["team"],
+        "playerId": spell["playerId"],
+        "frame": spell["startFrame"],
+        "timestamp": spell["startTimestamp"],
+        "minute": int(spell["startTimestamp"] / 60),
+        "x": spell["x"],
+        "y": spell["y"]
+    }
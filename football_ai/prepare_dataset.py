@@ -4,14 +4,100 @@ Converts annotated data to YOLOv8 format
 """
 
 import os
+import re
 import json
 import shutil
+import hashlib
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import cv2
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
-def convert_coco_to_yolo(coco_json_path: str, images_dir: str, output_dir: str):
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def _image_size(image_path: Path) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) of an image file
+
+    Reads only the header with Pillow (when installed), else decodes with OpenCV
+    """
+    if Image is not None:
+        try:
+            with Image.open(image_path) as img:
+                return img.size
+        except OSError:
+            return None
+    img = cv2.imread(str(image_path))
+    if img is None:
+        return None
+    return img.shape[1], img.shape[0]
+
+
+def _link_or_copy(source: Path, target: Path, link: str = "hardlink"):
+    """Place an image in the output: hardlink, symlink or copy (hardlinks fall back to a copy across filesystems)"""
+    if link == "hardlink":
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            pass
+    elif link == "symlink":
+        target.symlink_to(source.resolve())
+        return
+    shutil.copy(source, target)
+
+
+def _convert_image(image: Dict, annotations: List[Dict], category_map: Dict, images_dir: Path,
+                   output_images: Path, output_labels: Path, link: str) -> bool:
+    """Write the label file of one image (all its annotations at once) and place the image"""
+    image_path = images_dir / image["file_name"]
+    if not image_path.exists():
+        return False
+
+    # Image dimensions: from COCO when present, else from the file header
+    if image.get("width") and image.get("height"):
+        img_width, img_height = image["width"], image["height"]
+    else:
+        size = _image_size(image_path)
+        if size is None:
+            return False
+        img_width, img_height = size
+
+    lines = []
+    for ann in annotations:
+        # Convert bbox from COCO format (x, y, width, height) to YOLOv8 format (normalized center, width, height)
+        x, y, w, h = ann["bbox"]
+        x_center = (x + w / 2) / img_width
+        y_center = (y + h / 2) / img_height
+        width_norm = w / img_width
+        height_norm = h / img_height
+
+        # Get class ID
+        class_id = category_map.get(ann["category_id"], 0)
+        lines.append(f"{class_id} {x_center} {y_center} {width_norm} {height_norm}\n")
+
+    # Write YOLOv8 label file
+    label_file = output_labels / f"{Path(image['file_name']).stem}.txt"
+    with open(label_file, "w") as f:
+        f.writelines(lines)
+
+    output_image = output_images / image["file_name"]
+    if not output_image.exists():
+        output_image.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(image_path, output_image, link)
+    return True
+
+
+def convert_coco_to_yolo(coco_json_path: str, images_dir: str, output_dir: str,
+                         link: str = "hardlink", workers: int = None):
     """
     Convert COCO format annotations to YOLOv8 format
     
@@ -19,7 +105,12 @@ def convert_coco_to_yolo(coco_json_path: str, images_dir: str, output_dir: str):
         coco_json_path: Path to COCO JSON annotation file
         images_dir: Directory with images
         output_dir: Output directory for YOLOv8 format
+        link: How images are placed in the output: "hardlink", "symlink" or "copy"
+        workers: Threads converting images in parallel (default: ThreadPoolExecutor default)
     """
+    if link not in ("hardlink", "symlink", "copy"):
+        raise ValueError(f"Unknown link mode: {link}")
+
     with open(coco_json_path, "r") as f:
         coco_data = json.load(f)
     
@@ -40,69 +131,46 @@ def convert_coco_to_yolo(coco_json_path: str, images_dir: str, output_dir: str):
         elif "goalkeeper" in cat["name"].lower():
             category_map[cat["id"]] = 2
     
-    # Process images and annotations
+    # Group annotations by image (in file order)
     image_info = {img["id"]: img for img in coco_data["images"]}
-    annotations = coco_data["annotations"]
+    image_annotations = defaultdict(list)
+    for ann in coco_data["annotations"]:
+        if ann["image_id"] in image_info:
+            image_annotations[ann["image_id"]].append(ann)
     
-    for ann in annotations:
-        image_id = ann["image_id"]
-        if image_id not in image_info:
-            continue
-        
-        image = image_info[image_id]
-        image_path = Path(images_dir) / image["file_name"]
-        
-        if not image_path.exists():
-            continue
-        
-        # Get image dimensions
-        img = cv2.imread(str(image_path))
-        if img is None:
-            continue
-        img_height, img_width = img.shape[:2]
-        
-        # Convert bbox from COCO format (x, y, width, height) to YOLOv8 format (normalized center, width, height)
-        x, y, w, h = ann["bbox"]
-        x_center = (x + w / 2) / img_width
-        y_center = (y + h / 2) / img_height
-        width_norm = w / img_width
-        height_norm = h / img_height
-        
-        # Get class ID
-        class_id = category_map.get(ann["category_id"], 0)
-        
-        # Write YOLOv8 label file
-        label_file = output_labels / f"{Path(image['file_name']).stem}.txt"
-        with open(label_file, "a") as f:
-            f.write(f"{class_id} {x_center} {y_center} {width_norm} {height_norm}\n")
-        
-        # Copy image
-        output_image = output_images / image["file_name"]
-        if not output_image.exists():
-            shutil.copy(image_path, output_image)
-    
-    print(f"[Prepare] Converted {len(image_info)} images to YOLOv8 format")
+    # Images are independent: convert them in parallel (file I/O, so threads)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        converted = sum(pool.map(
+            lambda item: _convert_image(
+                image_info[item[0]], item[1], category_map, Path(images_dir), output_images, output_labels, link
+            ),
+            image_annotations.items(),
+        ))
+    
+    print(f"[Prepare] Converted {converted} images to YOLOv8 format ({len(image_info) - converted} without annotations or missing)")
     print(f"[Prepare] Output directory: {output_dir}")
 
 
-def split_dataset(dataset_dir: str, train_ratio: float = 0.7, val_ratio: float = 0.2):
+def split_dataset(dataset_dir: str, train_ratio: float = 0.7, val_ratio: float = 0.2, seed: int = 42):
     """
-    Split dataset into train/val/test sets
+    Split dataset into train/val/test sets by moving the files
+    (see write_split_manifests to split without moving anything)
     
     Args:
         dataset_dir: Directory with images and labels
         train_ratio: Ratio for training set
         val_ratio: Ratio for validation set
+        seed: Shuffle seed
     """
     dataset_path = Path(dataset_dir)
     images_dir = dataset_path / "images"
     labels_dir = dataset_path / "labels"
     
     # Get all image files
-    image_files = list(images_dir.glob("*.jpg")) + list(images_dir.glob("*.png"))
+    image_files = sorted(images_dir.glob("*.jpg")) + sorted(images_dir.glob("*.png"))
     
     import random
-    random.shuffle(image_files)
+    random.Random(seed).shuffle(image_files)
     
     # Split
     total = len(image_files)
@@ -140,6 +208,116 @@ def split_dataset(dataset_dir: str, train_ratio: float = 0.7, val_ratio: float =
     print(f"[Prepare] Split dataset: {len(train_files)} train, {len(val_files)} val, {len(test_files)} test")
 
 
+def assign_splits(keys: List[str], fractions: Dict[str, float], seed: int = 42) -> Dict[str, str]:
+    """
+    Deterministic split of keys (images or groups such as games)
+
+    Keys are ranked by a seeded hash and cut by the cumulative fractions; the
+    last split takes the remainder. The same keys and seed always give the
+    same split, whatever order the keys are listed in.
+    """
+    ranked = sorted(keys, key=lambda key: hashlib.sha256(f"{seed}:{key}".encode()).hexdigest())
+    splits = {}
+    names = list(fractions)
+    boundary = 0.0
+    start = 0
+    for name in names:
+        boundary += fractions[name]
+        end = len(ranked) if name == names[-1] else int(round(len(ranked) * boundary))
+        for key in ranked[start:end]:
+            splits[key] = name
+        start = end
+    return splits
+
+
+def _label_for_image(image_path: Path, images_dir: Path, labels_dir: Path) -> Path:
+    """Label file of an image (YOLO layout: images/... -> labels/....txt)"""
+    return (labels_dir / image_path.relative_to(images_dir)).with_suffix(".txt")
+
+
+def _group_key(image_path: Path, images_dir: Path, group_by: str) -> str:
+    """
+    Split group of an image:
+    - "image": every image on its own
+    - "prefix": file name before "frame_" (the per-game prefix of prepare_soccernet_training);
+      images without a prefix (plain frame_000123.jpg) are their own group
+    - "folder": folder of the image under images/
+    """
+    relative = image_path.relative_to(images_dir)
+    if group_by == "prefix":
+        match = re.match(r"(.*?)_?frame_\d+$", relative.stem)
+        if match is None:
+            return relative.stem
+        return match.group(1) or relative.as_posix()
+    if group_by == "folder":
+        return relative.parent.as_posix()
+    return relative.as_posix()
+
+
+def write_split_manifests(dataset_dir: str, train_ratio: float = 0.7, val_ratio: float = 0.2,
+                          seed: int = 42, group_by: str = "image") -> Dict[str, int]:
+    """
+    Split dataset into train/val/test manifests without moving any files
+
+    Writes train.txt, val.txt and test.txt in dataset_dir, one image path per
+    line (./images/..., relative to the manifest, as YOLO reads them). Only
+    images with a label file are listed. Groups (see _group_key) are never
+    split, so e.g. all frames of a game land in the same split.
+
+    Args:
+        dataset_dir: Directory with images/ and labels/
+        train_ratio: Ratio for training set
+        val_ratio: Ratio for validation set
+        seed: Split seed
+        group_by: "image", "prefix" or "folder"
+
+    Returns:
+        Number of images per split
+    """
+    if group_by not in ("image", "prefix", "folder"):
+        raise ValueError(f"Unknown group_by: {group_by}")
+
+    start = time.perf_counter()
+    dataset_path = Path(dataset_dir)
+    images_dir = dataset_path / "images"
+    labels_dir = dataset_path / "labels"
+
+    image_files = sorted(
+        path for path in images_dir.rglob("*")
+        if path.suffix.lower() in IMAGE_EXTENSIONS and _label_for_image(path, images_dir, labels_dir).exists()
+    )
+    groups = {path: _group_key(path, images_dir, group_by) for path in image_files}
+
+    fractions = {"train": train_ratio, "val": val_ratio, "test": max(0.0, 1.0 - train_ratio - val_ratio)}
+    splits = assign_splits(sorted(set(groups.values())), fractions, seed)
+
+    # A group holding most images makes the split ratios meaningless
+    group_sizes = Counter(groups.values())
+    if len(image_files) and len(group_sizes) > 1:
+        largest, size = group_sizes.most_common(1)[0]
+        if size > len(image_files) / 2:
+            print(
+                f"[Prepare] Warning: {group_by} group '{largest}' holds {size} of {len(image_files)} images, "
+                f"so the splits will be far from {train_ratio:.0%}/{val_ratio:.0%}/{fractions['test']:.0%}"
+            )
+
+    manifests = {name: [] for name in fractions}
+    for path in image_files:
+        manifests[splits[groups[path]]].append(f"./{path.relative_to(dataset_path).as_posix()}")
+
+    for name, lines in manifests.items():
+        with open(dataset_path / f"{name}.txt", "w") as f:
+            f.write("".join(f"{line}\n" for line in lines))
+
+    counts = {name: len(lines) for name, lines in manifests.items()}
+    print(
+        f"[Prepare] Split manifests: {counts['train']} train, {counts['val']} val, {counts['test']} test "
+        f"({len(splits)} {group_by} groups, seed {seed}) in {time.perf_counter() - start:.2f}s"
+    )
+    print(f"[Prepare] Use train: train.txt, val: val.txt, test: test.txt in the dataset config")
+    return counts
+
+
 def download_soccernet_dataset(output_dir: str = "datasets/soccernet"):
     """
     Download SoccerNet dataset (if available)
@@ -158,13 +336,23 @@ if __name__ == "__main__":
     parser.add_argument("--images", type=str, required=True, help="Images directory")
     parser.add_argument("--output", type=str, required=True, help="Output directory")
     parser.add_argument("--split", action="store_true", help="Split into train/val/test")
+    parser.add_argument("--manifest", action="store_true",
+                        help="With --split: write train/val/test.txt manifests instead of moving files")
+    parser.add_argument("--group-by", choices=["image", "prefix", "folder"], default="image",
+                        help="Manifest split groups (prefix: per-game frame prefix)")
+    parser.add_argument("--seed", type=int, default=42, help="Split seed")
+    parser.add_argument("--link", choices=["hardlink", "symlink", "copy"], default="hardlink",
+                        help="How converted images are placed in the output (default: hardlink)")
+    parser.add_argument("--workers", type=int, default=None, help="Threads for the COCO conversion")
     
     args = parser.parse_args()
     
     if args.coco:
-        convert_coco_to_yolo(args.coco, args.images, args.output)
+        convert_coco_to_yolo(args.coco, args.images, args.output, link=args.link, workers=args.workers)
     
-    if args.split:
-        split_dataset(args.output)
+    if args.split and args.manifest:
+        write_split_manifests(args.output, seed=args.seed, group_by=args.group_by)
+    elif args.split:
+        split_dataset(args.output, seed=args.seed)
 
 
@@ -8,28 +8,37 @@ Complete SoccerNet Training Pipeline
 """
 
 import sys
-import json
 import cv2
 import numpy as np
 import os
+import re
+import hashlib
 import subprocess
 import tempfile
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Union
 from tqdm import tqdm
 import yaml
 
+from football_ai.bbox_cache import FrameBoxes, default_cache_root, load_frame_boxes
+from football_ai.prepare_dataset import assign_splits
+from football_ai.soccernet_index import VideoIndex, is_ignored, search_locations, video_patterns
 
-def _extract_with_opencv(cap, bbox_data, output_images_dir, output_labels_dir, frame_interval, max_frames):
+# Share of games per split, assigned by rank (see prepare_dataset.assign_splits)
+SPLIT_FRACTIONS = {"train": 0.7, "val": 0.2, "test": 0.1}
+
+
+def _extract_with_opencv(cap, frame_boxes, output_images_dir, output_labels_dir, frame_interval, max_frames, name_prefix=""):
     """Extract frames using OpenCV (for unencrypted videos)"""
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames_video = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     
-    predictions = bbox_data.get("predictions", [])
-    if not predictions:
+    if len(frame_boxes) == 0:
         cap.release()
         return 0
     
@@ -44,21 +53,19 @@ def _extract_with_opencv(cap, bbox_data, output_images_dir, output_labels_dir, f
             break
         
         if frame_idx % frame_interval == 0:
-            if frame_idx < len(predictions):
-                frame_prediction = predictions[frame_idx]
-                frame_bboxes = frame_prediction.get("bboxes", []) if isinstance(frame_prediction, dict) else []
+            if frame_idx < len(frame_boxes):
+                frame_bboxes = frame_boxes.frame(frame_idx).tolist()
                 
                 if frame_bboxes:
-                    frame_filename = f"frame_{extracted_count:06d}.jpg"
+                    frame_filename = f"{name_prefix}frame_{extracted_count:06d}.jpg"
                     frame_path = output_images_dir / frame_filename
                     cv2.imwrite(str(frame_path), frame)
                     
-                    label_filename = f"frame_{extracted_count:06d}.txt"
+                    label_filename = f"{name_prefix}frame_{extracted_count:06d}.txt"
                     label_path = output_labels_dir / label_filename
                     
                     with open(label_path, "w") as f:
-                        for bbox in frame_bboxes:
-                            x1, y1, x2, y2 = bbox[:4]
+                        for x1, y1, x2, y2 in frame_bboxes:
                             center_x = (x1 + x2) / 2.0 / width
                             center_y = (y1 + y2) / 2.0 / height
                             bbox_width = (x2 - x1) / width
@@ -75,10 +82,9 @@ def _extract_with_opencv(cap, bbox_data, output_images_dir, output_labels_dir, f
     return extracted_count
 
 
-def _process_extracted_frames(extracted_frames, bbox_data, output_images_dir, output_labels_dir, max_frames, frame_interval):
+def _process_extracted_frames(extracted_frames, frame_boxes, output_images_dir, output_labels_dir, max_frames, frame_interval, name_prefix=""):
     """Process frames extracted by ffmpeg"""
-    predictions = bbox_data.get("predictions", [])
-    if not predictions:
+    if len(frame_boxes) == 0:
         return 0
     
     extracted_count = 0
@@ -87,13 +93,12 @@ def _process_extracted_frames(extracted_frames, bbox_data, output_images_dir, ou
         # Map ffmpeg frame index to video frame index
         video_frame_idx = i * frame_interval
         
-        if video_frame_idx < len(predictions):
-            frame_prediction = predictions[video_frame_idx]
-            frame_bboxes = frame_prediction.get("bboxes", []) if isinstance(frame_prediction, dict) else []
+        if video_frame_idx < len(frame_boxes):
+            frame_bboxes = frame_boxes.frame(video_frame_idx).tolist()
             
             if frame_bboxes:
                 # Copy frame
-                frame_filename = f"frame_{extracted_count:06d}.jpg"
+                frame_filename = f"{name_prefix}frame_{extracted_count:06d}.jpg"
                 output_frame = output_images_dir / frame_filename
                 shutil.copy2(frame_path, output_frame)
                 
@@ -104,12 +109,11 @@ def _process_extracted_frames(extracted_frames, bbox_data, output_images_dir, ou
                 height, width = img.shape[:2]
                 
                 # Create label
-                label_filename = f"frame_{extracted_count:06d}.txt"
+                label_filename = f"{name_prefix}frame_{extracted_count:06d}.txt"
                 label_path = output_labels_dir / label_filename
                 
                 with open(label_path, "w") as f:
-                    for bbox in frame_bboxes:
-                        x1, y1, x2, y2 = bbox[:4]
+                    for x1, y1, x2, y2 in frame_bboxes:
                         center_x = (x1 + x2) / 2.0 / width
                         center_y = (y1 + y2) / 2.0 / height
                         bbox_width = (x2 - x1) / width
@@ -123,25 +127,31 @@ def _process_extracted_frames(extracted_frames, bbox_data, output_images_dir, ou
 
 def extract_frames_with_bboxes(
     video_path: Path,
-    bbox_data: Dict,
+    bbox_data: Union[Dict, FrameBoxes],
     output_images_dir: Path,
     output_labels_dir: Path,
     frame_interval: int = 30,
     max_frames: int = 1000,
-    password: str = "s0cc3rn3t"
+    password: str = "s0cc3rn3t",
+    name_prefix: str = ""
 ):
     """
     Extract frames from video and match with bounding boxes
     Handles password-protected videos using ffmpeg
+
+    bbox_data is the parsed bbox JSON or its memory-mapped boxes (see
+    bbox_cache.load_frame_boxes). Files are named <name_prefix>frame_NNNNNN.jpg/.txt
     """
     if not video_path.exists():
         print(f"[Extract] Video not found: {video_path}", file=sys.stderr)
         return 0
     
+    frame_boxes = bbox_data if isinstance(bbox_data, FrameBoxes) else FrameBoxes.from_predictions(bbox_data.get("predictions", []))
+    
     # Try OpenCV first
     cap = cv2.VideoCapture(str(video_path))
     if cap.isOpened() and cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
-        return _extract_with_opencv(cap, bbox_data, output_images_dir, output_labels_dir, frame_interval, max_frames)
+        return _extract_with_opencv(cap, frame_boxes, output_images_dir, output_labels_dir, frame_interval, max_frames, name_prefix)
     
     # Password-protected - use ffmpeg
     cap.release()
@@ -175,7 +185,7 @@ def extract_frames_with_bboxes(
             frames = sorted(temp_dir.glob("frame_*.jpg"))
             if frames:
                 print(f"[Extract] Extracted {len(frames)} frames", file=sys.stderr)
-                return _process_extracted_frames(frames, bbox_data, output_images_dir, output_labels_dir, max_frames, frame_interval)
+                return _process_extracted_frames(frames, frame_boxes, output_images_dir, output_labels_dir, max_frames, frame_interval, name_prefix)
         
         # Try without password
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
@@ -183,7 +193,7 @@ def extract_frames_with_bboxes(
         if result.returncode == 0:
             frames = sorted(temp_dir.glob("frame_*.jpg"))
             if frames:
-                return _process_extracted_frames(frames, bbox_data, output_images_dir, output_labels_dir, max_frames, frame_interval)
+                return _process_extracted_frames(frames, frame_boxes, output_images_dir, output_labels_dir, max_frames, frame_interval, name_prefix)
         
         print(f"[Extract] Failed: {result.stderr[:200] if result.stderr else 'Unknown error'}", file=sys.stderr)
         return 0
@@ -199,158 +209,239 @@ def extract_frames_with_bboxes(
                 pass
 
 
-def find_video_for_bbox(bbox_file: Path) -> Optional[Path]:
+def _search_location(search_dir: Path, camera_num: str) -> Optional[Path]:
+    """File system search of one location (direct file, then rglob) for each pattern"""
+    for pattern in video_patterns(camera_num):
+        video_path = search_dir / pattern
+        if video_path.exists():
+            if not is_ignored(video_path):
+                return video_path
+        
+        try:
+            for video_file in search_dir.rglob(pattern):
+                if video_file.exists():
+                    if is_ignored(video_file):
+                        continue
+                    return video_file
+        except (PermissionError, OSError):
+            continue
+    return None
+
+
+def find_video_for_bbox(bbox_file: Path, index: Optional[VideoIndex] = None) -> Optional[Path]:
     """
     Find corresponding video file for a bounding box JSON
     Search ONLY in SoccerNet folder
+
+    With an index (see soccernet_index.VideoIndex) locations inside its root
+    are looked up instead of searched
     """
-    game_dir = bbox_file.parent
-    bbox_name = bbox_file.name
-    
-    camera_num = bbox_name.split("_")[0]
+    camera_num = bbox_file.name.split("_")[0]
     
     # Search ONLY in SoccerNet folder structure
-    search_locations = [
-        game_dir,  # Same directory as bbox (most likely)
-        game_dir.parent,  # Parent directory
-        game_dir.parent.parent,  # Grandparent
-        Path("datasets/soccernet_data"),  # Root SoccerNet folder
-    ]
-    
-    video_patterns = [
-        f"{camera_num}_720p.mkv",
-        f"{camera_num}_HQ_25.mkv",
-        f"{camera_num}.mkv",
-        f"{camera_num}.mp4",
-        f"1_{camera_num}_720p.mkv",
-        f"2_{camera_num}_720p.mkv",
-        f"{camera_num}_720p.MKV",
-        f"{camera_num}_HQ_25.MKV",
-    ]
-    
-    ignore_paths = ["venv", "__pycache__", ".git", "node_modules", "site-packages"]
-    
-    for search_dir in search_locations:
-        if not search_dir.exists():
-            continue
-            
-        for pattern in video_patterns:
-            video_path = search_dir / pattern
-            if video_path.exists():
-                video_str = str(video_path)
-                if not any(ignore in video_str for ignore in ignore_paths):
+    for search_dir in search_locations(bbox_file):
+        if index is not None:
+            folder = Path(os.path.abspath(search_dir))
+            if index.contains(folder):
+                video_path = index.find(folder, camera_num)
+                if video_path:
                     return video_path
-            
-            try:
-                for video_file in search_dir.rglob(pattern):
-                    if video_file.exists():
-                        video_str = str(video_file)
-                        if any(ignore in video_str for ignore in ignore_paths):
-                            continue
-                        return video_file
-            except (PermissionError, OSError):
                 continue
+        
+        if not search_dir.exists():
+            continue
+        
+        video_path = _search_location(search_dir, camera_num)
+        if video_path:
+            return video_path
     
     return None
 
 
+def game_prefix(game_dir: Path, data_dir: Path) -> str:
+    """
+    File name prefix of a game's frames: slug of the game folder + short hash
+    of its path, so games never overwrite each other's frames
+    """
+    try:
+        relative = game_dir.relative_to(data_dir)
+    except ValueError:
+        relative = game_dir
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", game_dir.name).strip("_")[:40]
+    digest = hashlib.sha1(relative.as_posix().encode()).hexdigest()[:8]
+    return f"{slug}_{digest}_"
+
+
+def _process_game(job: Dict) -> Dict:
+    """Worker: extract one game into its split (files prefixed with the game prefix)"""
+    start = time.perf_counter()
+    result = {"game": job["game"], "split": job["split"], "frames": 0, "error": None}
+    images_dir = Path(job["output_dir"]) / "images" / job["split"]
+    labels_dir = Path(job["output_dir"]) / "labels" / job["split"]
+
+    try:
+        # Frames from a previous run of this game (in any split) are replaced
+        for split in SPLIT_FRACTIONS:
+            for kind, ext in (("images", "jpg"), ("labels", "txt")):
+                for stale in (Path(job["output_dir"]) / kind / split).glob(f"{job['prefix']}frame_*.{ext}"):
+                    stale.unlink()
+
+        # Parsed once into a memory-mapped cache (outside the data folder), reused on later runs
+        frame_boxes = load_frame_boxes(Path(job["bbox_file"]), cache_root=job["bbox_cache"])
+        result["frames"] = extract_frames_with_bboxes(
+            Path(job["video"]),
+            frame_boxes,
+            images_dir,
+            labels_dir,
+            frame_interval=30,
+            max_frames=job["max_frames"],
+            password="s0cc3rn3t",
+            name_prefix=job["prefix"]
+        )
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
 def process_soccernet_to_yolo(
     data_dir: str = "datasets/soccernet_data",
     output_dir: str = "datasets/football_yolo",
     max_games: int = 0,
-    frames_per_game: int = 1000
+    frames_per_game: int = 1000,
+    workers: int = None,
+    seed: int = 42
 ):
     """
     Complete pipeline: Process SoccerNet bboxes + videos to YOLOv8 format
+
+    Games are extracted in parallel worker processes. Each game writes its
+    own files (prefixed with game_prefix) into the split decided up front
+    from a seeded hash of the game (prepare_dataset.assign_splits).
     """
     print("=" * 60, file=sys.stderr)
     print("Processing SoccerNet to YOLOv8 Format", file=sys.stderr)
     print("=" * 60, file=sys.stderr)
     print(file=sys.stderr)
-    
+
     data_path = Path(data_dir)
     output_path = Path(output_dir)
-    
-    for split in ["train", "val", "test"]:
+
+    for split in SPLIT_FRACTIONS:
         (output_path / "images" / split).mkdir(parents=True, exist_ok=True)
         (output_path / "labels" / split).mkdir(parents=True, exist_ok=True)
-    
-    bbox_files = list(data_path.rglob("*player_boundingbox_maskrcnn.json"))
-    
+
+    bbox_files = sorted(data_path.rglob("*player_boundingbox_maskrcnn.json"))
+
     if not bbox_files:
         print("[Error] No bounding box files found!", file=sys.stderr)
         return False
-    
+
     print(f"[Process] Found {len(bbox_files)} bounding box files", file=sys.stderr)
-    
-    if max_games > 0:
-        bbox_files = bbox_files[:max_games * 2]
-    else:
-        print(f"[Process] Processing ALL available games ({len(bbox_files)} bbox files)", file=sys.stderr)
-    
-    total_extracted = 0
-    games_processed = 0
-    processed_games = set()
-    
-    for bbox_file in tqdm(bbox_files, desc="Processing games", file=sys.stderr):
-        video_path = find_video_for_bbox(bbox_file)
-        
-        if not video_path:
-            continue
-        
-        game_key = video_path.parent
-        if game_key in processed_games:
-            continue
-        processed_games.add(game_key)
-        
-        try:
-            with open(bbox_file, "r") as f:
-                bbox_data = json.load(f)
-        except Exception as e:
-            print(f"[Process] Error loading {bbox_file}: {e}", file=sys.stderr)
-            continue
-        
-        unique_games_count = len(processed_games)
-        if unique_games_count == 0:
-            unique_games_count = 1
-        
-        if games_processed < unique_games_count * 0.7:
-            split = "train"
-        elif games_processed < unique_games_count * 0.9:
-            split = "val"
+
+    # One job per game folder: the first bbox file with a video inside that folder.
+    # find_video_for_bbox also searches parent folders, where it can return another
+    # game's video; such games are skipped rather than labelled with the wrong frames
+    match_start = time.perf_counter()
+    index = VideoIndex.load(data_path)
+    games_bboxes: Dict[Path, List[Path]] = {}
+    for bbox_file in bbox_files:
+        games_bboxes.setdefault(bbox_file.parent, []).append(bbox_file)
+
+    jobs = []
+    skipped = []
+    for game_dir, game_bbox_files in games_bboxes.items():
+        if max_games > 0 and len(jobs) >= max_games:
+            break
+        game_abs = Path(os.path.abspath(game_dir))
+        foreign = None
+        for bbox_file in game_bbox_files:
+            video_path = find_video_for_bbox(bbox_file, index)
+            if video_path and game_abs not in Path(os.path.abspath(video_path)).parents:
+                foreign = foreign or video_path
+                continue
+            if video_path:
+                jobs.append({
+                    "game": str(game_dir.relative_to(data_path)),
+                    "bbox_file": str(bbox_file),
+                    "video": str(video_path),
+                    "prefix": game_prefix(game_dir, data_path),
+                    "output_dir": str(output_path),
+                    "bbox_cache": str(default_cache_root(data_path)),
+                    "max_frames": frames_per_game,
+                })
+                break
         else:
-            split = "test"
-        
-        extracted = extract_frames_with_bboxes(
-            video_path,
-            bbox_data,
-            output_path / "images" / split,
-            output_path / "labels" / split,
-            frame_interval=30,
-            max_frames=frames_per_game,
-            password="s0cc3rn3t"
-        )
-        
-        total_extracted += extracted
-        games_processed += 1
-        
-        if extracted > 0:
-            print(f"[Process] Game {games_processed}: {extracted} frames extracted", file=sys.stderr)
-    
+            skipped.append((game_dir, foreign))
+
+    for game_dir, foreign in skipped:
+        reason = f"only found {foreign} outside the game folder" if foreign else "no video found"
+        print(f"[Process] Skipping {game_dir.relative_to(data_path)}: {reason}", file=sys.stderr)
+
+    if not jobs:
+        print("[Error] No videos found for the bounding box files!", file=sys.stderr)
+        return False
+    print(
+        f"[Process] Matched videos for {len(jobs)} games ({len(skipped)} skipped) "
+        f"in {time.perf_counter() - match_start:.2f}s",
+        file=sys.stderr
+    )
+
+    splits = assign_splits([job["game"] for job in jobs], SPLIT_FRACTIONS, seed)
+    for job in jobs:
+        job["split"] = splits[job["game"]]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    print(f"[Process] Processing {len(jobs)} games on {workers} worker(s)", file=sys.stderr)
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_process_game, job) for job in jobs]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing games", file=sys.stderr):
+            result = future.result()
+            results.append(result)
+            if result["error"]:
+                print(f"[Process] Error in {result['game']}: {result['error']}", file=sys.stderr)
+            else:
+                print(
+                    f"[Process] {result['game']} ({result['split']}): "
+                    f"{result['frames']} frames in {result['seconds']:.1f}s",
+                    file=sys.stderr
+                )
+    elapsed = time.perf_counter() - start
+
+    total_extracted = sum(r["frames"] for r in results)
+    games_with_frames = [r for r in results if r["frames"] > 0]
+    game_seconds = sum(r["seconds"] for r in results)
+
     print("=" * 60, file=sys.stderr)
     print(f"Processing Complete!", file=sys.stderr)
     print("=" * 60, file=sys.stderr)
-    print(f"[Process] Processed {len(processed_games)} DIFFERENT games", file=sys.stderr)
+    print(f"[Process] Processed {len(games_with_frames)} DIFFERENT games", file=sys.stderr)
+    for split in SPLIT_FRACTIONS:
+        split_results = [r for r in results if r["split"] == split]
+        print(
+            f"[Process]   {split}: {len(split_results)} games, "
+            f"{sum(r['frames'] for r in split_results)} frames",
+            file=sys.stderr
+        )
     print(f"[Process] Total frames extracted: {total_extracted}", file=sys.stderr)
+    print(
+        f"[Process] Time: {elapsed:.1f}s wall, {game_seconds:.1f}s summed over games "
+        f"({game_seconds / elapsed if elapsed > 0 else 0:.1f}x), "
+        f"{total_extracted / elapsed if elapsed > 0 else 0:.1f} frames/s",
+        file=sys.stderr
+    )
     print(f"[Process] Output directory: {output_dir}", file=sys.stderr)
-    
+
     if total_extracted == 0:
         print("[Error] No frames extracted!", file=sys.stderr)
         return False
-    
-    if len(processed_games) < 5:
-        print(f"[Warning] Only {len(processed_games)} games processed", file=sys.stderr)
-    
+
+    if len(games_with_frames) < 5:
+        print(f"[Warning] Only {len(games_with_frames)} games processed", file=sys.stderr)
+
     print(file=sys.stderr)
     return True
 
@@ -463,6 +554,8 @@ def main():
     parser.add_argument("--train", action="store_true", help="Train YOLOv8 model")
     parser.add_argument("--max-games", type=int, default=10, help="Max games to process")
     parser.add_argument("--frames-per-game", type=int, default=1000, help="Max frames per game")
+    parser.add_argument("--workers", type=int, default=None, help="Games processed in parallel (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the train/val/test game split")
     parser.add_argument("--all", action="store_true", help="Run complete pipeline")
     
     args = parser.parse_args()
@@ -476,7 +569,9 @@ def main():
         print("[Pipeline] Step 2: Processing to YOLOv8 format...", file=sys.stderr)
         success = process_soccernet_to_yolo(
             max_games=args.max_games,
-            frames_per_game=args.frames_per_game
+            frames_per_game=args.frames_per_game,
+            workers=args.workers,
+            seed=args.seed
         )
         
         if success:
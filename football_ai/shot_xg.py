@@ -0,0 +1,231 @@
+"""
+xG for detected shots
+Scores all shots of a match in one call to the trained xG model
+
+Detectors collect shots without xG; the whole match is then scored with a
+single batched call to ai_pipeline.runtime.predict_shot_xg_batch. The
+distance-bucket heuristic is only used when no trained model exists (or the
+runtime cannot be imported).
+
+Coordinates are 0-100 pitch coordinates attacking left to right, so a shot
+at (x, y) maps to the runtime's normalized (x / 100, y / 100) with the goal
+at (1.0, 0.5).
+
+Shot context (num_defenders, under_pressure) is computed for all shots of a
+match at once from the tracked players in each shot's frame.
+"""
+
+import sys
+import numpy as np
+from typing import Dict, List, Optional
+
+# Detector shot types -> shot_type vocabulary of the xG training data
+MODEL_SHOT_TYPES = {
+    "open_play": "open_play",
+    "close_range": "open_play",
+    "free_kick": "free_kick",
+}
+
+# Pitch dimensions for converting 0-100 coordinates to meters
+PITCH_LENGTH_M = 105.0
+PITCH_WIDTH_M = 68.0
+GOAL_WIDTH_M = 7.32
+
+# A shot is under pressure when an opponent is closer than this to the shooter
+PRESSURE_DISTANCE_M = 2.0
+
+_fallback_reported = False
+
+
+def heuristic_xg(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Distance-bucket xG (0.65 / 0.35 / 0.17 / 0.08 / 0.03)
+
+    Args:
+        x, y: Shot positions (0-100 pitch coordinates)
+    """
+    x_meters = np.asarray(x, dtype=np.float64) / 100 * 68
+    y_meters = np.asarray(y, dtype=np.float64) / 100 * 105
+    distance = np.hypot(x_meters - 34, y_meters)
+    return np.array([0.65, 0.35, 0.17, 0.08, 0.03])[np.digitize(distance, [6, 12, 18, 25])]
+
+
+def shot_context(
+    shot_x: np.ndarray,
+    shot_y: np.ndarray,
+    player_shot: np.ndarray,
+    player_x: np.ndarray,
+    player_y: np.ndarray,
+    pressure_distance: float = PRESSURE_DISTANCE_M
+) -> Dict[str, np.ndarray]:
+    """
+    Defenders in the shooting triangle and pressure, for all shots at once
+
+    The shooter is the player nearest the ball in the shot frame; every
+    other player in that frame counts as an opponent. Team labels from the
+    detectors are position-based (left half = home), which would put the
+    shooter and every player near the opponent's goal in the same team, so
+    they are not used to tell opponents apart.
+
+    Args:
+        shot_x, shot_y: Ball position per shot (0-100 coordinates, attacking right)
+        player_shot: Shot index of each player row (players in the shot frames)
+        player_x, player_y: Player positions (0-100 coordinates)
+        pressure_distance: Nearest-opponent distance (meters) below which the shot is under pressure
+
+    Returns:
+        {"num_defenders": int64, "under_pressure": int64, "nearest_opponent": float64 meters (inf = none)}
+    """
+    n_shots = len(shot_x)
+    shot_x = np.asarray(shot_x, dtype=np.float64)
+    shot_y = np.asarray(shot_y, dtype=np.float64)
+    player_shot = np.asarray(player_shot, dtype=np.int64)
+
+    # Work in meters so distances are isotropic
+    sx = shot_x * PITCH_LENGTH_M / 100
+    sy = shot_y * PITCH_WIDTH_M / 100
+    px = np.asarray(player_x, dtype=np.float64) * PITCH_LENGTH_M / 100
+    py = np.asarray(player_y, dtype=np.float64) * PITCH_WIDTH_M / 100
+    distance = np.hypot(px - sx[player_shot], py - sy[player_shot])
+
+    # Sort rows by (shot, distance): the first row of each shot is the shooter,
+    # the second is the nearest opponent
+    order = np.lexsort((distance, player_shot))
+    sorted_shot = player_shot[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_shot, sorted_shot)
+    opponent = np.empty(len(order), dtype=bool)
+    opponent[order] = rank > 0
+
+    nearest_opponent = np.full(n_shots, np.inf)
+    second = order[rank == 1]
+    nearest_opponent[player_shot[second]] = distance[second]
+
+    # Point-in-triangle (shooter, left post, right post): same side of all three edges
+    post_x = PITCH_LENGTH_M
+    post_y0 = (PITCH_WIDTH_M - GOAL_WIDTH_M) / 2
+    post_y1 = (PITCH_WIDTH_M + GOAL_WIDTH_M) / 2
+    ax, ay = sx[player_shot], sy[player_shot]
+
+    def side(x0, y0, x1, y1):
+        return (x1 - x0) * (py - y0) - (y1 - y0) * (px - x0)
+
+    d0 = side(ax, ay, post_x, post_y0)
+    d1 = side(post_x, post_y0, post_x, post_y1)
+    d2 = side(post_x, post_y1, ax, ay)
+    has_negative = (d0 < 0) | (d1 < 0) | (d2 < 0)
+    has_positive = (d0 > 0) | (d1 > 0) | (d2 > 0)
+    in_triangle = ~(has_negative & has_positive)
+
+    num_defenders = np.bincount(player_shot[in_triangle & opponent], minlength=n_shots).astype(np.int64)
+    return {
+        "num_defenders": num_defenders,
+        "under_pressure": (nearest_opponent < pressure_distance).astype(np.int64),
+        "nearest_opponent": nearest_opponent,
+    }
+
+
+def _model_scorer():
+    """predict_shot_xg_batch, or None if the runtime is not importable"""
+    try:
+        from ai_pipeline.runtime import predict_shot_xg_batch
+    except ImportError as e:
+        _report_fallback(f"xG runtime not available ({e})")
+        return None
+    return predict_shot_xg_batch
+
+
+def _report_fallback(reason: str) -> None:
+    global _fallback_reported
+    if not _fallback_reported:
+        print(f"[FootballAI] {reason}, using heuristic xG", file=sys.stderr)
+        _fallback_reported = True
+
+
+def shot_xg(
+    x: np.ndarray,
+    y: np.ndarray,
+    shot_types: Optional[np.ndarray] = None,
+    body_parts: Optional[np.ndarray] = None,
+    under_pressure: Optional[np.ndarray] = None,
+    num_defenders: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    xG for a batch of shots, with one model call
+
+    Args:
+        x, y: Shot positions (0-100 pitch coordinates)
+        shot_types: Detector shot types (see MODEL_SHOT_TYPES; default open_play)
+        body_parts: "foot" / "head" / "other" (default foot)
+        under_pressure: 0/1 per shot (default 0)
+        num_defenders: Defenders between ball and goal per shot (default 0)
+
+    Returns:
+        xG per shot (0-1)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0:
+        return np.zeros(0)
+
+    predict = _model_scorer()
+    if predict is None:
+        return heuristic_xg(x, y)
+
+    shots = {"x_shot": x / 100, "y_shot": y / 100}
+    if shot_types is not None:
+        shots["shot_type"] = np.array([MODEL_SHOT_TYPES.get(t, t) for t in shot_types], dtype=object)
+    if body_parts is not None:
+        shots["body_part"] = np.asarray(body_parts, dtype=object)
+    if under_pressure is not None:
+        shots["under_pressure"] = np.asarray(under_pressure, dtype=np.int64)
+    if num_defenders is not None:
+        shots["num_defenders"] = np.asarray(num_defenders, dtype=np.int64)
+
+    try:
+        return np.asarray(predict(shots), dtype=np.float64)
+    except FileNotFoundError as e:
+        # No trained model (only case where the heuristic stands in for the model)
+        _report_fallback(str(e))
+        return heuristic_xg(x, y)
+
+
+def score_shot_events(events: List[Dict], players_by_frame: Optional[Dict[int, List[Dict]]] = None) -> None:
+    """
+    Fill metadata.xg of all shot events in place, with one model call
+
+    Uses the shot's metadata.shotType and metadata.bodyPart. With
+    players_by_frame (frame -> tracked players with "position"), the shot
+    context is computed first and stored as metadata.defenders and
+    metadata.underPressure.
+    """
+    shots = [e for e in events if e.get("type") == "shot"]
+    if not shots:
+        return
+
+    metadata = [shot.setdefault("metadata", {}) for shot in shots]
+    shot_x = np.array([shot["x"] for shot in shots], dtype=np.float64)
+    shot_y = np.array([shot["y"] for shot in shots], dtype=np.float64)
+
+    context = None
+    if players_by_frame is not None:
+        rows = [
+            (i, p["position"]["x"], p["position"]["y"])
+            for i, shot in enumerate(shots)
+            for p in players_by_frame.get(shot["frame"], [])
+        ]
+        player_shot, player_x, player_y = (np.array(c) for c in zip(*rows)) if rows else (np.zeros(0, dtype=np.int64),) * 3
+        context = shot_context(shot_x, shot_y, player_shot, player_x, player_y)
+        for i, m in enumerate(metadata):
+            m["defenders"] = int(context["num_defenders"][i])
+            m["underPressure"] = bool(context["under_pressure"][i])
+
+    xg = shot_xg(
+        shot_x,
+        shot_y,
+        shot_types=[m.get("shotType", "open_play") for m in metadata],
+        body_parts=[m.get("bodyPart", "foot") for m in metadata],
+        under_pressure=context["under_pressure"] if context else None,
+        num_defenders=context["num_defenders"] if context else None,
+    )
+    for m, value in zip(metadata, xg):
+        m["xg"] = round(float(value), 3)
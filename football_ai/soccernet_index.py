@@ -0,0 +1,182 @@
+"""
+Index of the SoccerNet video files
+
+find_video_for_bbox (prepare_soccernet_training) searches the game folder,
+its parent and grandparent, and the SoccerNet root for a camera's video.
+Each location is tried with several file name patterns. Done with rglob,
+that is dozens of tree walks per game. VideoIndex walks the tree once and
+answers the same lookups from dictionaries.
+
+The index is cached as JSON next to the data root
+(datasets/.soccernet_data.video_index.json). It records the mtime of every
+directory it walked. It is reused while none of them has changed: adding,
+removing or renaming a video or folder updates its directory's mtime and
+triggers a rescan.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+VIDEO_INDEX_VERSION = 1
+VIDEO_SUFFIXES = (".mkv", ".mp4")
+
+# Paths containing any of these are never used as videos
+IGNORE_PATHS = ["venv", "__pycache__", ".git", "node_modules", "site-packages"]
+
+
+def video_patterns(camera_num: str) -> List[str]:
+    """Video file names of a camera (half), in order of preference"""
+    return [
+        f"{camera_num}_720p.mkv",
+        f"{camera_num}_HQ_25.mkv",
+        f"{camera_num}.mkv",
+        f"{camera_num}.mp4",
+        f"1_{camera_num}_720p.mkv",
+        f"2_{camera_num}_720p.mkv",
+        f"{camera_num}_720p.MKV",
+        f"{camera_num}_HQ_25.MKV",
+    ]
+
+
+def search_locations(bbox_file: Path) -> List[Path]:
+    """Folders searched for the video of a bbox file, in order"""
+    game_dir = bbox_file.parent
+    return [
+        game_dir,  # Same directory as bbox (most likely)
+        game_dir.parent,  # Parent directory
+        game_dir.parent.parent,  # Grandparent
+        Path("datasets/soccernet_data"),  # Root SoccerNet folder
+    ]
+
+
+def is_ignored(path: Path) -> bool:
+    video_str = str(path)
+    return any(ignore in video_str for ignore in IGNORE_PATHS)
+
+
+def default_cache_path(root: Path) -> Path:
+    """Cache file next to (not inside) the root, so writing it does not change the root's mtime"""
+    root = Path(os.path.abspath(root))
+    return root.parent / f".{root.name}.video_index.json"
+
+
+class VideoIndex:
+    """Video files under a root, looked up by folder and camera"""
+
+    def __init__(self, root: Path, videos: List[str], dirs: Dict[str, int]):
+        """
+        Args:
+            root: Indexed folder
+            videos: Video paths relative to root (posix, sorted)
+            dirs: mtime_ns of every walked folder, by path relative to root
+        """
+        self.root = Path(os.path.abspath(root))
+        self.videos = videos
+        self.dirs = dirs
+
+        # (folder, file name) -> video directly in the folder / first video in its subtree
+        self._direct: Dict[Tuple[Path, str], Path] = {}
+        self._under: Dict[Tuple[Path, str], Path] = {}
+        for relative in videos:
+            path = self.root / relative
+            self._direct[(path.parent, path.name)] = path
+            for ancestor in path.parents:
+                self._under.setdefault((ancestor, path.name), path)
+                if ancestor == self.root:
+                    break
+        self._found: Dict[Tuple[Path, str], Optional[Path]] = {}
+
+    @classmethod
+    def scan(cls, root: Path) -> "VideoIndex":
+        """Walk the root once and index every video file"""
+        root = Path(os.path.abspath(root))
+        videos, dirs = [], {}
+        for current, subdirs, files in os.walk(root):
+            subdirs[:] = sorted(d for d in subdirs if d not in IGNORE_PATHS)
+            current_path = Path(current)
+            relative_dir = current_path.relative_to(root).as_posix()
+            dirs[relative_dir] = os.stat(current_path).st_mtime_ns
+            for name in sorted(files):
+                if name.lower().endswith(VIDEO_SUFFIXES) and not is_ignored(current_path / name):
+                    videos.append((current_path / name).relative_to(root).as_posix())
+        return cls(root, videos, dirs)
+
+    @classmethod
+    def load(cls, root: Path, cache_path: Optional[Path] = None) -> "VideoIndex":
+        """Cached index of root, rescanned if missing, of another version or stale"""
+        start = time.perf_counter()
+        root = Path(os.path.abspath(root))
+        cache_path = Path(cache_path) if cache_path else default_cache_path(root)
+
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+            if cache.get("version") == VIDEO_INDEX_VERSION and cache.get("root") == str(root):
+                index = cls(root, cache["videos"], cache["dirs"])
+                if not index.is_stale():
+                    print(
+                        f"[Index] Loaded video index: {len(index.videos)} videos "
+                        f"({time.perf_counter() - start:.2f}s)",
+                        file=sys.stderr
+                    )
+                    return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.scan(root)
+        index.save(cache_path)
+        print(
+            f"[Index] Scanned {len(index.dirs)} folders: {len(index.videos)} videos "
+            f"({time.perf_counter() - start:.2f}s)",
+            file=sys.stderr
+        )
+        return index
+
+    def is_stale(self) -> bool:
+        """True if any indexed folder was changed or removed since the scan"""
+        for relative_dir, mtime_ns in self.dirs.items():
+            try:
+                if os.stat(self.root / relative_dir).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def save(self, cache_path: Path) -> None:
+        """Write the index atomically (skipped with a warning if not writable)"""
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "version": VIDEO_INDEX_VERSION,
+                    "root": str(self.root),
+                    "dirs": self.dirs,
+                    "videos": self.videos,
+                }, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"[Index] Could not save video index {cache_path}: {e}", file=sys.stderr)
+
+    def contains(self, folder: Path) -> bool:
+        return folder == self.root or self.root in folder.parents
+
+    def find(self, folder: Path, camera_num: str) -> Optional[Path]:
+        """
+        Video of a camera in a folder or its subtree (same preference as the
+        file system search); None if there is none
+
+        The folder must be inside the root (see contains).
+        """
+        key = (folder, camera_num)
+        if key not in self._found:
+            found = None
+            for pattern in video_patterns(camera_num):
+                found = self._direct.get((folder, pattern)) or self._under.get((folder, pattern))
+                if found:
+                    break
+            self._found[key] = found
+        return self._found[key]
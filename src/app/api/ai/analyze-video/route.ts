@@ -19,6 +19,8 @@ export const maxDuration = 300; // 5 minutes max for video processing
  *   - video: File (video file)
  *   - videoUrl: string (optional, URL to video)
  *   - modelPath: string (optional, path to custom YOLOv8 model)
+ *   - eventTypes: string (optional, comma-separated event types, e.g. "shot,pass";
+ *                 only those detectors are run)
  */
 export async function POST(request: NextRequest) {
   try {
@@ -35,6 +37,7 @@ export async function POST(request: NextRequest) {
     const videoFile = formData.get("video") as File | null;
     const videoUrl = formData.get("videoUrl") as string | null;
     const modelPath = formData.get("modelPath") as string | null;
+    const eventTypes = formData.get("eventTypes") as string | null;
 
     if (!videoFile && !videoUrl) {
       return NextResponse.json(
@@ -103,6 +106,9 @@ export async function POST(request: NextRequest) {
     if (modelPath) {
       args.push(modelPath);
     }
+    if (eventTypes) {
+      args.push("--events", eventTypes);
+    }
 
     console.log(`[ai/analyze-video] Running: ${pythonCommand} ${args.join(" ")}`);
 